@@ -0,0 +1,83 @@
+"""Benchmark parallel PDF extraction and chunking on a synthetic filing.
+
+Usage: python3 bench_pdf_extract.py [--pages 500] [--workers 1 2 4 8]
+
+Writes a text-heavy PDF to a temporary file, then times split_pdf with each
+worker count against the single-core PyPDFLoader baseline.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from langchain_community.document_loaders import PyPDFLoader
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from pdf_extract import split_pdf
+
+LINE = "Revenue increased {n}% year over year driven by growth in nights and experiences booked (page {page})."
+
+
+def write_synthetic_pdf(path, pages, lines_per_page=45):
+    """Write a minimal PDF with Helvetica text on every page, no PDF library needed."""
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # page tree, filled in once the page objects are numbered
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    kids = []
+    for page in range(pages):
+        lines = " ".join(f"({LINE.format(n=i, page=page)}) Tj T*" for i in range(lines_per_page))
+        content = f"BT /F1 9 Tf 11 TL 40 760 Td {lines} ET".encode()
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(content), content))
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % len(objects)
+        )
+        kids.append(b"%d 0 R" % len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(kids), pages)
+
+    with open(path, "wb") as f:
+        f.write(b"%PDF-1.4\n")
+        offsets = []
+        for number, body in enumerate(objects, 1):
+            offsets.append(f.tell())
+            f.write(b"%d 0 obj\n%s\nendobj\n" % (number, body))
+        xref = f.tell()
+        f.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+        f.writelines(b"%010d 00000 n \n" % offset for offset in offsets)
+        f.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--workers", type=int, nargs="+", default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    args = parser.parse_args()
+
+    text_splitter = RecursiveCharacterTextSplitter(chunk_size=1024, chunk_overlap=0)
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "synthetic.pdf")
+        write_synthetic_pdf(path, args.pages)
+        print(f"{args.pages} pages, {os.path.getsize(path) / 1e6:.1f} MB, {os.cpu_count()} CPUs")
+
+        start = time.perf_counter()
+        baseline = text_splitter.split_documents(PyPDFLoader(path).load())
+        baseline_time = time.perf_counter() - start
+        print(f"PyPDFLoader  : {baseline_time:6.2f}s  {len(baseline)} chunks")
+
+        for workers in args.workers:
+            start = time.perf_counter()
+            first_chunk = None
+            chunks = 0
+            for _ in split_pdf(path, text_splitter, max_workers=workers):
+                if first_chunk is None:
+                    first_chunk = time.perf_counter() - start
+                chunks += 1
+            elapsed = time.perf_counter() - start
+            print(f"workers={workers:<3}: {elapsed:6.2f}s  {chunks} chunks  "
+                  f"first chunk {first_chunk:.2f}s  speedup {baseline_time / elapsed:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
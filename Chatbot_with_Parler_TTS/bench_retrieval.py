@@ -0,0 +1,71 @@
+"""Compare retrieval latency of the old re-embed pass against the direct hybrid path.
+
+Usage: python3 bench_retrieval.py [--runs 3]
+
+The old path took the top-5 hybrid hits, embedded them again into a fresh
+"retreiver" table and ran vector retrieval over those five texts. The direct
+path hands the hybrid hits to the prompt as they are. The LLM call is the
+same in both, so only the retrieval stage is timed here.
+"""
+import argparse
+import statistics
+import time
+
+import lancedb
+from langchain_community.vectorstores import LanceDB
+from langchain_openai import OpenAIEmbeddings
+
+from constants import lance_db_dir
+from rag_lance import get_table, retrieve
+
+questions = [
+    "What is net profit of Airbnb ?",
+    "What are the specific factors contributing to Airbnb's increased operational expenses in the last fiscal year",
+    "How many active listings did Airbnb have?",
+]
+
+
+def reembed_retrieve(question, db, embedding_function):
+    hits = retrieve(question)
+    vectorstore = LanceDB.from_documents(
+        hits, embedding_function, connection=db, table_name="retreiver", mode="overwrite"
+    )
+    return vectorstore.as_retriever().invoke(question)
+
+
+def time_it(fn, runs):
+    timings = []
+    for _ in range(runs):
+        for question in questions:
+            start = time.perf_counter()
+            fn(question)
+            timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    get_table()
+    db = lancedb.connect(lance_db_dir)
+    embedding_function = OpenAIEmbeddings()
+
+    # Warm up both paths so connection setup is not counted
+    retrieve(questions[0])
+    reembed_retrieve(questions[0], db, embedding_function)
+
+    direct = time_it(retrieve, args.runs)
+    reembed = time_it(lambda q: reembed_retrieve(q, db, embedding_function), args.runs)
+    db.drop_table("retreiver")
+
+    for name, timings in (("re-embed", reembed), ("direct", direct)):
+        print(f"{name:>9}: mean {statistics.mean(timings) * 1000:8.1f} ms  "
+              f"median {statistics.median(timings) * 1000:8.1f} ms  ({len(timings)} queries)")
+    saved = statistics.mean(reembed) - statistics.mean(direct)
+    print(f"saved per question: {saved * 1000:.1f} ms ({saved / statistics.mean(reembed):.0%})")
+
+
+if __name__ == "__main__":
+    main()
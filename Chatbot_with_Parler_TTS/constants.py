@@ -1,5 +1,35 @@
+import os
+import tempfile
+
 input_pdf = "https://d18rn0p25nwr6d.cloudfront.net/CIK-0001559720/8a9ebed0-815a-469a-87eb-1767d21d8cec.pdf"
 
+# Where the Lance table and its full-text index are persisted between runs
+lance_db_dir = os.getenv("LANCE_DB_DIR", "/tmp/langchain")
+lance_table_name = "airbnb"
+
+# Number of hybrid hits passed to the prompt, and an optional reranker ("colbert")
+retrieval_top_k = 5
+rag_reranker = os.getenv("RAG_RERANKER", "")
+
+# Paraphrased questions reuse an earlier answer when their embeddings are this similar
+semantic_cache_enabled = os.getenv("SEMANTIC_CACHE", "1") == "1"
+# ada-002 similarities bunch up near 1, so lower values start matching different questions
+semantic_cache_threshold = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", 0.97))
+semantic_cache_ttl = int(os.getenv("SEMANTIC_CACHE_TTL", 7 * 24 * 3600))
+semantic_cache_max_entries = 1000
+
+# Stream speech sentence by sentence instead of one call for the whole answer
+tts_streaming = os.getenv("TTS_STREAMING", "1") == "1"
+tts_max_workers = 4
+
+# Synthesized answers are kept here, named by a hash of (text, voice, model)
+tts_cache_dir = os.getenv("TTS_CACHE_DIR", os.path.join(tempfile.gettempdir(), "tts_cache"))
+tts_cache_max_bytes = int(os.getenv("TTS_CACHE_MAX_BYTES", 500 * 1024 * 1024))
+
+# How many questions the Gradio app works on at once, and how many may wait in line
+gradio_concurrency_limit = int(os.getenv("GRADIO_CONCURRENCY_LIMIT", 8))
+gradio_max_queue_size = int(os.getenv("GRADIO_MAX_QUEUE_SIZE", 64))
+
 parler_tts_description = """ Utilize a male voice with  an Indian English 
 accent for the chatbot. The speech should be clear, ensuring each word is 
 distinctly articulated in a crisp and confined audio environment. """
@@ -0,0 +1,130 @@
+# Vendored copy: Chatbot_with_Parler_TTS/embedding_cache.py and
+# webchat/src/utils/embedding_cache.py are identical, since each demo installs and runs on its own.
+# Make every change in both.
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+
+from langchain_core.embeddings import Embeddings
+
+# SQLite caps the number of bound parameters per statement
+_SQL_BATCH = 500
+
+default_cache_path = os.getenv(
+    "EMBEDDING_CACHE_PATH",
+    os.path.join(os.path.expanduser("~"), ".cache", "genai-demos", "embeddings.sqlite"),
+)
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    LangChain embeddings wrapper backed by a persistent, content-addressed cache.
+
+    Vectors are stored in SQLite keyed by the model name plus a SHA-256 of the
+    text, so identical chunks are embedded once no matter which demo or run
+    produced them. Misses of a call are embedded in a single batched request
+    and the least recently used entries are evicted beyond ``max_entries``.
+
+    Args:
+        embeddings (Embeddings): The model used for cache misses.
+        path (str): SQLite file holding the cache.
+        model_name (str): Name mixed into the cache key, defaults to ``embeddings.model``.
+        max_entries (int): Maximum number of cached vectors.
+    """
+
+    def __init__(self, embeddings, path=default_cache_path, model_name=None, max_entries=200_000):
+        self.embeddings = embeddings
+        self.model_name = model_name or getattr(embeddings, "model", None) or type(embeddings).__name__
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings "
+            "(key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+        self._conn.commit()
+
+    def _key(self, text, kind):
+        return hashlib.sha256(f"{self.model_name}\0{kind}\0{text}".encode("utf-8")).hexdigest()
+
+    def _lookup(self, keys):
+        found = {}
+        now = time.time()
+        with self._lock:
+            for i in range(0, len(keys), _SQL_BATCH):
+                batch = keys[i:i + _SQL_BATCH]
+                marks = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({marks})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = array("f", blob).tolist()
+                if rows:
+                    self._conn.execute(
+                        f"UPDATE embeddings SET last_used = ? WHERE key IN ({marks})", [now, *batch]
+                    )
+            self._conn.commit()
+        return found
+
+    def _store(self, items):
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                [(key, array("f", vector).tobytes(), now) for key, vector in items],
+            )
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+            if count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM embeddings WHERE key IN "
+                    "(SELECT key FROM embeddings ORDER BY last_used ASC LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+            self._conn.commit()
+
+    def _embed(self, texts, kind, embed_fn):
+        keys = [self._key(text, kind) for text in texts]
+        found = self._lookup(list(dict.fromkeys(keys)))
+
+        # Embed every distinct miss in one call
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found:
+                missing.setdefault(key, text)
+        if missing:
+            vectors = embed_fn(list(missing.values()))
+            new_items = list(zip(missing.keys(), vectors))
+            self._store(new_items)
+            found.update(new_items)
+
+        self.misses += len(missing)
+        self.hits += len(texts) - len(missing)
+        return [found[key] for key in keys]
+
+    def embed_documents(self, texts):
+        return self._embed(list(texts), "document", self.embeddings.embed_documents)
+
+    def embed_query(self, text):
+        return self._embed([text], "query", lambda texts: [self.embeddings.embed_query(texts[0])])[0]
+
+    def stats(self):
+        """Return hit/miss counters for this instance and the number of cached vectors."""
+        with self._lock:
+            (entries,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": entries,
+        }
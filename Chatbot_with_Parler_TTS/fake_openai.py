@@ -0,0 +1,156 @@
+"""Minimal local stand-in for the OpenAI API, for trying the pipeline without spend.
+
+Usage:
+    python3 fake_openai.py --port 8001 --latency 0.2
+    OPENAI_BASE_URL=http://127.0.0.1:8001/v1 OPENAI_API_KEY=fake python3 main.py
+
+Supported endpoints:
+    POST /v1/audio/speech       returns silent mp3 frames, longer input -> longer audio
+    POST /v1/embeddings         returns deterministic 1536-d vectors derived from the text
+    POST /v1/chat/completions   returns a canned answer ending in a reference number derived from
+                                the prompt, token by token when streamed
+"""
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# One silent MPEG-1 layer III frame (128 kbps, 44.1 kHz, ~26 ms)
+MP3_FRAME = bytes.fromhex("fffb9064") + bytes(413)
+
+ANSWER = (
+    "Airbnb reported a net income of 4.8 billion dollars for the fiscal year. "
+    "The increase was driven mostly by a one-time release of a tax valuation allowance. "
+    "Operating expenses grew with higher marketing spend and headcount. "
+    "Please refer to the annual report for the full breakdown."
+)
+
+
+def fake_answer(payload):
+    """The canned answer, tagged per prompt so different questions never share an answer or its audio."""
+    prompt = next(
+        (message.get("content", "") for message in reversed(payload.get("messages", [])) if message.get("role") == "user"),
+        "",
+    )
+    reference = int(hashlib.sha256(str(prompt).encode("utf-8")).hexdigest()[:8], 16)
+    return f"{ANSWER} Reference number {reference}."
+
+
+def fake_embedding(text, dimensions=1536):
+    rng = random.Random(hashlib.sha256(text.encode("utf-8")).digest())
+    return [rng.uniform(-1, 1) for _ in range(dimensions)]
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    latency = 0.0
+    token_delay = 0.0
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _send(self, body, content_type):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        payload = self._read_json()
+        time.sleep(self.latency)
+        if self.path.endswith("/audio/speech"):
+            # Roughly 15 characters of text per frame of audio
+            frames = max(1, len(payload.get("input", "")) // 15)
+            self._send(MP3_FRAME * frames, "audio/mpeg")
+        elif self.path.endswith("/embeddings"):
+            texts = payload["input"]
+            texts = [texts] if isinstance(texts, str) else texts
+            data = [
+                {"object": "embedding", "index": i, "embedding": fake_embedding(str(text))}
+                for i, text in enumerate(texts)
+            ]
+            body = {
+                "object": "list",
+                "data": data,
+                "model": payload.get("model", ""),
+                "usage": {"prompt_tokens": 0, "total_tokens": 0},
+            }
+            self._send(json.dumps(body).encode(), "application/json")
+        elif self.path.endswith("/chat/completions"):
+            if payload.get("stream"):
+                self._stream_chat(payload)
+            else:
+                answer = fake_answer(payload)
+                time.sleep(self.token_delay * len(answer.split()))
+                body = self._completion(payload, "chat.completion")
+                body["choices"] = [
+                    {"index": 0, "message": {"role": "assistant", "content": answer}, "finish_reason": "stop"}
+                ]
+                self._send(json.dumps(body).encode(), "application/json")
+        else:
+            self.send_error(404, f"Not faked: {self.path}")
+
+    def _completion(self, payload, kind):
+        return {
+            "id": "chatcmpl-fake",
+            "object": kind,
+            "created": int(time.time()),
+            "model": payload.get("model", ""),
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        }
+
+    def _stream_chat(self, payload):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def send_event(data):
+            line = f"data: {data}\n\n".encode()
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+            self.wfile.flush()
+
+        words = fake_answer(payload).split(" ")
+        for i, word in enumerate(words):
+            time.sleep(self.token_delay)
+            chunk = self._completion(payload, "chat.completion.chunk")
+            chunk.pop("usage")
+            delta = word if i == 0 else " " + word
+            chunk["choices"] = [{"index": 0, "delta": {"content": delta}, "finish_reason": None}]
+            send_event(json.dumps(chunk))
+        chunk = self._completion(payload, "chat.completion.chunk")
+        chunk.pop("usage")
+        chunk["choices"] = [{"index": 0, "delta": {}, "finish_reason": "stop"}]
+        send_event(json.dumps(chunk))
+        send_event("[DONE]")
+        self.wfile.write(b"0\r\n\r\n")
+
+
+def serve(port=0, latency=0.0, token_delay=0.0):
+    """Start the fake server on a background thread and return it; ``server.server_port`` has the port."""
+    handler = type("Handler", (FakeOpenAIHandler,), {"latency": latency, "token_delay": token_delay})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a fake OpenAI API locally.")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds added to every response.")
+    parser.add_argument("--token-delay", type=float, default=0.02, help="Seconds between streamed tokens.")
+    args = parser.parse_args()
+    server = serve(args.port, args.latency, args.token_delay)
+    print(f"fake OpenAI API on http://127.0.0.1:{server.server_port}/v1")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
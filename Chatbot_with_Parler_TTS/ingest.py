@@ -0,0 +1,41 @@
+"""Incrementally index PDFs into the chatbot's LanceDB table.
+
+Usage:
+    python3 ingest.py filings/ extra/10-Q.pdf https://example.com/10-K.pdf
+    python3 ingest.py filings/ --prune   # also drop documents no longer listed
+
+Only documents whose content hash changed since the last run are re-chunked
+and re-embedded; unchanged ones are skipped.
+"""
+import argparse
+import os
+
+from constants import input_pdf, lance_db_dir
+from rag_lance import ingest
+
+
+def collect_sources(paths):
+    """Expand directories into the PDFs they contain; files and URLs are kept as given."""
+    sources = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                sources.extend(
+                    os.path.abspath(os.path.join(root, name))
+                    for name in sorted(files)
+                    if name.lower().endswith(".pdf")
+                )
+        elif path.startswith(("http://", "https://")):
+            sources.append(path)
+        else:
+            sources.append(os.path.abspath(path))
+    return sources
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Incrementally index PDFs into the chatbot's LanceDB table.")
+    parser.add_argument("paths", nargs="*", default=[input_pdf], help="PDF files, directories or URLs.")
+    parser.add_argument("--db-dir", default=lance_db_dir, help="Directory the Lance table is persisted in.")
+    parser.add_argument("--prune", action="store_true", help="Delete indexed documents that are not listed.")
+    args = parser.parse_args()
+    ingest(collect_sources(args.paths), args.db_dir, prune=args.prune)
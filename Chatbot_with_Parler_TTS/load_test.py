@@ -0,0 +1,112 @@
+"""Load-test the chatbot pipeline against the local fake OpenAI server.
+
+Usage: python3 load_test.py --users 1 4 16 --requests 32
+
+Runs main.process_question (retrieval, generation and speech) for N concurrent
+users and reports p50/p95 latency to the first output and to completion. Like
+the Gradio queue, at most GRADIO_CONCURRENCY_LIMIT requests run at once and the
+rest wait, so latencies include the queue wait, which is reported too. The
+index, embedding cache and audio cache live in a temporary directory. The
+semantic answer cache is off, every request across all levels asks a
+distinct question, and the fake server tags each answer with a number
+derived from the prompt, so neither answers nor their audio are reused.
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+import fake_openai
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def run_user(process_question, questions, include_audio, slots, waits, first_output, total):
+    for question in questions:
+        start = time.perf_counter()
+        first = None
+        async with slots:
+            waits.append(time.perf_counter() - start)
+            async for _ in process_question(question, include_audio):
+                if first is None:
+                    first = time.perf_counter() - start
+        first_output.append(first)
+        total.append(time.perf_counter() - start)
+
+
+async def run_level(process_question, users, requests, include_audio, concurrency_limit):
+    waits, first_output, total = [], [], []
+    slots = asyncio.Semaphore(concurrency_limit)
+    per_user = max(1, requests // users)
+    start = time.perf_counter()
+    await asyncio.gather(*[
+        run_user(
+            process_question,
+            [f"Question {users} {user} {i} what is the net income of Airbnb?" for i in range(per_user)],
+            include_audio,
+            slots,
+            waits,
+            first_output,
+            total,
+        )
+        for user in range(users)
+    ])
+    elapsed = time.perf_counter() - start
+    print(
+        f"users={users:<3} requests={len(total):<4} "
+        f"queue wait p95={percentile(waits, 95):.2f}s  "
+        f"first output p50={percentile(first_output, 50):.2f}s p95={percentile(first_output, 95):.2f}s  "
+        f"total p50={percentile(total, 50):.2f}s p95={percentile(total, 95):.2f}s  "
+        f"throughput={len(total) / elapsed:.1f} req/s"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=32, help="Requests per concurrency level.")
+    parser.add_argument("--latency", type=float, default=0.2, help="Fake API latency per call in seconds.")
+    parser.add_argument("--token-delay", type=float, default=0.02, help="Fake delay between streamed tokens.")
+    parser.add_argument("--no-audio", action="store_true", help="Skip text-to-speech.")
+    parser.add_argument("--concurrency-limit", type=int, default=None,
+                        help="Requests run at once, as in the Gradio queue (default GRADIO_CONCURRENCY_LIMIT).")
+    args = parser.parse_args()
+
+    server = fake_openai.serve(latency=args.latency, token_delay=args.token_delay)
+    workdir = tempfile.mkdtemp(prefix="rag_load_test_")
+    os.environ.update({
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{server.server_port}/v1",
+        "OPENAI_API_KEY": "fake",
+        "LANCE_DB_DIR": os.path.join(workdir, "lance"),
+        "EMBEDDING_CACHE_PATH": os.path.join(workdir, "embeddings.sqlite"),
+        "TTS_CACHE_DIR": os.path.join(workdir, "tts"),
+        "SEMANTIC_CACHE": "0",
+    })
+
+    # Imported after the environment points everything at the fake server
+    from constants import gradio_concurrency_limit
+    from langchain_core.documents import Document
+    from main import process_question
+    from rag_lance import index_documents
+
+    index_documents(
+        [Document(page_content=f"Section {i}: {fake_openai.ANSWER}", metadata={"page": i}) for i in range(200)]
+    )
+
+    # One event loop for every level, since the shared chain keeps its async HTTP client
+    concurrency_limit = args.concurrency_limit or gradio_concurrency_limit
+
+    async def run_levels():
+        for users in args.users:
+            await run_level(process_question, users, args.requests, not args.no_audio, concurrency_limit)
+
+    asyncio.run(run_levels())
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,64 @@
+import asyncio
 import gradio as gr
-from rag_lance import get_rag_output
-from tts_module import text_to_speech
+from rag_lance import astream_rag_output, get_table, lookup_answer, store_answer
+from tts_module import asentences, astream_text_to_speech, atext_to_speech, cache_audio
+from constants import gradio_concurrency_limit, gradio_max_queue_size, tts_max_workers, tts_streaming
 
 
-def process_question(question, include_audio):
-    generated_text = get_rag_output(question)
-    if include_audio:
-        audio_file_path = text_to_speech(generated_text)
-        return generated_text, audio_file_path
-    else:
-        return generated_text, None  # Return None for the audio part
+async def process_question(question, include_audio):
+    # A paraphrase of an earlier question gets the stored answer, and its audio from the TTS cache
+    cached_text = await asyncio.to_thread(lookup_answer, question)
+    if cached_text is not None:
+        audio_file_path = await atext_to_speech(cached_text) if include_audio else None
+        yield cached_text, audio_file_path
+        return
+
+    # Partial answers are shown as tokens arrive. Without audio the player is cleared, so the previous
+    # answer's speech does not linger; otherwise gr.skip() leaves it untouched until the new audio is ready
+    if not include_audio or not tts_streaming:
+        generated_text = ""
+        async for token in astream_rag_output(question, use_answer_cache=False):
+            generated_text += token
+            yield generated_text, gr.skip() if include_audio else None
+        await asyncio.to_thread(store_answer, question, generated_text)
+        if include_audio:
+            audio_file_path = await atext_to_speech(generated_text)
+            yield generated_text, audio_file_path
+        return
+
+    # Speech for the first sentences is synthesized while the rest of the answer is still generated
+    events = asyncio.Queue()
+
+    async def tokens():
+        async for token in astream_rag_output(question, use_answer_cache=False):
+            await events.put(("text", token))
+            yield token
+
+    async def speak():
+        try:
+            async for audio_segment in astream_text_to_speech(asentences(tokens()), max_workers=tts_max_workers):
+                await events.put(("audio", audio_segment))
+        finally:
+            await events.put(None)
+
+    speaker = asyncio.create_task(speak())
+    generated_text = ""
+    segments = []
+    try:
+        while (event := await events.get()) is not None:
+            kind, value = event
+            if kind == "text":
+                generated_text += value
+                yield generated_text, gr.skip()
+            else:
+                segments.append(value)
+                yield generated_text, value
+        await speaker
+    finally:
+        speaker.cancel()
+    await asyncio.to_thread(store_answer, question, generated_text)
+    if segments:
+        cache_audio(generated_text, b"".join(segments))
 
 
 iface = gr.Interface(
@@ -22,7 +71,12 @@ iface = gr.Interface(
     ],
     outputs=[
         gr.Textbox(label="Generated Text"),
-        gr.Audio(label="Generated Audio", type="filepath"),  # No optional keyword
+        gr.Audio(
+            label="Generated Audio",
+            type="filepath",
+            streaming=tts_streaming,
+            autoplay=tts_streaming,
+        ),  # No optional keyword
     ],
     title="Advance RAG chatbot with TTS support",
     description="Ask a question and get a text response along with its audio representation. Optionally, include the audio response.",
@@ -35,4 +89,7 @@ iface = gr.Interface(
 )
 
 if __name__ == "__main__":
+    # Open (or build once) the persisted index before taking any questions
+    get_table()
+    iface.queue(default_concurrency_limit=gradio_concurrency_limit, max_size=gradio_max_queue_size)
     iface.launch(debug=True, share=True)
@@ -0,0 +1,53 @@
+# Vendored copy: Chatbot_with_Parler_TTS/pdf_extract.py and
+# webchat/src/utils/pdf_extract.py are identical, since each demo installs and runs on its own.
+# Make every change in both.
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from langchain_core.documents import Document
+from pypdf import PdfReader
+
+
+def _extract_pages(path, start, stop, reader=None):
+    # In a worker process each task opens its own reader for its page range
+    reader = reader or PdfReader(path)
+    return [(number, reader.pages[number].extract_text() or "") for number in range(start, stop)]
+
+
+def iter_pdf_pages(path, max_workers=None, pages_per_task=16, source=None):
+    """
+    Yield one Document per PDF page, extracting page ranges on a process pool.
+
+    Pages are yielded as soon as their range finishes, so they may arrive out of
+    order; each carries ``source`` and ``page`` metadata like PyPDFLoader's.
+
+    Args:
+        path (str): Local path of the PDF.
+        max_workers (int): Worker processes, defaults to the number of CPUs.
+        pages_per_task (int): Pages extracted per task.
+        source (str): Value for the ``source`` metadata, defaults to ``path``.
+    """
+    reader = PdfReader(path)
+    total = len(reader.pages)
+    max_workers = max_workers or os.cpu_count() or 1
+    ranges = [(start, min(start + pages_per_task, total)) for start in range(0, total, pages_per_task)]
+
+    def to_documents(pages):
+        return [Document(page_content=text, metadata={"source": source or path, "page": number})
+                for number, text in pages]
+
+    if max_workers == 1 or len(ranges) <= 1:
+        for start, stop in ranges:
+            yield from to_documents(_extract_pages(path, start, stop, reader))
+        return
+
+    with ProcessPoolExecutor(max_workers=min(max_workers, len(ranges))) as pool:
+        futures = [pool.submit(_extract_pages, path, start, stop) for start, stop in ranges]
+        for future in as_completed(futures):
+            yield from to_documents(future.result())
+
+
+def split_pdf(path, text_splitter, **kwargs):
+    """Stream pages into the splitter as they are extracted; chunks keep their page metadata."""
+    for page in iter_pdf_pages(path, **kwargs):
+        yield from text_splitter.split_documents([page])
@@ -1,16 +1,34 @@
 import os
+import json
+import re
+import asyncio
+import time
+import hashlib
+import tempfile
+import requests
 import torch
 import lancedb
 from dotenv import load_dotenv
-from constants import input_pdf
+from constants import (
+    input_pdf,
+    lance_db_dir,
+    lance_table_name,
+    rag_reranker,
+    retrieval_top_k,
+    semantic_cache_enabled,
+    semantic_cache_max_entries,
+    semantic_cache_threshold,
+    semantic_cache_ttl,
+)
 from prompt import rag_prompt
-from langchain_community.vectorstores import LanceDB
+from embedding_cache import CachedEmbeddings
+from semantic_cache import SemanticCache
+from pdf_extract import split_pdf
 from langchain.prompts import PromptTemplate
 from langchain_core.output_parsers import StrOutputParser
-from langchain_core.runnables import RunnablePassthrough
+from langchain_core.runnables import RunnableLambda, RunnablePassthrough
 from langchain_openai import ChatOpenAI, OpenAIEmbeddings
 from langchain_core.prompts import ChatPromptTemplate
-from langchain.document_loaders import PyPDFLoader
 from langchain_core.messages import HumanMessage, SystemMessage
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from lancedb.embeddings import get_registry
@@ -30,54 +48,276 @@ class Document:
         return f"Document(page_content='{self.page_content}', metadata={self.metadata})"
 
 
-def get_rag_output(question):
-    input_pdf_file = input_pdf
+openai_model = get_registry().get("openai").create(name="text-embedding-ada-002")
 
-    # Create your PDF loader
-    loader = PyPDFLoader(input_pdf_file)
 
-    # Load the PDF document
-    documents = loader.load()
+class Schema(LanceModel):
+    text: str = openai_model.SourceField()
+    vector: Vector(1536) = openai_model.VectorField()
+    doc_id: str
+    doc_hash: str
+    chunk_id: str
+    page: int
 
+
+# Opened tables by db_dir
+_tables = {}
+_embeddings = None
+
+
+def get_embeddings():
+    """OpenAI embeddings behind the shared on-disk cache, so unchanged chunks are never re-embedded."""
+    global _embeddings
+    if _embeddings is None:
+        _embeddings = CachedEmbeddings(OpenAIEmbeddings(model="text-embedding-ada-002"))
+    return _embeddings
+
+
+def build_index(pdf=input_pdf, db_dir=lance_db_dir):
+    """Load, chunk and embed the PDF into a persisted Lance table with an FTS index."""
+    return ingest([pdf], db_dir, prune=True)
+
+
+def file_hash(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def load_pdf(path, source=None):
+    """Load and chunk one PDF, extracting its pages in parallel."""
     # Chunk the financial report
     text_splitter = RecursiveCharacterTextSplitter(chunk_size=1024, chunk_overlap=0)
-    docs = text_splitter.split_documents(documents)
+    chunks = list(split_pdf(path, text_splitter, source=source))
+
+    # Pages finish out of order; keep chunk IDs stable across runs
+    chunks.sort(key=lambda chunk: chunk.metadata["page"])
+    return chunks
+
+
+def fetch_source(source):
+    """Return a local path for a PDF path or URL; URLs are downloaded to a temporary file."""
+    if not source.startswith(("http://", "https://")):
+        return source
+    response = requests.get(source, timeout=60, headers={"User-Agent": "Mozilla/5.0"})
+    response.raise_for_status()
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as f:
+        f.write(response.content)
+    return f.name
+
+
+def _quote(value):
+    return value.replace("'", "''")
+
+
+def _rows(doc_id, doc_hash, chunks):
+    texts = [chunk.page_content for chunk in chunks]
+    # Vectors come from the cached embeddings, so the table's registry
+    # function is not called again for chunks that were seen before
+    vectors = get_embeddings().embed_documents(texts)
+    return [
+        {
+            "text": text,
+            "vector": vector,
+            "doc_id": doc_id,
+            "doc_hash": doc_hash,
+            "chunk_id": f"{doc_hash[:16]}-{i}",
+            "page": int(chunk.metadata.get("page", 0)),
+        }
+        for i, (text, vector, chunk) in enumerate(zip(texts, vectors, chunks))
+    ]
+
+
+def open_or_create_table(db_dir=lance_db_dir):
+    db = lancedb.connect(db_dir)
+    if lance_table_name in db.table_names():
+        table = db.open_table(lance_table_name)
+        if set(Schema.field_names()) <= set(table.schema.names):
+            return table
+        print("index predates per-document tracking, rebuilding it")
+    return db.create_table(lance_table_name, schema=Schema, mode="overwrite")
+
+
+def indexed_documents(table):
+    """Map each indexed doc_id to the content hash it was indexed with, or None if it has chunks of several."""
+    count = table.count_rows()
+    if not count:
+        return {}
+    rows = table.search().select(["doc_id", "doc_hash"]).limit(count).to_list()
+    hashes = {}
+    for row in rows:
+        hashes.setdefault(row["doc_id"], set()).add(row["doc_hash"])
+    # Several hashes means a replacement was interrupted; None makes the next run re-index the document
+    return {doc_id: doc_hashes.pop() if len(doc_hashes) == 1 else None for doc_id, doc_hashes in hashes.items()}
+
+
+def ingest(sources, db_dir=lance_db_dir, prune=False):
+    """
+    Incrementally index PDFs (paths or URLs) into the persisted table.
+
+    Each source's chunks are stored with its doc_id and content hash. A source
+    whose hash is unchanged is skipped; a changed one has its chunks replaced.
+    With ``prune``, documents no longer listed in ``sources`` are deleted.
+    Work is proportional to the documents that changed, not the whole corpus.
 
-    openai_model = get_registry().get("openai").create(name="text-embedding-ada-002")
+    A source that cannot be fetched, parsed or embedded keeps its previous
+    chunks and does not stop the others; a RuntimeError listing the failures
+    is raised once the rest are indexed.
+    """
+    table = open_or_create_table(db_dir)
+    indexed = indexed_documents(table)
+    changed = False
+    failed = []
 
-    class Schema(LanceModel):
-        text: str = openai_model.SourceField()
-        vector: Vector(1536) = openai_model.VectorField()
+    try:
+        for source in sources:
+            try:
+                path = fetch_source(source)
+                try:
+                    doc_hash = file_hash(path)
+                    if indexed.get(source) == doc_hash:
+                        print(f"unchanged: {source}")
+                        continue
+                    chunks = load_pdf(path, source)
+                finally:
+                    if path != source:
+                        os.remove(path)
+                rows = _rows(source, doc_hash, chunks)
+                # Upsert the new chunks before dropping the old ones, so a failure never leaves the document
+                # missing, and a retry after an interrupted replacement does not add them a second time
+                (
+                    table.merge_insert("chunk_id")
+                    .when_matched_update_all()
+                    .when_not_matched_insert_all()
+                    .execute(rows)
+                )
+                changed = True
+                table.delete(f"doc_id = '{_quote(source)}' AND doc_hash != '{doc_hash}'")
+            except Exception as e:
+                print(f"failed: {source}: {e}")
+                failed.append(source)
+                continue
+            indexed[source] = doc_hash
+            print(f"indexed {len(rows)} chunks: {source}")
 
-    embedding_function = OpenAIEmbeddings()
+        if prune:
+            for doc_id in set(indexed) - set(sources):
+                table.delete(f"doc_id = '{_quote(doc_id)}'")
+                del indexed[doc_id]
+                changed = True
+                print(f"removed: {doc_id}")
+    finally:
+        # Also after a failure, so the FTS index and corpus fingerprint match the documents already replaced
+        if changed:
+            table.create_fts_index("text", replace=True)
+            table.cleanup_old_versions()
+            record_corpus(indexed_documents(table), db_dir)
+    print(f"{len(indexed)} documents indexed, embedding cache: {get_embeddings().stats()}")
+    if failed:
+        raise RuntimeError(f"could not index {len(failed)} of {len(sources)} documents: {', '.join(failed)}")
+    return table
 
-    db = lancedb.connect("/tmp/langchain")
-    
-    table = db.create_table("airbnb", schema=Schema, mode="overwrite")
 
-    # Load the document into LanceDB
-    langchain_rerank = LanceDB.from_documents(docs, embedding_function, connection=table)
+def index_documents(docs, db_dir=lance_db_dir):
+    """Embed already chunked documents into a fresh Lance table with an FTS index."""
+    db = lancedb.connect(db_dir)
+    table = db.create_table(lance_table_name, schema=Schema, mode="overwrite")
+
+    by_source = {}
+    for doc in docs:
+        by_source.setdefault(doc.metadata.get("source", "unknown"), []).append(doc)
+    indexed = {}
+    for source, chunks in by_source.items():
+        doc_hash = hashlib.sha256("\0".join(c.page_content for c in chunks).encode("utf-8")).hexdigest()
+        table.add(_rows(source, doc_hash, chunks))
+        indexed[source] = doc_hash
     table.create_fts_index("text", replace=True)
+    print(f"indexed {len(docs)} chunks, embedding cache: {get_embeddings().stats()}")
+    record_corpus(indexed, db_dir)
+    return table
+
+
+def record_corpus(indexed, db_dir=lance_db_dir):
+    """Record the corpus fingerprint and drop answers built from a previous version of it."""
+    global _fingerprint
+    fingerprint = hashlib.sha256(json.dumps(sorted(indexed.items())).encode("utf-8")).hexdigest()
+    with open(os.path.join(db_dir, "index_meta.json"), "w") as f:
+        json.dump({"fingerprint": fingerprint, "documents": indexed}, f, indent=2)
+    answer_cache = get_answer_cache() if db_dir == lance_db_dir else SemanticCache(get_embeddings(), db_dir)
+    answer_cache.invalidate(keep_fingerprint=fingerprint)
+    _fingerprint = None
+
+
+_fingerprint = None
+
+
+def corpus_fingerprint(db_dir=lance_db_dir):
+    """Hash of the indexed chunks, recorded when the index was built."""
+    global _fingerprint
+    if _fingerprint is None:
+        try:
+            with open(os.path.join(db_dir, "index_meta.json")) as f:
+                _fingerprint = json.load(f)["fingerprint"]
+        except FileNotFoundError:
+            _fingerprint = ""
+    return _fingerprint
 
-    #reranker = ColbertReranker()
-    docs_n = (
-        table.search(question, query_type="hybrid")
-        .limit(5)
-        .to_pandas()["text"]
-        .to_list()
-    )
 
-    metadata = {"source": input_pdf_file}
-    docs_with_metadata = [
-        Document(page_content=text, metadata=metadata) for text in docs_n
+def get_table(db_dir=lance_db_dir):
+    """Open the persisted table in `db_dir`, building it only if it does not exist yet."""
+    if db_dir not in _tables:
+        table = open_or_create_table(db_dir)
+        _tables[db_dir] = table if table.count_rows() else build_index(db_dir=db_dir)
+    return _tables[db_dir]
+
+
+def get_reranker(name=rag_reranker):
+    """Return the lancedb reranker configured by name, or None to keep the hybrid order."""
+    if name == "colbert":
+        return ColbertReranker()
+    if name:
+        raise ValueError(f"Unknown reranker: {name}")
+    return None
+
+
+def fts_query(question):
+    """
+    The question as plain search terms for the FTS index.
+
+    tantivy parses its input as query syntax, so "Q3: net income" would name a
+    field and an unbalanced quote or parenthesis is an error. The tokenizer
+    splits on punctuation and lowercases anyway, so dropping both keeps the
+    same terms and leaves no operators (AND, OR, NOT) behind.
+    """
+    return " ".join(re.sub(r"[^\w\s]", " ", question).lower().split())
+
+
+def retrieve(question, k=retrieval_top_k, reranker=None):
+    """Hybrid (vector + FTS) search over the index, optionally reranked, as prompt-ready documents."""
+    # Embed the question through the cache rather than the table's registry function
+    vector = get_embeddings().embed_query(question)
+    text = fts_query(question)
+    if text:
+        query = get_table().search(query_type="hybrid").vector(vector).text(text)
+    else:
+        # Nothing left for the FTS side, e.g. a question of only punctuation
+        query = get_table().search(vector, query_type="vector")
+    if reranker is not None:
+        query = query.rerank(reranker=reranker)
+    hits = query.limit(k).to_pandas()
+    return [
+        Document(page_content=row.text, metadata={"source": row.doc_id, "page": row.page})
+        for row in hits.itertuples()
     ]
 
-    table_re = db.create_table("retreiver", schema=Schema, mode="overwrite")
 
-    # Load the document into LanceDB
-    vectorstore = LanceDB.from_documents(docs_with_metadata, embedding_function, connection=table_re)
+def format_docs(docs):
+    return "\n\n".join(doc.page_content for doc in docs)
+
 
-    retriever = vectorstore.as_retriever()
+def build_rag_chain(reranker=None):
+    # The hybrid hits go straight into the prompt; embedding them again into a
+    # throwaway table only added an embedding round trip and a table write.
+    context_retriever = RunnableLambda(lambda q: retrieve(q, reranker=reranker))
 
     rag_prompt_template = rag_prompt
 
@@ -89,21 +329,111 @@ def get_rag_output(question):
         ],
     )
 
-    def format_docs(docs):
-        return "\n\n".join(doc.page_content for doc in docs)
-
     llm = ChatOpenAI(
         model="gpt-3.5-turbo",
         temperature=0,
         openai_api_key=os.environ["OPENAI_API_KEY"],
     )
 
-    rag_chain = (
-        {"context": retriever | format_docs, "question": RunnablePassthrough()}
+    return (
+        {"context": context_retriever | format_docs, "question": RunnablePassthrough()}
         | prompt
         | llm
         | StrOutputParser()
     )
 
-    output = rag_chain.invoke(question)
+
+_rag_chain = None
+
+
+def get_rag_chain(reranker=None):
+    """Return the RAG chain; the default one (and its HTTP clients) is built once and shared."""
+    global _rag_chain
+    if reranker is not None:
+        return build_rag_chain(reranker)
+    if _rag_chain is None:
+        _rag_chain = build_rag_chain(get_reranker())
+    return _rag_chain
+
+
+_answer_cache = None
+
+
+def get_answer_cache():
+    global _answer_cache
+    if _answer_cache is None:
+        _answer_cache = SemanticCache(
+            get_embeddings(),
+            lance_db_dir,
+            threshold=semantic_cache_threshold,
+            ttl=semantic_cache_ttl,
+            max_entries=semantic_cache_max_entries,
+        )
+    return _answer_cache
+
+
+def lookup_answer(question):
+    """Return a stored answer for this question or a close paraphrase of it, or None."""
+    if not semantic_cache_enabled:
+        return None
+    return get_answer_cache().lookup(question, corpus_fingerprint())
+
+
+def store_answer(question, answer):
+    if semantic_cache_enabled and answer:
+        get_answer_cache().store(question, answer, corpus_fingerprint())
+
+
+def get_rag_output(question, reranker=None, use_answer_cache=True):
+    output = lookup_answer(question) if use_answer_cache else None
+    if output is None:
+        output = get_rag_chain(reranker).invoke(question)
+        if use_answer_cache:
+            store_answer(question, output)
     return output
+
+
+async def aget_rag_output(question, reranker=None, use_answer_cache=True):
+    """Async get_rag_output; retrieval runs on a worker thread and the LLM call on the async client."""
+    output = await asyncio.to_thread(lookup_answer, question) if use_answer_cache else None
+    if output is None:
+        output = await get_rag_chain(reranker).ainvoke(question)
+        if use_answer_cache:
+            await asyncio.to_thread(store_answer, question, output)
+    return output
+
+
+def stream_rag_output(question, reranker=None, use_answer_cache=True):
+    """Yield the answer as text deltas while the LLM generates it."""
+    output = lookup_answer(question) if use_answer_cache else None
+    if output is not None:
+        yield output
+        return
+
+    start = time.perf_counter()
+    tokens = []
+    for token in get_rag_chain(reranker).stream(question):
+        if not tokens:
+            print(f"time to first token: {time.perf_counter() - start:.2f}s")
+        tokens.append(token)
+        yield token
+    if use_answer_cache:
+        store_answer(question, "".join(tokens))
+
+
+async def astream_rag_output(question, reranker=None, use_answer_cache=True):
+    """Async stream_rag_output."""
+    output = await asyncio.to_thread(lookup_answer, question) if use_answer_cache else None
+    if output is not None:
+        yield output
+        return
+
+    start = time.perf_counter()
+    tokens = []
+    async for token in get_rag_chain(reranker).astream(question):
+        if not tokens:
+            print(f"time to first token: {time.perf_counter() - start:.2f}s")
+        tokens.append(token)
+        yield token
+    if use_answer_cache:
+        await asyncio.to_thread(store_answer, question, "".join(tokens))
@@ -0,0 +1,134 @@
+import hashlib
+import re
+import threading
+import time
+
+import lancedb
+from lancedb.pydantic import LanceModel, Vector
+
+_number = re.compile(r"\d+(?:[.,]\d+)*")
+
+
+def numbers_in(text):
+    """Numbers and years mentioned in a question, e.g. {"2022", "4.8"}."""
+    return set(_number.findall(text))
+
+
+class CachedAnswer(LanceModel):
+    id: str
+    question: str
+    answer: str
+    fingerprint: str
+    created_at: float
+    last_hit: float
+    vector: Vector(1536)
+
+
+class SemanticCache:
+    """
+    Answer cache keyed by question embedding, so paraphrased questions reuse an earlier answer.
+
+    Entries live in a small Lance table next to the document index. A lookup
+    returns the stored answer of the nearest earlier question when the cosine
+    similarity reaches ``threshold`` and the entry was built from the same
+    corpus (``fingerprint``) within ``ttl`` seconds. Embedding similarity
+    barely separates "revenue in 2021" from "revenue in 2022", so an entry is
+    only reused when both questions mention the same numbers and years.
+    Beyond ``max_entries`` the least recently hit answers are evicted.
+    """
+
+    def __init__(self, embeddings, db_dir, table_name="answer_cache", threshold=0.97,
+                 ttl=7 * 24 * 3600, max_entries=1000):
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        db = lancedb.connect(db_dir)
+        if table_name in db.table_names():
+            self.table = db.open_table(table_name)
+        else:
+            self.table = db.create_table(table_name, schema=CachedAnswer)
+
+    @staticmethod
+    def _quote(value):
+        return value.replace("'", "''")
+
+    def lookup(self, question, fingerprint):
+        """Return the cached answer for a question like this one, or None."""
+        vector = self.embeddings.embed_query(question)
+        cutoff = time.time() - self.ttl
+        rows = []
+        if self.table.count_rows():
+            rows = (
+                self.table.search(vector)
+                .metric("cosine")
+                .where(f"fingerprint = '{self._quote(fingerprint)}' AND created_at > {cutoff}", prefilter=True)
+                .limit(5)
+                .to_list()
+            )
+        numbers = numbers_in(question)
+        entry = next(
+            (
+                row for row in rows
+                if 1 - row["_distance"] >= self.threshold and numbers_in(row["question"]) == numbers
+            ),
+            None,
+        )
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        similarity = 1 - entry["_distance"]
+        with self._lock:
+            self.table.update(where=f"id = '{entry['id']}'", values={"last_hit": time.time()})
+        print(f"answer cache hit: {entry['question']!r} (similarity {similarity:.3f}, "
+              f"hit rate {self.stats()['hit_rate']:.0%})")
+        return entry["answer"]
+
+    def store(self, question, answer, fingerprint):
+        now = time.time()
+        entry_id = hashlib.sha256(f"{fingerprint}\0{question}".encode("utf-8")).hexdigest()
+        row = {
+            "id": entry_id,
+            "question": question,
+            "answer": answer,
+            "fingerprint": fingerprint,
+            "created_at": now,
+            "last_hit": now,
+            "vector": self.embeddings.embed_query(question),
+        }
+        with self._lock:
+            self.table.delete(f"id = '{entry_id}' OR created_at < {now - self.ttl}")
+            self.table.add([row])
+            self._evict()
+
+    def _evict(self):
+        count = self.table.count_rows()
+        if count <= self.max_entries:
+            return
+        rows = self.table.search().select(["id", "last_hit"]).limit(count).to_list()
+        rows.sort(key=lambda row: row["last_hit"])
+        stale = ", ".join(f"'{row['id']}'" for row in rows[:count - self.max_entries])
+        self.table.delete(f"id IN ({stale})")
+
+    def invalidate(self, keep_fingerprint=None):
+        """Drop every answer that was not built from the corpus with ``keep_fingerprint``."""
+        with self._lock:
+            if keep_fingerprint is None:
+                self.table.delete("true")
+            else:
+                self.table.delete(f"fingerprint != '{self._quote(keep_fingerprint)}'")
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": self.table.count_rows(),
+        }
@@ -0,0 +1,88 @@
+"""Tests for retrieval and incremental ingestion on a temporary LanceDB table.
+
+Run with `python3 -m pytest test_rag_lance.py`. Embeddings are faked, so no
+API key or network is needed.
+"""
+import hashlib
+
+import pytest
+
+import rag_lance
+from rag_lance import Document
+
+
+class FakeEmbeddings:
+    """Deterministic 1536-dimensional vectors derived from the text."""
+
+    def _vector(self, text):
+        digest = hashlib.sha256(text.encode("utf-8")).digest()
+        return [digest[i % len(digest)] / 255 for i in range(1536)]
+
+    def embed_documents(self, texts):
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._vector(text)
+
+    def stats(self):
+        return "fake"
+
+
+@pytest.fixture
+def db_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(rag_lance, "_embeddings", FakeEmbeddings())
+    monkeypatch.setattr(rag_lance, "record_corpus", lambda indexed, db_dir=None: None)
+    return str(tmp_path / "lance")
+
+
+@pytest.fixture
+def table(db_dir, monkeypatch):
+    table = rag_lance.index_documents(
+        [
+            Document("Revenue grew 40% to $8.4 billion in 2022.", {"source": "10-K", "page": 1}),
+            Document("Net income was $1.9 billion in 2022.", {"source": "10-K", "page": 2}),
+        ],
+        db_dir,
+    )
+    monkeypatch.setattr(rag_lance, "_tables", {rag_lance.lance_db_dir: table})
+    return table
+
+
+@pytest.mark.parametrize("question", [
+    "Revenue: how did it change?",
+    "Q3: net income",
+    'What did the "net income line say?',
+    "(net income in 2022",
+    "net income AND OR NOT",
+    "?!",
+])
+def test_retrieve_accepts_query_syntax_in_questions(table, question):
+    docs = rag_lance.retrieve(question, k=2)
+    assert docs
+    assert all(doc.metadata["source"] == "10-K" for doc in docs)
+
+
+def test_fts_query_keeps_only_terms():
+    assert rag_lance.fts_query('Q3: "net income" (2022)?') == "q3 net income 2022"
+
+
+
+def test_ingest_repairs_an_interrupted_replacement(db_dir, tmp_path, monkeypatch):
+    pdf = tmp_path / "filing.pdf"
+    pdf.write_bytes(b"%PDF v2")
+    source = str(pdf)
+    monkeypatch.setattr(rag_lance, "load_pdf", lambda path, source=None: [
+        Document(f"chunk {i} of {open(path, 'rb').read()!r}", {"page": i}) for i in range(3)
+    ])
+
+    # A replacement interrupted after the new chunks were added but before the old ones were deleted
+    table = rag_lance.open_or_create_table(db_dir)
+    table.add(rag_lance._rows(source, "old-hash", [Document("old chunk", {"page": 0})]))
+    new_hash = rag_lance.file_hash(source)
+    table.add(rag_lance._rows(source, new_hash, rag_lance.load_pdf(source)))
+    assert rag_lance.indexed_documents(table) == {source: None}
+
+    table = rag_lance.ingest([source], db_dir)
+    rows = table.search().select(["doc_hash", "chunk_id"]).limit(100).to_list()
+    assert sorted(row["chunk_id"] for row in rows) == [f"{new_hash[:16]}-{i}" for i in range(3)]
+    assert rag_lance.indexed_documents(table) == {source: new_hash}
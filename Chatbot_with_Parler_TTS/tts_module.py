@@ -1,17 +1,237 @@
 import os
-from openai import OpenAI
+import re
+import time
+import uuid
+import asyncio
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from openai import AsyncOpenAI, OpenAI
+from constants import tts_cache_dir, tts_cache_max_bytes
 
-def text_to_speech(text, filename="output_audio.wav"):
-    client = OpenAI()
+# The speech endpoint rejects inputs longer than this
+MAX_TTS_CHARS = 4096
+
+_sentence_end = re.compile(r"(?<=[.!?])\s+")
+
+
+def split_sentences(text, min_chars=40, max_chars=MAX_TTS_CHARS):
+    """Split text at sentence boundaries, folding very short sentences into the next one."""
+    chunks = []
+    current = ""
+    for sentence in _sentence_end.split(text.strip()):
+        # A single sentence over the API limit is cut at the last space that fits
+        while len(sentence) > max_chars:
+            cut = sentence.rfind(" ", 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            chunks.append(sentence[:cut].strip())
+            sentence = sentence[cut:].strip()
+        current = f"{current} {sentence}".strip()
+        if len(current) >= min_chars:
+            chunks.append(current)
+            current = ""
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def audio_cache_path(text, voice="alloy", model="tts-1", cache_dir=tts_cache_dir):
+    """Audio artifacts are named by a hash of what produced them, so identical answers share one file."""
+    key = hashlib.sha256(f"{model}\0{voice}\0{text}".encode("utf-8")).hexdigest()
+    return os.path.join(cache_dir, f"{key}.mp3")
+
+
+def _cache_lookup(path, read=False):
+    """True on a cache hit, or the cached audio with `read`; None on a miss."""
+    try:
+        os.utime(path)  # mark as recently used for eviction
+        if read:
+            with open(path, "rb") as f:
+                audio = f.read()
+    except FileNotFoundError:
+        # Never cached, or evicted by a concurrent request since it was stored
+        return None
+    print(f"audio cache hit: {path}")
+    return audio if read else True
+
+
+def _cache_store(path, audio, cache_dir=tts_cache_dir, max_bytes=tts_cache_max_bytes):
+    os.makedirs(cache_dir, exist_ok=True)
+    # Write under a unique name and rename, so concurrent requests never see a partial file
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(audio)
+    os.replace(tmp_path, path)
+    evict_audio_cache(cache_dir, max_bytes)
+
+
+def cache_audio(text, audio, voice="alloy", model="tts-1"):
+    """Store audio produced outside text_to_speech under the answer's cache key."""
+    path = audio_cache_path(text, voice, model)
+    _cache_store(path, audio)
+    return path
+
+
+def evict_audio_cache(cache_dir=tts_cache_dir, max_bytes=tts_cache_max_bytes):
+    """Delete the least recently used audio files until the cache fits in max_bytes."""
+    entries = []
+    for entry in os.scandir(cache_dir):
+        if entry.name.endswith(".mp3"):
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except FileNotFoundError:
+            pass
+
+
+def synthesize(text, client=None, voice="alloy", model="tts-1"):
+    """Return the mp3 bytes for one piece of text."""
+    client = client or OpenAI()
+    response = client.audio.speech.create(model=model, voice=voice, input=text, response_format="mp3")
+    return response.content
+
+
+def stream_text_to_speech(text, voice="alloy", model="tts-1", max_workers=4, client=None):
+    """
+    Yield mp3 segments for the text sentence by sentence, in order.
+
+    Sentences are synthesized concurrently on a bounded pool, so playback can
+    start as soon as the first one is ready while the rest are still in flight.
+    A cached answer is served as a single segment without calling the API.
+    """
+    path = audio_cache_path(text, voice, model)
+    audio = _cache_lookup(path, read=True)
+    if audio is not None:
+        yield audio
+        return
+
+    client = client or OpenAI()
+    start = time.perf_counter()
+    chunks = split_sentences(text)
+    print(f"starting streaming audio gen for {len(chunks)} chunks")
+
+    pool = ThreadPoolExecutor(max_workers=max_workers)
+    futures = [pool.submit(synthesize, chunk, client, voice, model) for chunk in chunks]
+    segments = []
+    try:
+        for i, future in enumerate(futures):
+            audio = future.result()
+            if i == 0:
+                print(f"time to first audio byte: {time.perf_counter() - start:.2f}s")
+            segments.append(audio)
+            yield audio
+        print(f"done audio gen in {time.perf_counter() - start:.2f}s")
+        _cache_store(path, b"".join(segments))
+    finally:
+        # Stop pending requests if the consumer goes away mid-stream
+        for future in futures:
+            future.cancel()
+        pool.shutdown(wait=False)
+
+
+def text_to_speech(text, voice="alloy", model="tts-1", client=None):
+    path = audio_cache_path(text, voice, model)
+    if _cache_lookup(path):
+        return path
+
+    client = client or OpenAI()
     print("starting audio gen")
     # Generate speech using OpenAI's TTS API
-    response = client.audio.speech.create(
-        model="tts-1",
-        voice="alloy",  # You can choose from: alloy, echo, fable, onyx, nova, shimmer
-        input=text
+    audio = synthesize(
+        text,
+        client,
+        voice=voice,  # You can choose from: alloy, echo, fable, onyx, nova, shimmer
+        model=model,
     )
-    
+
     # Save the audio file
-    response.stream_to_file(filename)
+    _cache_store(path, audio)
     print("done audio gen")
-    return filename
+    return path
+
+
+async def asynthesize(text, client=None, voice="alloy", model="tts-1"):
+    """Async synthesize on the AsyncOpenAI client."""
+    client = client or AsyncOpenAI()
+    response = await client.audio.speech.create(model=model, voice=voice, input=text, response_format="mp3")
+    return response.content
+
+
+async def atext_to_speech(text, voice="alloy", model="tts-1", client=None):
+    path = audio_cache_path(text, voice, model)
+    if _cache_lookup(path):
+        return path
+    audio = await asynthesize(text, client, voice=voice, model=model)
+    _cache_store(path, audio)
+    return path
+
+
+async def asentences(tokens, min_chars=40):
+    """Regroup a stream of text deltas into sentence chunks as soon as each sentence is complete."""
+    buffer = ""
+    async for token in tokens:
+        buffer += token
+        *complete, buffer = _sentence_end.split(buffer)
+        complete = " ".join(complete)
+        if len(complete) >= min_chars:
+            for chunk in split_sentences(complete, min_chars):
+                yield chunk
+        elif complete:
+            # Too short to be worth a request of its own, keep it for the next sentence
+            buffer = f"{complete} {buffer}"
+    if buffer.strip():
+        for chunk in split_sentences(buffer, min_chars):
+            yield chunk
+
+
+async def astream_text_to_speech(sentences, voice="alloy", model="tts-1", max_workers=4, client=None):
+    """
+    Yield mp3 segments in order for an async stream of sentences.
+
+    Synthesis of each sentence starts as soon as it arrives, so speech for the
+    beginning of an answer is produced while the LLM is still generating the end.
+    """
+    client = client or AsyncOpenAI()
+    semaphore = asyncio.Semaphore(max_workers)
+    pending = asyncio.Queue()
+    start = time.perf_counter()
+
+    async def synthesize_bounded(chunk):
+        async with semaphore:
+            return await asynthesize(chunk, client, voice, model)
+
+    async def schedule():
+        try:
+            async for chunk in sentences:
+                await pending.put(asyncio.create_task(synthesize_bounded(chunk)))
+        finally:
+            # Always unblock the consumer; errors surface when the scheduler is awaited
+            await pending.put(None)
+
+    scheduler = asyncio.create_task(schedule())
+    tasks = []
+    try:
+        while True:
+            task = await pending.get()
+            if task is None:
+                break
+            tasks.append(task)
+            audio = await task
+            if len(tasks) == 1:
+                print(f"time to first audio byte: {time.perf_counter() - start:.2f}s")
+            yield audio
+        await scheduler
+        print(f"done audio gen in {time.perf_counter() - start:.2f}s")
+    finally:
+        scheduler.cancel()
+        for task in tasks:
+            task.cancel()
+        while not pending.empty():
+            task = pending.get_nowait()
+            if task is not None:
+                task.cancel()
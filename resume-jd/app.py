@@ -1,14 +1,25 @@
 import streamlit as st
-import requests
-from bs4 import BeautifulSoup
-import docx
-import PyPDF2
+import hashlib
 import os
-import re
-import json
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 import openai
-from io import BytesIO
+from matching import (
+    CLEANING_MODEL,
+    cleaning_messages,
+    extract_text_from_bytes,
+    match_messages,
+    parse_match_json,
+    url_text,
+)
+from llm_cache import cleaning_key, get_llm_cache, match_key
+from structured_match import (
+    MATCH_FIELDS,
+    IncompleteAnalysis,
+    cached_analysis,
+    stream_match_analysis,
+    validate_analysis,
+)
 
 # ------------- ENVIRONMENT & PAGE SETUP -------------
 load_dotenv()
@@ -233,6 +244,10 @@ with st.sidebar:
 
     st.header("Model Settings")
     model = st.selectbox("Select Model:", ["gpt-4o", "gpt-4", "gpt-3.5-turbo"], index=0)
+    stream_analysis = st.checkbox(
+        "Stream structured analysis", value=True,
+        help="Show the score as soon as it is generated and re-request only fields that fail validation."
+    )
     
     # Add contact information
     st.markdown("---")
@@ -245,108 +260,63 @@ with st.sidebar:
     💻 GitHub - [github.com/imsaksham-c](https://github.com/imsaksham-c)
     """)
 
-# ------------- TEXT EXTRACTION HELPERS -------------
-def extract_text_from_pdf(pdf_file):
-    """Extract text from PDF files."""
-    try:
-        pdf_reader = PyPDF2.PdfReader(pdf_file)
-        text = ""
-        for page in pdf_reader.pages:
-            page_text = page.extract_text()
-            if page_text:
-                text += page_text
-        return text
-    except Exception as e:
-        st.error(f"PDF extraction error: {e}")
-        return ""
-
-def extract_text_from_docx(docx_file):
-    """Extract text from DOCX files."""
-    try:
-        doc = docx.Document(docx_file)
-        return "\n".join([para.text for para in doc.paragraphs])
-    except Exception as e:
-        st.error(f"DOCX extraction error: {e}")
-        return ""
-
-def extract_text_from_url(url):
-    """Extract text from a webpage URL."""
-    try:
-        headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'}
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # Remove script and style elements
-        for script in soup(["script", "style"]):
-            script.extract()
-        
-        # Get text
-        text = soup.get_text(separator="\n")
-        
-        # Break into lines and remove leading and trailing space
-        lines = [line.strip() for line in text.splitlines()]
-        
-        # Remove blank lines
-        text = "\n".join([line for line in lines if line])
-        
-        return text
-    except Exception as e:
-        st.error(f"URL extraction error: {e}")
-        return ""
-
 # ------------- LLM CLEANING OF EXTRACTED TEXT -------------
 def clean_text_with_llm(text, text_type):
-    """Use OpenAI to clean and extract only relevant information from scraped text."""
+    """Use OpenAI to clean and extract only relevant information from scraped text; raises on API errors."""
     if not text or not openai.api_key:
         return text
     
+    # Documents already cleaned in any session are served from the shared cache
+    cache = get_llm_cache()
+    key = cleaning_key(text, text_type)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+    
+    response = openai.chat.completions.create(
+        model=CLEANING_MODEL,
+        messages=cleaning_messages(text, text_type),
+        temperature=0.3
+    )
+    
+    cleaned = response.choices[0].message.content.strip()
+    cache.set(key, cleaned, kind=f"clean:{text_type}", model=CLEANING_MODEL)
+    return cleaned
+
+# ------------- DOCUMENT PREPROCESSING -------------
+def preprocess_document(text_type, source):
+    """
+    Extract and clean one document on a worker thread.
+
+    Streamlit calls only work on the script thread, so instead of showing
+    messages this returns the cleaned text (None on failure) and a list of
+    (level, message) notices for the caller to display.
+    """
+    label = "Job description" if text_type == "job_description" else "Resume"
     try:
-        if text_type == "job_description":
-            prompt = f"""Extract and organize only the relevant information from this job description:
-{text}
-
-Format your response as follows:
-Company: [company name]
-Job Title: [job title]
-Location: [location]
-Job Type: [full-time/part-time/contract]
-Required Skills: [list of key skills]
-Responsibilities: [bullet points of main responsibilities]
-Qualifications: [bullet points of required qualifications]
-Benefits: [any mentioned benefits]
-
-Remove any redundant information, advertisements, or irrelevant content.
-"""
-        else:  # resume
-            prompt = f"""Extract and organize only the relevant information from this resume:
-{text}
-
-Format your response as follows:
-Name: [candidate name]
-Contact Information: [email/phone]
-Professional Summary: [brief summary]
-Skills: [list of key skills]
-Experience: [bullet points of relevant experience]
-Education: [education details]
-Certifications: [any certifications]
-
-Remove any redundant information or irrelevant content.
-"""
-        
-        response = openai.chat.completions.create(
-            model="gpt-3.5-turbo",  # Using a faster model for preprocessing
-            messages=[
-                {"role": "system", "content": "You are an expert at extracting relevant information from text."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.3
-        )
-        
-        return response.choices[0].message.content.strip()
+        if "url" in source:
+            raw_text = url_text(source["url"])
+        else:
+            raw_text = extract_text_from_bytes(source["name"], source["data"])
     except Exception as e:
-        st.warning(f"Could not optimize the extracted text: {e}")
-        return text
+        return None, [("error", f"{label} extraction error: {e}")]
+    if not raw_text:
+        return None, [("error", f"Failed to extract text from the provided {label.lower()}.")]
+    
+    notices = []
+    try:
+        text = clean_text_with_llm(raw_text, text_type)
+    except Exception as e:
+        notices.append(("warning", f"Could not optimize the extracted text: {e}"))
+        text = raw_text
+    notices.append(("success", f"{label} extracted and cleaned successfully!"))
+    return text, notices
+
+def preprocess_documents(sources):
+    """Preprocess the JD and the resume at the same time, so the wait is the slower of the two rather than their sum."""
+    with ThreadPoolExecutor(max_workers=len(sources)) as pool:
+        futures = {text_type: pool.submit(preprocess_document, text_type, source) for text_type, source in sources.items()}
+        return {text_type: future.result() for text_type, future in futures.items()}
 
 # ------------- MATCH ANALYSIS WITH ADVANCED SUMMARY -------------
 def analyze_match(jd_text, resume_text, model):
@@ -359,35 +329,16 @@ def analyze_match(jd_text, resume_text, model):
         st.error("Please provide both a job description and resume to analyze.")
         return None
     
+    cache = get_llm_cache()
+    key = match_key(jd_text, resume_text, model)
+    cached = cached_analysis(cache, key)
+    if cached is not None:
+        return cached
+    
     try:
-        prompt = f"""
-You are an expert ATS (Applicant Tracking System) and career advisor. Analyze the match between the job description and resume provided below.
-
-JOB DESCRIPTION:
-{jd_text}
-
-RESUME:
-{resume_text}
-
-Provide a detailed analysis in JSON format with the following structure:
-1. "score": A number from 0-10 indicating how well the resume matches the job description
-2. "feedback": An array of specific improvement suggestions (at least 3)
-3. "name": The candidate's name extracted from the resume
-4. "summary": A professional third-person summary of the candidate's qualifications as they relate to the job (3-4 sentences)
-5. "attractive_points": An array of 5 specific points that make this candidate's profile attractive for this role
-6. "fit_explanation": A paragraph explaining why this candidate is a good fit for the role, referencing specific requirements from the job description
-
-For the summary and attractive points, focus on highlighting the candidate's strengths that directly match the job requirements.
-
-Return ONLY the JSON object without any additional text.
-"""
-        
         response = openai.chat.completions.create(
             model=model,
-            messages=[
-                {"role": "system", "content": "You are an expert ATS system and career advisor."},
-                {"role": "user", "content": prompt}
-            ],
+            messages=match_messages(jd_text, resume_text),
             temperature=0.2
         )
         
@@ -395,13 +346,13 @@ Return ONLY the JSON object without any additional text.
         
         # Extract JSON from response
         try:
-            # Find JSON in the response
-            json_match = re.search(r'({[\s\S]*})', result)
-            if json_match:
-                result_json = json.loads(json_match.group(0))
-                return result_json
-            else:
-                return json.loads(result)
+            analysis = validate_analysis(parse_match_json(result))
+            cache.set(key, analysis, kind="match", model=model)
+            return analysis
+        except IncompleteAnalysis as e:
+            # Show the valid fields, but do not cache an analysis the results view cannot rely on
+            st.warning(f"Some parts of the analysis could not be generated: {', '.join(e.errors)}")
+            return e.fields
         except Exception as e:
             st.error(f"Error parsing JSON response: {e}")
             st.write(result)
@@ -411,12 +362,73 @@ Return ONLY the JSON object without any additional text.
         st.error(f"Error calling OpenAI API: {e}")
         return None
 
+# ------------- STREAMING STRUCTURED ANALYSIS -------------
+def render_field(name, value):
+    """Markdown/HTML for one analysis field in the live preview."""
+    if name == "score":
+        color = "#4CAF50" if value >= 7 else "#FF9800" if value >= 5 else "#F44336"
+        return f'<div class="score-indicator" style="color: {color};">{value}/10</div>'
+    if name == "name":
+        return f"<h3>Results for: {value}</h3>"
+    if name == "feedback":
+        return "<h3>Improvement Suggestions:</h3>" + "".join(f'<div class="feedback-item">{item}</div>' for item in value)
+    if name == "attractive_points":
+        return "<h3>Key Strengths:</h3>\n\n" + "\n".join(f"**{i}.** {point}" for i, point in enumerate(value, 1))
+    title = "Professional Summary" if name == "summary" else "Job Fit Analysis"
+    return f"<h3>{title}:</h3>\n\n{value}"
+
+def analyze_match_streaming(jd_text, resume_text, model):
+    """Analyze the match with structured output, rendering each field as soon as it has streamed in."""
+    if not openai.api_key:
+        st.error("Please enter your OpenAI API key in the sidebar.")
+        return None
+    
+    if not jd_text or not resume_text:
+        st.error("Please provide both a job description and resume to analyze.")
+        return None
+    
+    cache = get_llm_cache()
+    key = match_key(jd_text, resume_text, model)
+    cached = cached_analysis(cache, key)
+    if cached is not None:
+        return cached
+    
+    preview = st.empty()
+    with preview.container():
+        slots = {name: st.empty() for name in MATCH_FIELDS}
+    
+    def show_field(name, value):
+        slots[name].markdown(render_field(name, value), unsafe_allow_html=True)
+    
+    def show_partial(name, text):
+        slots[name].markdown(render_field(name, text + " ▌"), unsafe_allow_html=True)
+    
+    try:
+        # The openai module itself exposes chat.completions, like the client objects do
+        analysis, repairs = stream_match_analysis(openai, jd_text, resume_text, model, show_field, show_partial)
+    except IncompleteAnalysis as e:
+        # Keep what the paid calls produced; the missing sections are simply not shown
+        st.warning(f"Some parts of the analysis could not be generated: {', '.join(e.errors)}")
+        preview.empty()
+        return e.fields
+    except Exception as e:
+        st.error(f"Error calling OpenAI API: {e}")
+        return None
+    
+    cache.set(key, analysis, kind="match", model=model)
+    # The full results are rendered below from session state
+    preview.empty()
+    return analysis
+
 # ------------- MAIN APP LAYOUT -------------
 st.markdown('<h1 style="text-align: center;">📋 Resume-JD Matcher</h1>', unsafe_allow_html=True)
 
 col1, col2 = st.columns(2)
 
 # ------------- JOB DESCRIPTION INPUT -------------
+# Documents that changed this run, keyed by text type; they are processed together below
+pending_sources = {}
+
 with col1:
     st.header("Job Description")
     
@@ -437,8 +449,8 @@ with col1:
         
         # Check if file has changed
         if jd_file is not None:
-            file_details = {"filename": jd_file.name, "size": jd_file.size}
-            file_id = str(file_details)
+            # Hash the content: a different file can share the name and size
+            file_id = hashlib.sha256(jd_file.getvalue()).hexdigest()
             
             if 'last_jd_file_id' not in st.session_state or st.session_state.last_jd_file_id != file_id:
                 st.session_state.last_jd_file_id = file_id
@@ -458,36 +470,11 @@ with col1:
     # Only process the JD if it needs processing and hasn't been cleaned
     if jd_needs_processing and not st.session_state.jd_cleaned:
         if jd_source == "Upload File" and jd_file is not None:
-            # Extract text from file
-            if jd_file.name.endswith('.pdf'):
-                raw_jd_text = extract_text_from_pdf(jd_file)
-            elif jd_file.name.endswith('.docx'):
-                raw_jd_text = extract_text_from_docx(jd_file)
-                
-            # Clean the text
-            if raw_jd_text:
-                with st.spinner("Cleaning and organizing job description..."):
-                    jd_text = clean_text_with_llm(raw_jd_text, "job_description")
-                    st.session_state.jd_text = jd_text
-                    st.session_state.jd_cleaned = True
-                    st.success("Job description extracted and cleaned successfully!")
+            pending_sources["job_description"] = {"name": jd_file.name, "data": jd_file.getvalue()}
         elif jd_source == "Enter URL" and jd_url:
-            # Extract and clean text from URL
-            with st.spinner("Extracting text from URL..."):
-                raw_jd = extract_text_from_url(jd_url)
-                
-                if raw_jd:
-                    with st.spinner("Cleaning and organizing job description..."):
-                        jd_text = clean_text_with_llm(raw_jd, "job_description")
-                        st.session_state.jd_text = jd_text
-                        st.session_state.jd_cleaned = True
-                        st.success("Job description extracted and cleaned successfully from URL!")
-                else:
-                    st.error("Failed to extract text from the provided URL.")
-    
-    # Always display the JD text if it exists in session state
-    if st.session_state.jd_text:
-        st.text_area("Extracted Job Description", st.session_state.jd_text, height=200, key="jd_display", disabled=True)
+            pending_sources["job_description"] = {"url": jd_url}
+    
+    jd_status = st.empty()
 
 # ------------- RESUME INPUT -------------
 with col2:
@@ -510,8 +497,7 @@ with col2:
         
         # Check if file has changed
         if resume_file is not None:
-            file_details = {"filename": resume_file.name, "size": resume_file.size}
-            file_id = str(file_details)
+            file_id = hashlib.sha256(resume_file.getvalue()).hexdigest()
             
             if 'last_resume_file_id' not in st.session_state or st.session_state.last_resume_file_id != file_id:
                 st.session_state.last_resume_file_id = file_id
@@ -531,34 +517,36 @@ with col2:
     # Only process the resume if it needs processing and hasn't been cleaned
     if resume_needs_processing and not st.session_state.resume_cleaned:
         if resume_source == "Upload File" and resume_file is not None:
-            # Extract text from file
-            if resume_file.name.endswith('.pdf'):
-                raw_resume_text = extract_text_from_pdf(resume_file)
-            elif resume_file.name.endswith('.docx'):
-                raw_resume_text = extract_text_from_docx(resume_file)
-                
-            # Clean the text
-            if raw_resume_text:
-                with st.spinner("Cleaning and organizing resume..."):
-                    resume_text = clean_text_with_llm(raw_resume_text, "resume")
-                    st.session_state.resume_text = resume_text
-                    st.session_state.resume_cleaned = True
-                    st.success("Resume extracted and cleaned successfully!")
+            pending_sources["resume"] = {"name": resume_file.name, "data": resume_file.getvalue()}
         elif resume_source == "Enter URL" and resume_url:
-            # Extract and clean text from URL
-            with st.spinner("Extracting text from URL..."):
-                raw_resume = extract_text_from_url(resume_url)
-                
-                if raw_resume:
-                    with st.spinner("Cleaning and organizing resume..."):
-                        resume_text = clean_text_with_llm(raw_resume, "resume")
-                        st.session_state.resume_text = resume_text
-                        st.session_state.resume_cleaned = True
-                        st.success("Resume extracted and cleaned successfully from URL!")
-                else:
-                    st.error("Failed to extract text from the provided URL.")
-    
-    # Always display the resume text if it exists in session state
+            pending_sources["resume"] = {"url": resume_url}
+    
+    resume_status = st.empty()
+
+# ------------- PARALLEL PREPROCESSING -------------
+status_placeholders = {"job_description": jd_status, "resume": resume_status}
+
+if pending_sources:
+    for text_type in pending_sources:
+        label = "job description" if text_type == "job_description" else "resume"
+        status_placeholders[text_type].info(f"Extracting and cleaning {label}...")
+    
+    # Workers only return results; session state and messages are updated here on the script thread
+    for text_type, (text, notices) in preprocess_documents(pending_sources).items():
+        with status_placeholders[text_type].container():
+            for level, message in notices:
+                getattr(st, level)(message)
+        if text is not None:
+            prefix = "jd" if text_type == "job_description" else "resume"
+            st.session_state[f"{prefix}_text"] = text
+            st.session_state[f"{prefix}_cleaned"] = True
+
+# Always display the extracted texts if they exist in session state
+with col1:
+    if st.session_state.jd_text:
+        st.text_area("Extracted Job Description", st.session_state.jd_text, height=200, key="jd_display", disabled=True)
+
+with col2:
     if st.session_state.resume_text:
         st.text_area("Extracted Resume", st.session_state.resume_text, height=200, key="resume_display", disabled=True)
 
@@ -571,13 +559,16 @@ if st.button("Analyze Match", type="primary"):
     elif not openai.api_key:
         st.error("Please enter your OpenAI API key in the sidebar.")
     else:
-        with st.spinner("Analyzing the match..."):
-            # Only use the stored session state values, don't reprocess
-            result = analyze_match(st.session_state.jd_text, st.session_state.resume_text, model)
-            
-            if result:
-                st.session_state.analysis_result = result
-                st.session_state.analysis_done = True
+        # Only use the stored session state values, don't reprocess
+        if stream_analysis:
+            result = analyze_match_streaming(st.session_state.jd_text, st.session_state.resume_text, model)
+        else:
+            with st.spinner("Analyzing the match..."):
+                result = analyze_match(st.session_state.jd_text, st.session_state.resume_text, model)
+        
+        if result:
+            st.session_state.analysis_result = result
+            st.session_state.analysis_done = True
 
 # Display analysis results (either from button click or from session state)
 if st.session_state.analysis_done and st.session_state.analysis_result:
@@ -585,11 +576,12 @@ if st.session_state.analysis_done and st.session_state.analysis_result:
     
     st.markdown('<div class="results-container">', unsafe_allow_html=True)
     
-    # Score display
-    score = result.get("score", 0)
-    score_color = "#4CAF50" if score >= 7 else "#FF9800" if score >= 5 else "#F44336"
-    
-    st.markdown(f'<div class="score-indicator" style="color: {score_color};">{score}/10</div>', unsafe_allow_html=True)
+    # Score display (a partial streamed analysis may lack it)
+    if "score" in result:
+        score = result["score"]
+        score_color = "#4CAF50" if score >= 7 else "#FF9800" if score >= 5 else "#F44336"
+        
+        st.markdown(f'<div class="score-indicator" style="color: {score_color};">{score}/10</div>', unsafe_allow_html=True)
     
     # Candidate name
     candidate_name = result.get("name", "Candidate")
@@ -606,12 +598,14 @@ if st.session_state.analysis_done and st.session_state.analysis_result:
     attractive_points = result.get("attractive_points", [])
     fit_explanation = result.get("fit_explanation", "")
     
-    if summary_text:
+    # Each section is shown on its own: a partial analysis may have strengths but no summary
+    if summary_text or attractive_points or fit_explanation:
         st.markdown('<div class="summary-section">', unsafe_allow_html=True)
         
         # Professional Summary
-        st.markdown("<h3>Professional Summary:</h3>", unsafe_allow_html=True)
-        st.markdown(summary_text)
+        if summary_text:
+            st.markdown("<h3>Professional Summary:</h3>", unsafe_allow_html=True)
+            st.markdown(summary_text)
         
         # Key Strengths (5 attractive points)
         if attractive_points:
@@ -624,16 +618,15 @@ if st.session_state.analysis_done and st.session_state.analysis_result:
             st.markdown("<h3>Job Fit Analysis:</h3>", unsafe_allow_html=True)
             st.markdown(fit_explanation)
         
-        # Prepare text for copy button
-        copy_text = f"""Professional Summary:
-{summary_text}
-
-Key Strengths:
-""" + "\n".join([f"{i}. {point}" for i, point in enumerate(attractive_points, 1)]) + f"""
-
-Job Fit Analysis:
-{fit_explanation}
-"""
+        # Prepare text for copy button, with only the sections that were generated
+        copy_sections = []
+        if summary_text:
+            copy_sections.append(f"Professional Summary:\n{summary_text}")
+        if attractive_points:
+            copy_sections.append("Key Strengths:\n" + "\n".join(f"{i}. {point}" for i, point in enumerate(attractive_points, 1)))
+        if fit_explanation:
+            copy_sections.append(f"Job Fit Analysis:\n{fit_explanation}")
+        copy_text = "\n\n".join(copy_sections) + "\n"
         
         # Display the text in a code block for easy copying
         st.markdown("<h3>Copy-Ready Summary:</h3>", unsafe_allow_html=True)
@@ -0,0 +1,310 @@
+"""Score many resumes against one job description and rank them.
+
+Usage:
+    python batch.py jd.pdf resumes/ --model gpt-4o --concurrency 8 --csv ranking.csv --json ranking.json
+    python batch.py https://example.com/jobs/123 resumes/*.docx --no-clean
+
+Text is extracted on a process pool; the cleaning and match calls run with
+bounded async concurrency and back off on rate limits. Point OPENAI_BASE_URL
+at openai_stub.py to try it without spend.
+"""
+import argparse
+import asyncio
+import csv
+import io
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import openai
+from dotenv import load_dotenv
+from openai import AsyncOpenAI
+
+from matching import (
+    CLEANING_MODEL,
+    cleaning_messages,
+    extract_text_from_bytes,
+    match_messages,
+    parse_match_json,
+    url_text,
+)
+from llm_cache import cleaning_key, get_llm_cache, match_key
+from prerank import shortlist
+from structured_match import IncompleteAnalysis, cached_analysis, validate_analysis
+
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+)
+RESUME_EXTENSIONS = (".pdf", ".docx", ".txt", ".md")
+COLUMNS = ["rank", "file", "name", "score", "similarity", "shortlisted", "summary", "feedback", "attractive_points", "fit_explanation", "error"]
+
+# ------------- EXTRACTION -------------
+def extract_documents(files, max_workers=None):
+    """
+    Extract the text of uploaded files on a process pool.
+
+    Args:
+        files (list): (name, bytes) pairs.
+        max_workers (int): Worker processes, defaults to the number of CPUs.
+
+    Returns:
+        list: (name, text, error) triples in the order of `files`.
+    """
+    documents = []
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(extract_text_from_bytes, name, data) for name, data in files]
+        for (name, _), future in zip(files, futures):
+            try:
+                documents.append((name, future.result(), None))
+            except Exception as e:
+                documents.append((name, "", str(e)))
+    return documents
+
+# ------------- LLM CALLS -------------
+def retry_delay(error, attempt, base=1.0, cap=30.0):
+    """Seconds to wait before retrying: jittered exponential backoff, never shorter than the server's Retry-After."""
+    delay = min(cap, base * 2 ** attempt) * random.uniform(0.5, 1.0)
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    try:
+        # Retrying exactly at Retry-After would send every throttled request back at once
+        return max(delay, min(float(retry_after), cap)) if retry_after else delay
+    except ValueError:
+        return delay
+
+async def complete(client, semaphore, messages, model, temperature, stats, max_retries=6):
+    """Run one chat completion within the concurrency limit, retrying rate limits and transient errors."""
+    for attempt in range(max_retries + 1):
+        async with semaphore:
+            try:
+                stats["llm_calls"] += 1
+                response = await client.chat.completions.create(
+                    model=model, messages=messages, temperature=temperature
+                )
+                return response.choices[0].message.content
+            except RETRYABLE_ERRORS as e:
+                if attempt == max_retries:
+                    raise
+                delay = retry_delay(e, attempt)
+        # Wait outside the semaphore so other requests keep the slot busy
+        stats["retries"] += 1
+        await asyncio.sleep(delay)
+
+async def clean_text(client, semaphore, text, text_type, stats, cache=None):
+    """LLM-cleaned text, from the shared cache when this document was cleaned before."""
+    key = cleaning_key(text, text_type)
+    cached = cache.get(key) if cache is not None else None
+    if cached is not None:
+        stats["cache_hits"] += 1
+        return cached
+    cleaned = (await complete(client, semaphore, cleaning_messages(text, text_type), CLEANING_MODEL, 0.3, stats)).strip()
+    if cache is not None:
+        cache.set(key, cleaned, kind=f"clean:{text_type}", model=CLEANING_MODEL)
+    return cleaned
+
+async def analyze(client, semaphore, jd_text, resume_text, model, stats, cache=None):
+    """Match analysis of one pair, from the shared cache when this pair was analyzed before."""
+    key = match_key(jd_text, resume_text, model)
+    cached = cached_analysis(cache, key)
+    if cached is not None:
+        stats["cache_hits"] += 1
+        return cached
+    # Raises IncompleteAnalysis, so an unusable analysis is never cached
+    analysis = validate_analysis(parse_match_json(
+        await complete(client, semaphore, match_messages(jd_text, resume_text), model, 0.2, stats)
+    ))
+    stats["analyzed"] += 1
+    if cache is not None:
+        cache.set(key, analysis, kind="match", model=model)
+    return analysis
+
+async def score_resume(client, semaphore, jd_text, name, text, model, clean, stats, cache=None):
+    """Clean one resume and score it against the job description; failures are reported, not raised."""
+    try:
+        if not text.strip():
+            raise ValueError("no text could be extracted")
+        resume = await clean_text(client, semaphore, text, "resume", stats, cache) if clean else text
+        result = await analyze(client, semaphore, jd_text, resume, model, stats, cache)
+        return {"file": name, **result}
+    except IncompleteAnalysis as e:
+        return {"file": name, "score": None, **e.fields, "error": str(e)}
+    except Exception as e:
+        return {"file": name, "score": None, "error": str(e)}
+
+async def run_batch(jd_text, resumes, model="gpt-4o", concurrency=8, clean=True, client=None, on_result=None,
+                    top_k=None, cache=None):
+    """
+    Score every resume against one job description.
+
+    Args:
+        jd_text (str): The job description.
+        resumes (list): (name, text) pairs.
+        model (str): Model for the match analysis.
+        concurrency (int): Maximum LLM requests in flight.
+        clean (bool): Clean the JD and the resumes with the LLM first, like the app does.
+        client (AsyncOpenAI): Client to use, defaults to one built from the environment.
+        on_result (callable): Called with (result, done, total) as each shortlisted resume finishes.
+        top_k (int): Only send the `top_k` resumes most similar to the JD (TF-IDF) to the LLM;
+            None scores them all.
+        cache (LLMCache): Reuse and store cleaning and match results here; None calls the LLM every time.
+
+    Returns:
+        tuple: The ranked results and throughput stats. `per_minute` counts only
+        the resumes the LLM analyzed, not cache hits or resumes left out of the shortlist.
+    """
+    if client is None:
+        async with AsyncOpenAI(max_retries=0) as client:
+            return await run_batch(jd_text, resumes, model, concurrency, clean, client, on_result, top_k, cache)
+    semaphore = asyncio.Semaphore(concurrency)
+    stats = {"llm_calls": 0, "retries": 0, "cache_hits": 0, "analyzed": 0, "jd_cleaning_error": None}
+    start = time.perf_counter()
+
+    # Pre-rank on the raw text so skipped resumes cost neither a cleaning nor a match call
+    shortlisted, skipped = shortlist(jd_text, resumes, top_k)
+    results = [
+        {"file": name, "score": None, "similarity": value, "shortlisted": False}
+        for name, _, value in skipped
+    ]
+
+    if clean:
+        try:
+            jd_text = await clean_text(client, semaphore, jd_text, "job_description", stats, cache)
+        except Exception as e:
+            # The raw JD still scores well; losing the whole batch to one cleaning call would not
+            print(f"Error cleaning the job description, using the raw text: {e}")
+            stats["jd_cleaning_error"] = str(e)
+
+    async def score(name, text, similarity):
+        result = await score_resume(client, semaphore, jd_text, name, text, model, clean, stats, cache)
+        result.update(similarity=similarity, shortlisted=True)
+        return result
+
+    tasks = [asyncio.create_task(score(*resume)) for resume in shortlisted]
+    for done, task in enumerate(asyncio.as_completed(tasks), 1):
+        result = await task
+        results.append(result)
+        if on_result is not None:
+            on_result(result, done, len(tasks))
+
+    elapsed = time.perf_counter() - start
+    stats.update(
+        resumes=len(resumes),
+        shortlisted=len(shortlisted),
+        scored=sum(result.get("score") is not None for result in results),
+        elapsed=elapsed,
+        per_minute=stats["analyzed"] / elapsed * 60 if elapsed else 0.0,
+    )
+    return rank(results), stats
+
+# ------------- RANKING & EXPORT -------------
+def rank(results):
+    """Sort by score, best first, then unscored resumes by similarity, and number the ranks."""
+    def key(result):
+        try:
+            score = float(result.get("score"))
+        except (TypeError, ValueError):
+            score = float("-inf")
+        return -score, -result.get("similarity", 0.0), result["file"]
+
+    ranked = sorted(results, key=key)
+    for position, result in enumerate(ranked, 1):
+        result["rank"] = position
+    return ranked
+
+def to_csv(results):
+    output = io.StringIO()
+    writer = csv.DictWriter(output, fieldnames=COLUMNS, extrasaction="ignore")
+    writer.writeheader()
+    for result in results:
+        writer.writerow({
+            column: " | ".join(map(str, value)) if isinstance(value, list) else value
+            for column, value in result.items()
+        })
+    return output.getvalue()
+
+def to_json(results):
+    return json.dumps(results, indent=2)
+
+# ------------- CLI -------------
+def collect_files(paths):
+    """Read resume files, expanding directories; returns (name, bytes) pairs."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            names = sorted(
+                os.path.join(root, name)
+                for root, _, filenames in os.walk(path)
+                for name in filenames
+                if name.lower().endswith(RESUME_EXTENSIONS)
+            )
+        else:
+            names = [path]
+        for name in names:
+            with open(name, "rb") as f:
+                files.append((os.path.relpath(name), f.read()))
+    return files
+
+def read_job_description(source):
+    if source.startswith(("http://", "https://")):
+        return url_text(source)
+    with open(source, "rb") as f:
+        return extract_text_from_bytes(os.path.basename(source), f.read())
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Rank resumes against a job description.")
+    parser.add_argument("jd", help="Job description file (PDF, DOCX, TXT) or URL.")
+    parser.add_argument("resumes", nargs="+", help="Resume files or directories.")
+    parser.add_argument("--model", default="gpt-4o")
+    parser.add_argument("--concurrency", type=int, default=8, help="Maximum LLM requests in flight.")
+    parser.add_argument("--workers", type=int, default=None, help="Extraction processes, defaults to the CPU count.")
+    parser.add_argument("--top-k", type=int, default=None,
+                        help="Only score the K resumes most similar to the JD; the rest are ranked by similarity.")
+    parser.add_argument("--no-clean", action="store_true", help="Skip the LLM cleaning of the documents.")
+    parser.add_argument("--no-cache", action="store_true", help="Call the LLM even for documents analyzed before.")
+    parser.add_argument("--csv", help="Write the ranking to this CSV file.")
+    parser.add_argument("--json", help="Write the ranking to this JSON file.")
+    parser.add_argument("--top", type=int, default=10, help="Candidates to print.")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    jd_text = read_job_description(args.jd)
+    documents = extract_documents(collect_files(args.resumes), args.workers)
+    extraction = time.perf_counter() - start
+    for name, _, error in documents:
+        if error:
+            print(f"Skipping {name}: {error}")
+    resumes = [(name, text) for name, text, error in documents if not error]
+    print(f"Extracted {len(resumes)} resumes in {extraction:.1f}s")
+
+    def report(result, done, total):
+        status = f"score {result['score']}" if result.get("score") is not None else f"error: {result.get('error')}"
+        print(f"[{done}/{total}] {result['file']}: {status}")
+
+    ranked, stats = asyncio.run(run_batch(
+        jd_text, resumes, args.model, args.concurrency, clean=not args.no_clean, on_result=report,
+        top_k=args.top_k, cache=None if args.no_cache else get_llm_cache(),
+    ))
+
+    print()
+    for result in ranked[:args.top]:
+        print(f"{result['rank']:>3}. {result.get('score')!s:>4}  {result.get('name') or ''}  ({result['file']})")
+    if args.csv:
+        with open(args.csv, "w", newline="", encoding="utf-8") as f:
+            f.write(to_csv(ranked))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            f.write(to_json(ranked))
+    print(f"\n{stats['scored']}/{stats['resumes']} resumes scored ({stats['shortlisted']} shortlisted) in {stats['elapsed']:.1f}s "
+          f"({stats['analyzed']} analyzed by the LLM at {stats['per_minute']:.0f}/min, {stats['cache_hits']} cache hits, "
+          f"{stats['llm_calls']} LLM calls, {stats['retries']} retries)")
+    if stats["jd_cleaning_error"]:
+        print(f"The job description could not be cleaned and was used as extracted: {stats['jd_cleaning_error']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Benchmark TF-IDF shortlisting before LLM scoring on a synthetic corpus.
+
+Usage: python bench_prerank.py [--resumes 500] [--top-k 25 50 100] [--latency 0.3]
+
+Generates resumes from several role families against a data engineering
+job description and ranks them through openai_stub.py: once with every
+resume sent to the LLM, then with only the TF-IDF shortlist. Reports wall
+time, LLM calls, estimated cost and how many of the full run's top 10 the
+shortlist kept. The stub scores by keyword overlap, so recall here is an
+upper bound on what a real model would show.
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from openai import AsyncOpenAI
+
+from batch import run_batch
+from openai_stub import serve
+from prerank import shortlist
+
+# USD per million tokens (input, output)
+PRICES = {"gpt-4o": (2.50, 10.00), "gpt-3.5-turbo": (0.50, 1.50)}
+
+JOB_DESCRIPTION = """Acme Analytics is hiring a Senior Data Engineer (full-time, remote).
+You will design and operate batch and streaming pipelines on AWS.
+Required Skills: Python, SQL, Spark, Airflow, Kafka, dbt, Snowflake, Terraform, Docker.
+Responsibilities: build reliable ETL pipelines, model data in the warehouse, own data quality
+monitoring, partner with analysts and ML engineers.
+Qualifications: 5+ years of data engineering, experience with distributed systems and cloud infrastructure.
+"""
+
+ROLES = {
+    "data engineer": "python sql spark airflow kafka dbt snowflake terraform docker aws etl pipelines warehouse".split(),
+    "data scientist": "python sql pandas scikit-learn pytorch statistics experimentation tableau jupyter".split(),
+    "frontend developer": "javascript typescript react css html webpack figma accessibility jest".split(),
+    "backend developer": "java go python postgresql docker kubernetes rest grpc microservices aws".split(),
+    "sales manager": "salesforce pipeline forecasting negotiation quota crm prospecting enterprise".split(),
+    "product designer": "figma sketch prototyping user research wireframes usability design systems".split(),
+    "nurse": "patient care triage medication icu charting epic bls acls".split(),
+}
+FILLER = ("Collaborated with cross-functional teams. Mentored junior colleagues. Presented results to "
+          "stakeholders. Improved processes and documentation. Led weekly planning meetings.").split(". ")
+
+
+def make_corpus(count, seed=7):
+    rng = random.Random(seed)
+    families = list(ROLES)
+    resumes = []
+    for i in range(count):
+        # A quarter of the candidates apply from the matching role, the rest from elsewhere
+        role = "data engineer" if rng.random() < 0.25 else rng.choice(families)
+        skills = rng.sample(ROLES[role], rng.randint(3, len(ROLES[role])))
+        experience = "\n".join(f"- {rng.choice(FILLER)} using {rng.choice(skills)}." for _ in range(rng.randint(4, 12)))
+        resumes.append((f"resume{i:04d}.txt", f"Name: Candidate {i}\nTitle: {role.title()}\n"
+                                              f"Skills: {', '.join(skills)}\nExperience:\n{experience}\n"))
+    return resumes
+
+
+class CountingClient:
+    """Wraps an AsyncOpenAI client and tallies prompt and completion characters per model."""
+
+    def __init__(self, client):
+        self.client = client
+        self.chars = {}
+        self.chat = self
+        self.completions = self
+
+    async def create(self, model, messages, **kwargs):
+        response = await self.client.chat.completions.create(model=model, messages=messages, **kwargs)
+        prompt = sum(len(message["content"]) for message in messages)
+        completion = len(response.choices[0].message.content)
+        sent, received = self.chars.get(model, (0, 0))
+        self.chars[model] = (sent + prompt, received + completion)
+        return response
+
+    def cost(self):
+        # About four characters per token
+        return sum(
+            (sent * PRICES[model][0] + received * PRICES[model][1]) / 4 / 1e6
+            for model, (sent, received) in self.chars.items()
+        )
+
+
+async def score(args, base_url, resumes, top_k):
+    # A fresh client per run: an AsyncOpenAI client is tied to the event loop it first ran on
+    async with AsyncOpenAI(base_url=base_url, api_key="stub", max_retries=0) as client:
+        counting = CountingClient(client)
+        results, stats = await run_batch(
+            JOB_DESCRIPTION, resumes, "gpt-4o", args.concurrency, client=counting, top_k=top_k
+        )
+    return results, stats, counting.cost()
+
+
+def run(args, base_url, resumes, top_k):
+    start = time.perf_counter()
+    results, stats, cost = asyncio.run(score(args, base_url, resumes, top_k))
+    return results, stats, time.perf_counter() - start, cost
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--resumes", type=int, default=500)
+    parser.add_argument("--top-k", type=int, nargs="+", default=[25, 50, 100])
+    parser.add_argument("--latency", type=float, default=0.3, help="Seconds every stub completion takes.")
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    server = serve(latency=args.latency, max_in_flight=args.concurrency * 2)
+    base_url = f"http://127.0.0.1:{server.server_port}/v1"
+    resumes = make_corpus(args.resumes)
+
+    start = time.perf_counter()
+    shortlist(JOB_DESCRIPTION, resumes, max(args.top_k))
+    print(f"{len(resumes)} resumes, TF-IDF pre-ranking alone: {(time.perf_counter() - start) * 1000:.0f} ms\n")
+
+    results, stats, elapsed, cost = run(args, base_url, resumes, None)
+    best = {result["file"] for result in results[:10]}
+    print(f"{'score all':<12}: {elapsed:6.1f}s  {stats['llm_calls']:5} LLM calls  ~${cost:.3f}")
+
+    for top_k in args.top_k:
+        results, stats, shortlisted_elapsed, shortlisted_cost = run(args, base_url, resumes, top_k)
+        kept = len(best & {result["file"] for result in results if result["shortlisted"]})
+        print(f"{f'top-k={top_k}':<12}: {shortlisted_elapsed:6.1f}s  {stats['llm_calls']:5} LLM calls  "
+              f"~${shortlisted_cost:.3f}  ({elapsed / shortlisted_elapsed:.1f}x faster, "
+              f"{1 - shortlisted_cost / cost:.0%} cheaper, kept {kept}/10 of the top 10)")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Benchmark the streaming structured analysis against the blocking one on openai_stub.py.
+
+Usage: python bench_stream.py [--latency 0.5] [--tokens-per-second 60] [--runs 5]
+
+Reports the time until the score is on screen and until the whole analysis
+is, then repeats with one field garbled by the stub: the blocking path has
+to re-run the full analysis, the streaming path only re-requests that field.
+The stub garbles every full request, so the blocking path always uses all
+three of its attempts there.
+"""
+import argparse
+import statistics
+import time
+
+from openai import OpenAI
+
+from matching import match_messages, parse_match_json
+from openai_stub import serve
+from structured_match import stream_match_analysis, validate_fields
+
+JD = """Job Title: Data Engineer
+Required Skills: Python, SQL, Spark, Airflow, Kafka, Snowflake, Terraform, AWS
+Responsibilities: build batch and streaming pipelines, own data quality, model the warehouse"""
+RESUME = """Name: Ada Lovelace
+Skills: Python, Spark, Kafka, pandas, PostgreSQL, Docker
+Experience: built streaming pipelines processing 2B events a day; migrated the warehouse to Snowflake"""
+
+
+def blocking(client, model):
+    """The previous analyze_match: wait for the whole completion, parse, and start over if a field is bad."""
+    start = time.perf_counter()
+    calls = 0
+    while True:
+        calls += 1
+        response = client.chat.completions.create(model=model, messages=match_messages(JD, RESUME), temperature=0.2)
+        _, errors = validate_fields(parse_match_json(response.choices[0].message.content))
+        if not errors or calls == 3:
+            elapsed = time.perf_counter() - start
+            return elapsed, elapsed, calls
+
+
+def streaming(client, model):
+    start = time.perf_counter()
+    first = {}
+
+    def on_field(name, value):
+        first.setdefault(name, time.perf_counter() - start)
+
+    _, repairs = stream_match_analysis(client, JD, RESUME, model, on_field)
+    return first.get("score", float("nan")), time.perf_counter() - start, 1 + repairs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.5, help="Seconds to the first token.")
+    parser.add_argument("--tokens-per-second", type=float, default=60.0)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    for garble in (None, "summary"):
+        server = serve(latency=args.latency, tokens_per_second=args.tokens_per_second, garble_field=garble)
+        client = OpenAI(base_url=f"http://127.0.0.1:{server.server_port}/v1", api_key="stub")
+        print(f"garbled field: {garble or 'none'}")
+        for label, analyze in (("blocking", blocking), ("streaming", streaming)):
+            runs = [analyze(client, "gpt-4o") for _ in range(args.runs)]
+            score, total, calls = (statistics.median(values) for values in zip(*runs))
+            print(f"  {label:<10}: score shown after {score:5.2f}s, full analysis after {total:5.2f}s, {calls:.0f} calls")
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
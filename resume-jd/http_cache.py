@@ -0,0 +1,221 @@
+# Vendored copy: webchat/src/utils/http_cache.py and
+# resume-jd/http_cache.py are identical, since each demo installs and runs on its own.
+# Make every change in both.
+import hashlib
+import json
+import os
+import threading
+import time
+from urllib.parse import urldefrag, urlparse, urlunparse
+
+import requests
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+    }
+
+default_cache_dir = os.getenv(
+    'HTTP_CACHE_DIR',
+    os.path.join(os.path.expanduser('~'), '.cache', 'genai-demos', 'http'),
+)
+
+def normalize_url(url):
+    """
+    Normalize a URL so that trivially different spellings of a page dedupe together.
+
+    Drops the fragment and default ports, lowercases scheme and host and
+    gives an empty path a trailing slash.
+
+    Args:
+    url (str): The URL to normalize.
+
+    Returns:
+    str: The normalized URL.
+    """
+    url, _ = urldefrag(url)
+    parsed = urlparse(url)
+    scheme = parsed.scheme.lower()
+    netloc = parsed.netloc.lower()
+    if (scheme, parsed.port) in (('http', 80), ('https', 443)):
+        netloc = netloc.rsplit(':', 1)[0]
+    return urlunparse((scheme, netloc, parsed.path or '/', parsed.params, parsed.query, ''))
+
+class CachedResponse:
+    """
+    The parts of an HTTP response the scrapers use, served from the network or the cache.
+    """
+
+    def __init__(self, url, status_code, headers, content, encoding=None, from_cache=False):
+        self.url = url
+        self.status_code = status_code
+        self.headers = requests.structures.CaseInsensitiveDict(headers)
+        self.content = content
+        self.encoding = encoding
+        self.from_cache = from_cache
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding or 'utf-8', errors='replace')
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    def raise_for_status(self):
+        if not self.ok:
+            raise requests.HTTPError(f'{self.status_code} error for url: {self.url}')
+
+class HttpCache:
+    """
+    On-disk HTTP cache that revalidates stale pages with conditional GETs.
+
+    Successful responses are stored under the SHA-256 of their normalized URL,
+    together with their ETag and Last-Modified validators. Within `ttl` seconds
+    a cached page is served without touching the network; after that it is
+    revalidated with If-None-Match / If-Modified-Since, so a page that did not
+    change costs a bodyless 304. Beyond `max_bytes` the least recently used
+    pages are evicted.
+
+    Args:
+    directory (str): Directory holding the cached responses.
+    ttl (float): Seconds a cached page is used without revalidation.
+    max_bytes (int): Maximum total size of the cached bodies.
+    """
+
+    def __init__(self, directory=default_cache_dir, ttl=3600, max_bytes=500_000_000):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._size = sum(entry.stat().st_size for entry in os.scandir(directory) if entry.name.endswith('.body'))
+
+    def _paths(self, url):
+        key = hashlib.sha256(normalize_url(url).encode('utf-8')).hexdigest()
+        base = os.path.join(self.directory, key)
+        return base + '.json', base + '.body'
+
+    def _load(self, url):
+        meta_path, body_path = self._paths(url)
+        try:
+            with open(meta_path, encoding='utf-8') as f:
+                meta = json.load(f)
+            with open(body_path, 'rb') as f:
+                body = f.read()
+        except (OSError, ValueError):
+            return None, None
+        return meta, body
+
+    def _write(self, path, data):
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def _store(self, url, meta, body):
+        meta_path, body_path = self._paths(url)
+        try:
+            old_size = os.path.getsize(body_path)
+        except OSError:
+            old_size = 0
+        self._write(body_path, body)
+        self._write(meta_path, json.dumps(meta).encode('utf-8'))
+        with self._lock:
+            self._size += len(body) - old_size
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _touch(self, url, meta):
+        meta_path, body_path = self._paths(url)
+        self._write(meta_path, json.dumps(meta).encode('utf-8'))
+        os.utime(body_path)
+
+    def _evict(self):
+        # Called with the lock held; the body's mtime records its last use
+        entries = [entry for entry in os.scandir(self.directory) if entry.name.endswith('.body')]
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in entries:
+            if self._size <= self.max_bytes * 0.9:
+                break
+            size = entry.stat().st_size
+            for path in (entry.path, entry.path[:-len('.body')] + '.json'):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self._size -= size
+
+    def get(self, url, session=None, timeout=10, max_bytes=None):
+        """
+        Fetch a URL through the cache.
+
+        Args:
+        url (str): The URL to fetch.
+        session (requests.Session): Session used for network requests, defaults to `requests`.
+        timeout (float): Seconds to wait for the server before giving up.
+        max_bytes (int): Larger bodies are cut off at this size, and are not cached.
+
+        Returns:
+        CachedResponse: The response; `from_cache` is True when no body was downloaded.
+        """
+        meta, body = self._load(url)
+        if meta is not None and time.time() - meta['fetched_at'] < self.ttl:
+            self.hits += 1
+            os.utime(self._paths(url)[1])
+            return CachedResponse(url, 200, meta['headers'], body, meta['encoding'], from_cache=True)
+
+        headers = {} if session is not None else dict(HEADERS)
+        if meta is not None:
+            if meta['headers'].get('ETag'):
+                headers['If-None-Match'] = meta['headers']['ETag']
+            if meta['headers'].get('Last-Modified'):
+                headers['If-Modified-Since'] = meta['headers']['Last-Modified']
+
+        with (session or requests).get(url, headers=headers, timeout=timeout, stream=True) as response:
+            if response.status_code == 304 and meta is not None:
+                self.revalidated += 1
+                meta['fetched_at'] = time.time()
+                self._touch(url, meta)
+                return CachedResponse(url, 200, meta['headers'], body, meta['encoding'], from_cache=True)
+
+            self.misses += 1
+            # One byte past the limit tells a body that was cut off from one of exactly max_bytes
+            content = response.raw.read(max_bytes + 1, decode_content=True) if max_bytes else response.content
+            truncated = bool(max_bytes) and len(content) > max_bytes
+            content = content[:max_bytes] if truncated else content
+            kept = {name: response.headers[name] for name in ('Content-Type', 'ETag', 'Last-Modified')
+                    if name in response.headers}
+            fresh = CachedResponse(url, response.status_code, kept, content, response.encoding)
+            # A truncated body must not be served, or revalidated with its validators, to later callers
+            if (response.status_code == 200 and not truncated
+                    and 'no-store' not in response.headers.get('Cache-Control', '')):
+                meta = {'url': url, 'fetched_at': time.time(), 'encoding': response.encoding, 'headers': kept}
+                self._store(url, meta, content)
+            return fresh
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'revalidated': self.revalidated,
+            'misses': self.misses,
+            'bytes': self._size,
+        }
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+def get_default_cache():
+    """
+    The HTTP cache shared by the scrapers, created on first use in `HTTP_CACHE_DIR`.
+
+    Returns:
+    HttpCache: The shared cache.
+    """
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = HttpCache()
+        return _default_cache
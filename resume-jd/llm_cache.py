@@ -0,0 +1,114 @@
+"""Persistent cache of cleaning and match results, shared by every session and process on the machine."""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+
+from matching import CLEANING_MODEL, PROMPT_VERSION
+
+default_cache_path = os.getenv(
+    "LLM_CACHE_PATH",
+    os.path.join(os.path.expanduser("~"), ".cache", "genai-demos", "llm.sqlite3"),
+)
+
+def text_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def cache_key(kind, model, *texts):
+    """Key of one LLM result: the SHA-256 of its inputs, the model and the prompt version."""
+    parts = [kind, model, PROMPT_VERSION, *map(text_hash, texts)]
+    return hashlib.sha256("\0".join(parts).encode()).hexdigest()
+
+def cleaning_key(text, text_type, model=CLEANING_MODEL):
+    return cache_key(f"clean:{text_type}", model, text)
+
+def match_key(jd_text, resume_text, model):
+    return cache_key("match", model, jd_text, resume_text)
+
+class LLMCache:
+    """
+    SQLite-backed store of JSON-serializable LLM results.
+
+    SQLite handles the locking, so Streamlit sessions, batch runs and CLI
+    processes can share one file. Entries unused for `max_age` seconds are
+    dropped, and beyond `max_entries` the least recently used ones go first.
+    """
+
+    def __init__(self, path=default_cache_path, max_entries=20_000, max_age=30 * 24 * 3600, evict_every=100):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.evict_every = evict_every
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "key TEXT PRIMARY KEY, kind TEXT, model TEXT, value TEXT, created REAL, accessed REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)")
+        self.evict()
+
+    def _connect(self):
+        # One short-lived connection per call keeps the cache safe to use from any thread
+        return sqlite3.connect(self.path, timeout=30)
+
+    def get(self, key):
+        """The cached result for `key`, or None."""
+        with closing(self._connect()) as conn, conn:
+            row = conn.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                conn.execute("UPDATE results SET accessed = ? WHERE key = ?", (time.time(), key))
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key, value, kind="", model=""):
+        """Store a result; `kind` and `model` are kept for inspection only."""
+        now = time.time()
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO results (key, kind, model, value, created, accessed) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, kind, model, json.dumps(value), now, now),
+            )
+        with self._lock:
+            self._writes += 1
+            due = self._writes % self.evict_every == 0
+        if due:
+            self.evict()
+
+    def evict(self):
+        """Drop expired entries, then the least recently used ones beyond `max_entries`."""
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM results WHERE accessed < ?", (time.time() - self.max_age,))
+            conn.execute(
+                "DELETE FROM results WHERE key IN "
+                "(SELECT key FROM results ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def stats(self):
+        with closing(self._connect()) as conn:
+            entries = conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        return {"entries": entries, "hits": self.hits, "misses": self.misses}
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+def get_llm_cache():
+    """The LLM result cache shared by the app, the batch page and the CLI, created on first use in `LLM_CACHE_PATH`."""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = LLMCache()
+        return _default_cache
@@ -0,0 +1,141 @@
+"""Prompts, text extraction and response parsing shared by the app, the batch page and the CLI."""
+import hashlib
+import json
+import re
+from io import BytesIO
+
+import docx
+import PyPDF2
+from bs4 import BeautifulSoup
+
+from http_cache import get_default_cache
+
+CLEANING_MODEL = "gpt-3.5-turbo"  # Using a faster model for preprocessing
+CLEANING_SYSTEM_PROMPT = "You are an expert at extracting relevant information from text."
+MATCH_SYSTEM_PROMPT = "You are an expert ATS system and career advisor."
+
+# ------------- TEXT EXTRACTION -------------
+def pdf_text(pdf_file):
+    """Extract text from a PDF file object."""
+    pdf_reader = PyPDF2.PdfReader(pdf_file)
+    text = ""
+    for page in pdf_reader.pages:
+        page_text = page.extract_text()
+        if page_text:
+            text += page_text
+    return text
+
+def docx_text(docx_file):
+    """Extract text from a DOCX file object."""
+    doc = docx.Document(docx_file)
+    return "\n".join([para.text for para in doc.paragraphs])
+
+def url_text(url):
+    """Extract readable text from a webpage, fetched through the shared HTTP cache."""
+    response = get_default_cache().get(url, timeout=10)
+    response.raise_for_status()
+    soup = BeautifulSoup(response.text, 'html.parser')
+
+    # Remove script and style elements
+    for script in soup(["script", "style"]):
+        script.extract()
+
+    # Break into lines, remove leading and trailing space and blank lines
+    lines = [line.strip() for line in soup.get_text(separator="\n").splitlines()]
+    return "\n".join([line for line in lines if line])
+
+def extract_text_from_bytes(name, data):
+    """Extract text from an uploaded PDF, DOCX or plain-text file given its name and content."""
+    lowered = name.lower()
+    if lowered.endswith(".pdf"):
+        return pdf_text(BytesIO(data))
+    if lowered.endswith(".docx"):
+        return docx_text(BytesIO(data))
+    if lowered.endswith((".txt", ".md")):
+        return data.decode("utf-8", errors="replace")
+    raise ValueError(f"Unsupported file type: {name}")
+
+# ------------- PROMPTS -------------
+def cleaning_prompt(text, text_type):
+    """Prompt that extracts only the relevant information from a job description or a resume."""
+    if text_type == "job_description":
+        return f"""Extract and organize only the relevant information from this job description:
+{text}
+
+Format your response as follows:
+Company: [company name]
+Job Title: [job title]
+Location: [location]
+Job Type: [full-time/part-time/contract]
+Required Skills: [list of key skills]
+Responsibilities: [bullet points of main responsibilities]
+Qualifications: [bullet points of required qualifications]
+Benefits: [any mentioned benefits]
+
+Remove any redundant information, advertisements, or irrelevant content.
+"""
+    # resume
+    return f"""Extract and organize only the relevant information from this resume:
+{text}
+
+Format your response as follows:
+Name: [candidate name]
+Contact Information: [email/phone]
+Professional Summary: [brief summary]
+Skills: [list of key skills]
+Experience: [bullet points of relevant experience]
+Education: [education details]
+Certifications: [any certifications]
+
+Remove any redundant information or irrelevant content.
+"""
+
+def cleaning_messages(text, text_type):
+    return [
+        {"role": "system", "content": CLEANING_SYSTEM_PROMPT},
+        {"role": "user", "content": cleaning_prompt(text, text_type)},
+    ]
+
+def match_prompt(jd_text, resume_text):
+    """Prompt that scores a resume against a job description and asks for a JSON analysis."""
+    return f"""
+You are an expert ATS (Applicant Tracking System) and career advisor. Analyze the match between the job description and resume provided below.
+
+JOB DESCRIPTION:
+{jd_text}
+
+RESUME:
+{resume_text}
+
+Provide a detailed analysis in JSON format with the following structure:
+1. "score": A number from 0-10 indicating how well the resume matches the job description
+2. "feedback": An array of specific improvement suggestions (at least 3)
+3. "name": The candidate's name extracted from the resume
+4. "summary": A professional third-person summary of the candidate's qualifications as they relate to the job (3-4 sentences)
+5. "attractive_points": An array of 5 specific points that make this candidate's profile attractive for this role
+6. "fit_explanation": A paragraph explaining why this candidate is a good fit for the role, referencing specific requirements from the job description
+
+For the summary and attractive points, focus on highlighting the candidate's strengths that directly match the job requirements.
+
+Return ONLY the JSON object without any additional text.
+"""
+
+def match_messages(jd_text, resume_text):
+    return [
+        {"role": "system", "content": MATCH_SYSTEM_PROMPT},
+        {"role": "user", "content": match_prompt(jd_text, resume_text)},
+    ]
+
+# Changes whenever a prompt template changes, so cached results of old prompts are never reused
+PROMPT_VERSION = hashlib.sha256("\0".join([
+    CLEANING_SYSTEM_PROMPT,
+    MATCH_SYSTEM_PROMPT,
+    cleaning_prompt("{text}", "job_description"),
+    cleaning_prompt("{text}", "resume"),
+    match_prompt("{jd}", "{resume}"),
+]).encode()).hexdigest()[:12]
+
+def parse_match_json(result):
+    """Pull the JSON object out of a match completion; raises ValueError when there is none."""
+    json_match = re.search(r'({[\s\S]*})', result)
+    return json.loads(json_match.group(0) if json_match else result)
@@ -0,0 +1,196 @@
+"""Local stand-in for the OpenAI chat API, for running batch matching without spend.
+
+Usage:
+    python openai_stub.py --port 8003 --latency 1.0 --max-in-flight 16
+    OPENAI_BASE_URL=http://127.0.0.1:8003/v1 OPENAI_API_KEY=stub python batch.py jd.pdf resumes/
+
+Supported endpoint:
+    POST /v1/chat/completions   cleaning prompts are echoed back; match prompts get a JSON
+                                analysis scored by keyword overlap between JD and resume.
+                                "stream": true is answered with server-sent chunks, and a
+                                json_schema response_format limits the analysis to its properties
+
+Requests beyond --max-in-flight concurrent ones are rejected with 429 and a
+Retry-After header, like an account hitting its rate limit. --latency is the
+time to the first token; --tokens-per-second adds generation time on top.
+--garble-field returns that analysis field empty or mistyped whenever it is
+requested along with others, to exercise per-field repair.
+"""
+import argparse
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from matching import CLEANING_SYSTEM_PROMPT
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is", "of", "on",
+    "or", "the", "to", "we", "with", "you", "your", "our", "will", "has", "have",
+}
+
+
+def keywords(text):
+    return {word for word in re.findall(r"[a-z][a-z+#.]+", text.lower()) if word not in STOPWORDS}
+
+
+def fake_analysis(prompt):
+    jd = prompt.split("JOB DESCRIPTION:", 1)[-1].split("RESUME:", 1)[0]
+    resume = prompt.split("RESUME:", 1)[-1].split("Provide a detailed analysis", 1)[0]
+    jd_words, resume_words = keywords(jd), keywords(resume)
+    overlap = len(jd_words & resume_words) / max(len(jd_words), 1)
+    name_match = re.search(r"Name:\s*(.+)", resume)
+    name = name_match.group(1).strip() if name_match else resume.strip().splitlines()[0].strip() if resume.strip() else ""
+    missing = sorted(jd_words - resume_words)[:3] or ["quantified achievements"]
+    shared = sorted(jd_words & resume_words)[:5]
+    return {
+        "score": round(min(10.0, 10 * overlap * 1.5), 1),
+        "feedback": [f"Mention experience with {word}." for word in missing],
+        "name": name,
+        "summary": f"{name} brings experience in {', '.join(shared) or 'unrelated areas'}.",
+        "attractive_points": [f"Hands-on with {word}." for word in shared],
+        "fit_explanation": f"The resume covers {len(jd_words & resume_words)} of the {len(jd_words)} "
+                           f"keywords in the job description.",
+    }
+
+
+GARBLED = {str: "", list: [], float: "n/a"}
+
+
+def fake_reply(messages, response_format=None, garble_field=None):
+    system = messages[0]["content"] if messages else ""
+    # Repair requests append turns after the match prompt, so read the first user message
+    prompt = next((message["content"] for message in messages if message["role"] == "user"), "")
+    if system == CLEANING_SYSTEM_PROMPT:
+        # Echo the document back: the stub does not summarize
+        return prompt.split(":\n", 1)[-1].split("\n\nFormat your response", 1)[0].strip()
+    analysis = fake_analysis(prompt)
+    if (response_format or {}).get("type") == "json_schema":
+        properties = response_format["json_schema"]["schema"]["properties"]
+        analysis = {name: analysis[name] for name in properties if name in analysis}
+    if garble_field in analysis and len(analysis) > 1:
+        analysis[garble_field] = GARBLED[type(analysis[garble_field])]
+    return json.dumps(analysis)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    latency = 0.0
+    tokens_per_second = None
+    garble_field = None
+    max_in_flight = 16
+    in_flight = 0
+    requests_served = 0
+    rate_limited = 0
+    lock = threading.Lock()
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _stream(self, payload, content):
+        # Server-sent events, one chunk per ~token, closing the connection to end the body
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        delay = 1 / self.tokens_per_second if self.tokens_per_second else 0.0
+
+        def send(delta, finish_reason=None):
+            chunk = {
+                "id": "chatcmpl-stub",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": payload.get("model", ""),
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.flush()
+
+        send({"role": "assistant", "content": ""})
+        for start in range(0, len(content), 4):
+            time.sleep(delay)
+            send({"content": content[start:start + 4]})
+        send({}, "stop")
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        if not self.path.endswith("/chat/completions"):
+            self._send(404, json.dumps({"error": {"message": f"Not stubbed: {self.path}"}}).encode())
+            return
+
+        cls = type(self)
+        with cls.lock:
+            if cls.in_flight >= cls.max_in_flight:
+                cls.rate_limited += 1
+                limited = True
+            else:
+                cls.in_flight += 1
+                limited = False
+        if limited:
+            error = {"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}}
+            self._send(429, json.dumps(error).encode(), {"Retry-After": "0.5"})
+            return
+
+        try:
+            time.sleep(self.latency)
+            content = fake_reply(payload.get("messages", []), payload.get("response_format"), self.garble_field)
+            if payload.get("stream"):
+                self._stream(payload, content)
+                return
+            if self.tokens_per_second:
+                time.sleep(len(content) / 4 / self.tokens_per_second)
+            body = {
+                "id": "chatcmpl-stub",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": payload.get("model", ""),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+            }
+            self._send(200, json.dumps(body).encode())
+        finally:
+            with cls.lock:
+                cls.in_flight -= 1
+                cls.requests_served += 1
+
+
+def serve(port=0, latency=0.0, max_in_flight=16, tokens_per_second=None, garble_field=None):
+    """Start the stub on a background thread and return it; ``server.handler`` has the request counters."""
+    handler = type("Handler", (StubHandler,), {
+        "latency": latency, "max_in_flight": max_in_flight, "lock": threading.Lock(),
+        "tokens_per_second": tokens_per_second, "garble_field": garble_field,
+    })
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.handler = handler
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a stub OpenAI chat API locally.")
+    parser.add_argument("--port", type=int, default=8003)
+    parser.add_argument("--latency", type=float, default=1.0, help="Seconds every completion takes.")
+    parser.add_argument("--max-in-flight", type=int, default=16, help="Concurrent requests before 429s.")
+    parser.add_argument("--tokens-per-second", type=float, default=None, help="Generation speed after the first token.")
+    parser.add_argument("--garble-field", default=None, help="Analysis field to return empty or mistyped.")
+    args = parser.parse_args()
+    server = serve(args.port, args.latency, args.max_in_flight, args.tokens_per_second, args.garble_field)
+    print(f"stub OpenAI API on http://127.0.0.1:{server.server_port}/v1")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
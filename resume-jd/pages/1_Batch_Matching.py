@@ -0,0 +1,122 @@
+import asyncio
+import os
+
+import streamlit as st
+from dotenv import load_dotenv
+
+from batch import extract_documents, run_batch, to_csv, to_json
+from llm_cache import get_llm_cache
+from matching import extract_text_from_bytes, url_text
+
+# ------------- ENVIRONMENT & PAGE SETUP -------------
+load_dotenv()
+
+if 'batch_results' not in st.session_state:
+    st.session_state.batch_results = None
+if 'batch_stats' not in st.session_state:
+    st.session_state.batch_stats = None
+
+st.set_page_config(
+    page_title="Batch Resume Matching",
+    page_icon="📋",
+    layout="wide",
+    initial_sidebar_state="expanded"
+)
+
+with st.sidebar:
+    st.header("OpenAI API Configuration")
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        api_key = st.text_input("Enter your OpenAI API key:", type="password")
+        if api_key:
+            os.environ["OPENAI_API_KEY"] = api_key
+    else:
+        st.success("API key loaded from environment!")
+
+    st.header("Batch Settings")
+    model = st.selectbox("Select Model:", ["gpt-4o", "gpt-4", "gpt-3.5-turbo"], index=0)
+    concurrency = st.slider("Concurrent requests", min_value=1, max_value=32, value=8,
+                            help="LLM requests in flight at once. Rate-limited requests are retried with backoff.")
+    top_k = st.number_input("Shortlist size (0 = score all)", min_value=0, value=0, step=5,
+                            help="Only the resumes most similar to the JD (TF-IDF) get the full LLM analysis.")
+    clean = st.checkbox("Clean documents with the LLM first", value=True,
+                        help="Doubles the LLM calls, like the single-resume page.")
+
+# ------------- INPUTS -------------
+st.markdown('<h1 style="text-align: center;">📋 Batch Resume Matching</h1>', unsafe_allow_html=True)
+
+col1, col2 = st.columns(2)
+
+with col1:
+    st.header("Job Description")
+    jd_source = st.radio("Select Job Description source:", ["Upload File", "Enter URL"], horizontal=True)
+    jd_text = ""
+    if jd_source == "Upload File":
+        jd_file = st.file_uploader("Upload Job Description (PDF, DOCX or TXT)", type=["pdf", "docx", "txt"])
+        if jd_file is not None:
+            try:
+                jd_text = extract_text_from_bytes(jd_file.name, jd_file.getvalue())
+            except Exception as e:
+                st.error(f"Job description extraction error: {e}")
+    else:
+        jd_url = st.text_input("Enter Job Description URL:")
+        if jd_url:
+            try:
+                jd_text = url_text(jd_url)
+            except Exception as e:
+                st.error(f"URL extraction error: {e}")
+
+with col2:
+    st.header("Resumes")
+    resume_files = st.file_uploader("Upload Resumes (PDF, DOCX or TXT)", type=["pdf", "docx", "txt"],
+                                    accept_multiple_files=True)
+    if resume_files:
+        st.caption(f"{len(resume_files)} resumes selected")
+
+# ------------- BATCH RUN -------------
+if st.button("Rank Resumes", disabled=not (jd_text and resume_files and api_key)):
+    with st.spinner("Extracting text..."):
+        documents = extract_documents([(file.name, file.getvalue()) for file in resume_files])
+    for name, _, error in documents:
+        if error:
+            st.warning(f"Skipping {name}: {error}")
+    resumes = [(name, text) for name, text, error in documents if not error]
+
+    progress = st.progress(0.0, text="Scoring resumes...")
+
+    def report(result, done, total):
+        progress.progress(done / total, text=f"Scored {done} of {total} resumes")
+
+    results, stats = asyncio.run(run_batch(
+        jd_text, resumes, model, concurrency, clean=clean, on_result=report, top_k=int(top_k),
+        cache=get_llm_cache(),
+    ))
+    progress.empty()
+    st.session_state.batch_results = results
+    st.session_state.batch_stats = stats
+
+# ------------- RESULTS -------------
+if st.session_state.batch_results:
+    results = st.session_state.batch_results
+    stats = st.session_state.batch_stats
+
+    st.header("Ranking")
+    if stats["jd_cleaning_error"]:
+        st.warning(f"The job description could not be cleaned and was used as extracted: {stats['jd_cleaning_error']}")
+    st.caption(
+        f"{stats['scored']}/{stats['resumes']} resumes scored ({stats['shortlisted']} shortlisted) in {stats['elapsed']:.1f}s "
+        f"({stats['analyzed']} analyzed by the LLM at {stats['per_minute']:.0f}/min, {stats['cache_hits']} cache hits, "
+        f"{stats['llm_calls']} LLM calls, {stats['retries']} retries)"
+    )
+    st.dataframe(
+        [{**result, "feedback": " | ".join(result.get("feedback") or [])} for result in results],
+        column_order=["rank", "score", "similarity", "name", "file", "summary", "feedback", "error"],
+        hide_index=True,
+        use_container_width=True,
+    )
+
+    download_csv, download_json = st.columns(2)
+    with download_csv:
+        st.download_button("Download CSV", to_csv(results), file_name="ranking.csv", mime="text/csv")
+    with download_json:
+        st.download_button("Download JSON", to_json(results), file_name="ranking.json", mime="application/json")
@@ -0,0 +1,90 @@
+"""Fast local pre-ranking of resumes against a job description with TF-IDF cosine similarity.
+
+Used to shortlist the resumes worth a full LLM match analysis. Only the
+terms of the job description can contribute to a resume's similarity, so
+the matrix is built over the JD vocabulary alone; each resume's norm is
+still taken over all of its terms, so keyword-stuffed or very long
+resumes are not favoured.
+"""
+import math
+import re
+from collections import Counter
+
+import numpy as np
+
+STOPWORDS = frozenset("""
+a about above after all also an and any are as at be been being both but by can could did do does
+for from had has have having he her here him his how i if in into is it its just may me more most
+my no not of on or our out over own she should so some such than that the their them then there
+these they this those through to too under up very was we were what when where which while who
+will with would you your
+""".split())
+
+TOKEN_PATTERN = re.compile(r"[a-z][a-z0-9+#]*(?:\.[a-z0-9]+)*")
+
+
+def tokenize(text):
+    """Lowercase terms without stopwords; keeps tokens like c++, c#, node.js."""
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS and len(token) > 1]
+
+
+def similarities(jd_text, resume_texts):
+    """
+    Cosine similarity between the job description and each resume.
+
+    Term frequencies are sublinear (1 + log tf) and weighted by a smoothed
+    IDF computed over the resumes and the JD together.
+
+    Returns:
+        numpy.ndarray: One similarity in [0, 1] per resume.
+    """
+    jd_counts = Counter(tokenize(jd_text))
+    resume_counts = [Counter(tokenize(text)) for text in resume_texts]
+    if not jd_counts or not resume_counts:
+        return np.zeros(len(resume_counts))
+
+    vocabulary = {term: column for column, term in enumerate(jd_counts)}
+    document_frequency = Counter(term for counts in resume_counts for term in counts)
+    document_frequency.update(jd_counts.keys())
+    n_documents = len(resume_counts) + 1
+    idf = {term: math.log((1 + n_documents) / (1 + frequency)) + 1 for term, frequency in document_frequency.items()}
+
+    jd_vector = np.array([(1 + math.log(jd_counts[term])) * idf[term] for term in vocabulary])
+    jd_vector /= np.linalg.norm(jd_vector)
+
+    matrix = np.zeros((len(resume_counts), len(vocabulary)))
+    norms = np.zeros(len(resume_counts))
+    for row, counts in enumerate(resume_counts):
+        squared = 0.0
+        for term, count in counts.items():
+            weight = (1 + math.log(count)) * idf[term]
+            squared += weight * weight
+            column = vocabulary.get(term)
+            if column is not None:
+                matrix[row, column] = weight
+        norms[row] = math.sqrt(squared)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        scores = matrix @ jd_vector / norms
+    return np.nan_to_num(scores)
+
+
+def shortlist(jd_text, resumes, top_k):
+    """
+    Keep the `top_k` resumes most similar to the job description.
+
+    Args:
+        jd_text (str): The job description.
+        resumes (list): (name, text) pairs.
+        top_k (int): Resumes to keep; None or 0 keeps all of them.
+
+    Returns:
+        tuple: (shortlisted, skipped) lists of (name, text, similarity), most similar first.
+    """
+    scores = similarities(jd_text, [text for _, text in resumes])
+    # Stable sort so equal similarities keep the upload order
+    order = np.argsort(-scores, kind="stable")
+    ranked = [(*resumes[index], float(scores[index])) for index in order]
+    if not top_k:
+        return ranked, []
+    return ranked[:top_k], ranked[top_k:]
@@ -0,0 +1,358 @@
+"""Streaming, schema-validated match analysis.
+
+The match completion is requested as structured output and streamed.
+Each top-level field is handed to the caller as soon as its JSON value is
+complete, so the score shows up long before the summary. The result is
+validated against `MatchAnalysis`, and only the fields that fail are asked
+for again, so a completion with one bad field is never thrown away.
+"""
+import json
+import re
+from typing import Annotated, List
+
+from pydantic import BaseModel, BeforeValidator, Field, TypeAdapter, ValidationError
+
+from matching import MATCH_SYSTEM_PROMPT, match_messages, match_prompt
+
+# Property order is generation order: the score streams first
+MATCH_FIELDS = {
+    "score": {"type": "number", "description": "How well the resume matches the job description, from 0 to 10."},
+    "feedback": {"type": "array", "items": {"type": "string"}, "description": "At least 3 improvement suggestions."},
+    "name": {"type": "string", "description": "The candidate's name."},
+    "summary": {"type": "string", "description": "A third-person summary of the candidate for this job, 3-4 sentences."},
+    "attractive_points": {"type": "array", "items": {"type": "string"}, "description": "5 strengths for this role."},
+    "fit_explanation": {"type": "string", "description": "Why the candidate fits, citing the job requirements."},
+}
+
+
+def _parse_score(value):
+    # Models sometimes answer "8/10" or "7.5 out of 10"
+    if isinstance(value, str):
+        number = re.match(r"\s*(\d+(?:\.\d+)?)", value)
+        if number:
+            return float(number.group(1))
+    return value
+
+
+def _split_lines(value):
+    if isinstance(value, str):
+        return [line.strip(" -*•\t") for line in value.splitlines() if line.strip(" -*•\t")]
+    return value
+
+
+Score = Annotated[float, BeforeValidator(_parse_score), Field(ge=0, le=10)]
+Items = Annotated[List[str], BeforeValidator(_split_lines), Field(min_length=1)]
+Text = Annotated[str, Field(min_length=1)]
+
+
+class MatchAnalysis(BaseModel):
+    score: Score
+    feedback: Items
+    name: str
+    summary: Text
+    attractive_points: Items
+    fit_explanation: Text
+
+
+# One validator per field, so a streamed field can be checked before the rest arrive
+FIELD_ADAPTERS = {name: TypeAdapter(annotation) for name, annotation in MatchAnalysis.__annotations__.items()}
+
+
+class IncompleteAnalysis(ValueError):
+    """Raised when some fields are still invalid after the repair attempts; `fields` holds the valid ones."""
+
+    def __init__(self, fields, errors):
+        super().__init__("Invalid fields in the analysis: " + "; ".join(f"{name}: {error}" for name, error in errors.items()))
+        self.fields = fields
+        self.errors = errors
+
+
+def response_format(model, fields=MATCH_FIELDS):
+    """Strict JSON schema for models with structured outputs, JSON mode for older ones, else nothing."""
+    if model.startswith("gpt-4o"):
+        return {
+            "type": "json_schema",
+            "json_schema": {
+                "name": "match_analysis",
+                "strict": True,
+                "schema": {
+                    "type": "object",
+                    "properties": fields,
+                    "required": list(fields),
+                    "additionalProperties": False,
+                },
+            },
+        }
+    if model.startswith(("gpt-3.5-turbo", "gpt-4-turbo")):
+        return {"type": "json_object"}
+    return None
+
+
+LITERAL_PATTERN = re.compile(r"[^,}\]\s]*")
+
+
+def _scan_string(buffer, start):
+    """Index just past the JSON string starting at `start`, or None if it is not complete yet."""
+    position = start + 1
+    while position < len(buffer):
+        char = buffer[position]
+        if char == "\\":
+            position += 2
+            continue
+        if char == '"':
+            return position + 1
+        position += 1
+    return None
+
+
+def _scan_value(buffer, start):
+    """Index just past the JSON value starting at `start`, or None if it is not complete yet."""
+    first = buffer[start]
+    if first == '"':
+        return _scan_string(buffer, start)
+    if first in "[{":
+        depth = 0
+        position = start
+        while position < len(buffer):
+            char = buffer[position]
+            if char == '"':
+                position = _scan_string(buffer, position)
+                if position is None:
+                    return None
+                continue
+            if char in "[{":
+                depth += 1
+            elif char in "]}":
+                depth -= 1
+                if depth == 0:
+                    return position + 1
+            position += 1
+        return None
+    # Numbers and literals end at the next delimiter, which may not have arrived yet
+    match = LITERAL_PATTERN.match(buffer, start)
+    return match.end() if match.end() < len(buffer) else None
+
+
+class FieldStream:
+    """
+    Incremental parser for a streamed JSON object.
+
+    `feed` returns the (name, value) pairs of the top-level fields completed
+    by the new text. Text before the opening brace is skipped, so it works
+    without JSON mode too. A value that is complete but not valid JSON is
+    kept in `invalid` for repair instead of stopping the stream.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.position = 0
+        self.state = "start"
+        self.key = None
+        self.fields = {}
+        self.invalid = {}
+
+    def feed(self, text):
+        self.buffer += text
+        completed = []
+        while True:
+            while self.position < len(self.buffer) and self.buffer[self.position].isspace():
+                self.position += 1
+            if self.position >= len(self.buffer) or self.state == "done":
+                return completed
+            char = self.buffer[self.position]
+            if self.state == "start":
+                brace = self.buffer.find("{", self.position)
+                if brace < 0:
+                    self.position = len(self.buffer)
+                    return completed
+                self.position, self.state = brace + 1, "key"
+            elif self.state == "key":
+                if char != '"':
+                    # A closing brace, or output that is not JSON: the remaining fields will be repaired
+                    self.position, self.state = self.position + 1, "done"
+                    continue
+                end = _scan_string(self.buffer, self.position)
+                if end is None:
+                    return completed
+                self.key = json.loads(self.buffer[self.position:end])
+                self.position, self.state = end, "colon"
+            elif self.state == "colon":
+                self.position, self.state = self.position + 1, "value" if char == ":" else "done"
+            elif self.state == "value":
+                end = _scan_value(self.buffer, self.position)
+                if end is None:
+                    return completed
+                raw = self.buffer[self.position:end]
+                try:
+                    self.fields[self.key] = json.loads(raw)
+                    completed.append((self.key, self.fields[self.key]))
+                except ValueError:
+                    self.invalid[self.key] = raw
+                self.position, self.state = end, "after"
+            elif self.state == "after":
+                self.position += 1
+                self.state = "key" if char == "," else "done"
+
+    def partial(self):
+        """(name, text so far) of a string field still being streamed, or None."""
+        if self.state != "value" or self.position >= len(self.buffer) or self.buffer[self.position] != '"':
+            return None
+        text = self.buffer[self.position + 1:]
+        # Drop a trailing half-received escape sequence before decoding
+        text = re.sub(r"\\(u[0-9a-fA-F]{0,3})?$", "", text)
+        try:
+            return self.key, json.loads(f'"{text}"')
+        except ValueError:
+            return None
+
+
+def validate_fields(fields):
+    """
+    Validate parsed fields one by one against `MatchAnalysis`.
+
+    Returns:
+        tuple: (valid fields with coerced values, {field name: error} for missing or invalid ones).
+    """
+    valid, errors = {}, {}
+    for name, adapter in FIELD_ADAPTERS.items():
+        if name not in fields:
+            errors[name] = "missing"
+            continue
+        try:
+            valid[name] = adapter.validate_python(fields[name])
+        except ValidationError as e:
+            errors[name] = e.errors()[0]["msg"]
+    return valid, errors
+
+
+def validate_analysis(fields):
+    """
+    Validate a complete analysis, such as a blocking completion or a cache entry.
+
+    Returns:
+        dict: The analysis with coerced values, e.g. a score of "8/10" becomes 8.0.
+
+    Raises:
+        IncompleteAnalysis: When fields are missing or invalid.
+    """
+    valid, errors = validate_fields(fields if isinstance(fields, dict) else {})
+    if errors:
+        raise IncompleteAnalysis(valid, errors)
+    return MatchAnalysis.model_validate(valid).model_dump()
+
+
+def cached_analysis(cache, key):
+    """The analysis cached under `key`, or None when there is none or it does not validate."""
+    cached = cache.get(key) if cache is not None else None
+    if cached is None:
+        return None
+    try:
+        return validate_analysis(cached)
+    except IncompleteAnalysis:
+        # Written before analyses were validated; analyze again and overwrite it
+        return None
+
+
+def repair_messages(jd_text, resume_text, valid, failing):
+    """Ask again for only the `failing` fields, showing the model the ones it already got right."""
+    return [
+        {"role": "system", "content": MATCH_SYSTEM_PROMPT},
+        {"role": "user", "content": match_prompt(jd_text, resume_text)},
+        {"role": "assistant", "content": json.dumps(valid)},
+        {"role": "user", "content": (
+            f"The fields {', '.join(failing)} were missing or invalid. Return ONLY a JSON object "
+            f"with exactly these fields: {', '.join(failing)}."
+        )},
+    ]
+
+
+def stream_completion(client, messages, model, fields, on_field=None, on_partial=None, temperature=0.2):
+    """
+    Stream one completion through a `FieldStream`.
+
+    Returns:
+        tuple: (parsed fields, raw values that were not valid JSON).
+    """
+    kwargs = {}
+    schema = response_format(model, fields)
+    if schema is not None:
+        kwargs["response_format"] = schema
+    stream = client.chat.completions.create(
+        model=model, messages=messages, temperature=temperature, stream=True, **kwargs
+    )
+    parser = FieldStream()
+    for chunk in stream:
+        if not chunk.choices or not chunk.choices[0].delta.content:
+            continue
+        for name, value in parser.feed(chunk.choices[0].delta.content):
+            if on_field is not None:
+                on_field(name, value)
+        partial = parser.partial() if on_partial is not None else None
+        if partial is not None:
+            on_partial(*partial)
+    return parser.fields, parser.invalid
+
+
+def stream_match_analysis(client, jd_text, resume_text, model, on_field=None, on_partial=None, max_repairs=2):
+    """
+    Analyze a JD and resume pair, streaming fields as they complete and repairing only invalid ones.
+
+    Args:
+        client (OpenAI): Client for the completions.
+        jd_text (str): The job description.
+        resume_text (str): The resume.
+        model (str): Model for the analysis.
+        on_field (callable): Called with (name, value) for every validated field, in streaming order.
+        on_partial (callable): Called with (name, text so far) while a string field of the schema
+            (name, summary, fit_explanation) streams; a score or list sent as a string is never passed.
+        max_repairs (int): Follow-up requests for fields that are missing or invalid.
+
+    Returns:
+        tuple: The validated analysis dict and the number of repair requests made.
+
+    Raises:
+        IncompleteAnalysis: When fields are still invalid after `max_repairs` repairs.
+    """
+    reported = set()
+
+    def report(valid):
+        for name in MATCH_FIELDS:
+            if name in valid and name not in reported:
+                reported.add(name)
+                if on_field is not None:
+                    on_field(name, valid[name])
+
+    def report_streamed(name, value):
+        # Validate each field as it completes so the UI never shows a bad value
+        try:
+            report({name: FIELD_ADAPTERS[name].validate_python(value)})
+        except (KeyError, ValidationError):
+            pass
+
+    def report_partial(name, text):
+        # A model may send the score as "8/10" or a list as one string; only text fields are previewed
+        if MATCH_FIELDS.get(name, {}).get("type") == "string":
+            on_partial(name, text)
+
+    fields, invalid = stream_completion(
+        client, match_messages(jd_text, resume_text), model, MATCH_FIELDS, report_streamed,
+        report_partial if on_partial is not None else None,
+    )
+    valid, errors = validate_fields(fields)
+    errors.update({name: "not valid JSON" for name in invalid if name in errors})
+    report(valid)
+
+    repairs = 0
+    while errors and repairs < max_repairs:
+        repairs += 1
+        failing = [name for name in MATCH_FIELDS if name in errors]
+        repaired, _ = stream_completion(
+            client, repair_messages(jd_text, resume_text, valid, failing), model,
+            {name: MATCH_FIELDS[name] for name in failing}, temperature=0.2,
+        )
+        valid, errors = validate_fields({**valid, **{name: repaired[name] for name in failing if name in repaired}})
+        report(valid)
+
+    if errors:
+        raise IncompleteAnalysis(valid, errors)
+    return MatchAnalysis.model_validate(valid).model_dump(), repairs
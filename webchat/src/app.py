@@ -1,76 +1,159 @@
 import os
 import shutil
+import time
 import streamlit as st
-from utils.helper import load_data
+from utils.helper import iter_sources, source_fingerprint
+from utils.collection_store import CollectionStore
+from utils.timing import GENERATION, QUERY_REWRITE, StageTimer
+from utils.query_rewrite import RewriteCache, create_query_rewriting_retriever
+from utils.history import HistoryWindow
+from utils.embedding_cache import CachedEmbeddings
 from langchain_core.messages import AIMessage, HumanMessage
-from langchain_community.vectorstores import Chroma
 from langchain_openai import OpenAIEmbeddings, ChatOpenAI
 from dotenv import load_dotenv
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain.chains import create_history_aware_retriever, create_retrieval_chain
+from langchain.chains import create_retrieval_chain
 from langchain.chains.combine_documents import create_stuff_documents_chain
 
 # Load environment variables
 load_dotenv()
 
-# Clean up old data directories if they exist, otherwise create them
-for directory in ['src/chroma', 'src/uploads', 'src/scrape', 'src/audio']:
-    if os.path.exists(directory):
-        try:
-            shutil.rmtree(directory)
-        except Exception as e:
-            st.error(f"Error removing directory {directory}: {str(e)}")
-    # Ensure directories exist
-    os.makedirs(directory, exist_ok=True)
-
-# Clean up old audio files
-audio_paths = ['./audio_english.mp3', './src/audio/audio_english.mp3']
-for path in audio_paths:
-    if os.path.isfile(path):
-        try:
-            os.remove(path)
-        except Exception as e:
-            st.error(f"Error removing file {path}: {str(e)}")
-
-def get_vectorstore(url, max_depth, files, youtube):
-    """
-    Process input data and create a vector store.
+@st.cache_resource
+def prepare_directories():
+    """
+    Clean up per-run data directories once per server process, not on every rerun.
+
+    Persisted Chroma collections in src/chroma and scraped pages in the HTTP
+    cache are kept, so returning sources are not fetched or embedded again.
+    """
+    for directory in ['src/uploads', 'src/audio']:
+        if os.path.exists(directory):
+            try:
+                shutil.rmtree(directory)
+            except Exception as e:
+                st.error(f"Error removing directory {directory}: {str(e)}")
+        # Ensure directories exist
+        os.makedirs(directory, exist_ok=True)
+
+    # Clean up old audio files
+    audio_paths = ['./audio_english.mp3', './src/audio/audio_english.mp3']
+    for path in audio_paths:
+        if os.path.isfile(path):
+            try:
+                os.remove(path)
+            except Exception as e:
+                st.error(f"Error removing file {path}: {str(e)}")
+
+prepare_directories()
+
+@st.cache_resource
+def get_embeddings():
+    """
+    OpenAI embeddings behind the shared on-disk cache, reused across sessions.
+
+    Returns:
+        CachedEmbeddings: The cached embeddings model.
+    """
+    return CachedEmbeddings(OpenAIEmbeddings())
+
+@st.cache_resource
+def get_collections():
+    """
+    Persisted Chroma collections shared by every session, with garbage collection in the background.
+
+    Returns:
+        CollectionStore: The collection store.
+    """
+    collections = CollectionStore('src/chroma', get_embeddings())
+    collections.start_gc()
+    return collections
+
+def open_vectorstore(fingerprint, url, max_depth, files, youtube):
+    """
+    Open the persisted vector store of a source set, ingesting the sources in the background if needed.
 
     Args:
+        fingerprint (str): Fingerprint of the source set, from `source_fingerprint`.
         url (str): The URL of the website.
         max_depth (int): The maximum depth for scraping.
         files (list): List of uploaded files.
         youtube (str): YouTube URL.
 
     Returns:
-        tuple: A tuple containing the created vector store and the number of sources processed.
+        tuple: The vector store, the running IngestionJob (None when the
+        collection was built before) and the collection's manifest entry.
     """
-    try:
-        document_chunks, length = load_data(url, max_depth, files, youtube)
-        
-        if not document_chunks:
-            st.error("No data was processed. Please check your inputs.")
-            return None, 0
-            
-        # Create a vectorstore from the chunks
-        vector_store = Chroma.from_documents(document_chunks, OpenAIEmbeddings())
-        return vector_store, length
-        
-    except Exception as e:
-        st.error(f"Error creating vector store: {str(e)}")
-        return None, 0
+    return get_collections().open(fingerprint, iter_sources(url, max_depth, files, youtube))
+
+def stored_status(entry):
+    """
+    Progress snapshot of a collection that was fully ingested earlier.
 
-def get_context_retriever_chain(vector_store):
+    Args:
+        entry (dict): The collection's manifest entry.
+
+    Returns:
+        dict: A status in the shape of IngestionJob.status().
+    """
+    return {"sources": {}, "indexed": entry["chunks"], "completed": entry["sources"], "elapsed": 0.0, "done": True}
+
+def render_progress(placeholder, status):
+    """
+    Show the ingestion progress of each source in a sidebar placeholder.
+
+    Args:
+        placeholder: Streamlit container to render into.
+        status (dict): Snapshot returned by IngestionJob.status().
+    """
+    with placeholder.container():
+        for name, state in status["sources"].items():
+            label = "✅" if state["done"] else "⏳"
+            line = f"{label} {name}: {state['sources']} processed, {state['chunks']} chunks indexed"
+            if state["error"]:
+                line += f" (error: {state['error']})"
+            st.write(line)
+        if status["done"] and not status["sources"]:
+            st.write(f"Total sources processed: {status['completed']} (loaded from a saved collection)")
+        elif status["done"]:
+            st.write(f"Total sources processed: {status['completed']} in {status['elapsed']:.0f}s")
+        else:
+            st.write(f"Indexing... {status['indexed']} chunks searchable after {status['elapsed']:.0f}s")
+
+@st.cache_resource
+def get_llm():
+    """
+    The chat model shared by every session, so its HTTP connection pool is reused across turns.
+
+    Returns:
+        ChatOpenAI: The chat model.
+    """
+    return ChatOpenAI()
+
+@st.cache_resource
+def get_rewrite_cache():
+    """
+    Rewritten search queries shared by every session.
+
+    Returns:
+        RewriteCache: The rewrite cache.
+    """
+    return RewriteCache()
+
+def get_context_retriever_chain(vector_store, llm):
     """
     Create a context-aware retriever chain.
 
+    The LLM rewrite of the question is skipped on the first message and for
+    self-contained questions, and reused for repeated follow-ups.
+
     Args:
         vector_store: The vector store to use for retrieval.
+        llm: The chat model that rewrites the query.
 
     Returns:
         obj: The created context-aware retriever chain.
     """
-    llm = ChatOpenAI()
+    llm = llm.with_config(tags=[QUERY_REWRITE])
     
     retriever = vector_store.as_retriever()
     
@@ -80,22 +163,23 @@ def get_context_retriever_chain(vector_store):
       ("user", "Given the above conversation, generate a search query to look up in order to get information relevant to the conversation")
     ])
     
-    retriever_chain = create_history_aware_retriever(llm, retriever, prompt)
+    retriever_chain = create_query_rewriting_retriever(llm, retriever, prompt, get_rewrite_cache())
     
     return retriever_chain
     
-def get_conversational_rag_chain(retriever_chain):
+def get_conversational_rag_chain(retriever_chain, llm):
     """
     Creates a conversational RAG chain based on the provided retriever chain.
 
     Args:
         retriever_chain: The retriever chain to use for conversation.
+        llm: The chat model that writes the answer.
 
     Returns:
         obj: The created conversational RAG chain.
     """
     
-    llm = ChatOpenAI()
+    llm = llm.with_config(tags=[GENERATION])
     
     prompt = ChatPromptTemplate.from_messages([
       ("system", "Answer the user's questions based on the below context:\n\n{context}"),
@@ -107,6 +191,35 @@ def get_conversational_rag_chain(retriever_chain):
     
     return create_retrieval_chain(retriever_chain, stuff_documents_chain)
 
+def get_rag_chain(vector_store):
+    """
+    The conversational RAG chain of a vector store, built on the first turn and reused afterwards.
+
+    Args:
+        vector_store: The vector store to use for retrieval.
+
+    Returns:
+        obj: The conversational RAG chain.
+    """
+    if st.session_state.get("rag_chain_store") is not vector_store:
+        llm = get_llm()
+        retriever_chain = get_context_retriever_chain(vector_store, llm)
+        st.session_state.rag_chain = get_conversational_rag_chain(retriever_chain, llm)
+        st.session_state.rag_chain_store = vector_store
+    return st.session_state.rag_chain
+
+def get_history_window():
+    """
+    The session's token-budgeted view of the chat history, following the sidebar budget.
+
+    Returns:
+        HistoryWindow: The history window.
+    """
+    if "history_window" not in st.session_state:
+        st.session_state.history_window = HistoryWindow(get_llm())
+    st.session_state.history_window.max_tokens = st.session_state.history_budget
+    return st.session_state.history_window
+
 def get_response(user_input):
     """
     Gets a response from the chatbot based on user input.
@@ -118,13 +231,17 @@ def get_response(user_input):
         str: The chatbot's response.
     """
     try:
-        retriever_chain = get_context_retriever_chain(st.session_state.vector_store)
-        conversation_rag_chain = get_conversational_rag_chain(retriever_chain)
+        # Keeps the collection from being garbage collected while this session chats over it
+        get_collections().touch(st.session_state.fingerprint)
+        conversation_rag_chain = get_rag_chain(st.session_state.vector_store)
         
+        timer = StageTimer()
         response = conversation_rag_chain.invoke({
-            "chat_history": st.session_state.chat_history,
+            "chat_history": get_history_window().messages(st.session_state.chat_history),
             "input": user_input
-        })
+        }, config={"callbacks": [timer]})
+        st.session_state.turn_timings = timer.summary()
+        print(f"Turn timings: {timer.format()}")
         
         return response['answer']
     except Exception as e:
@@ -145,6 +262,8 @@ if "files" not in st.session_state:
     st.session_state.files = ""
 if "youtube_url" not in st.session_state:
     st.session_state.youtube_url = ""
+if "history_budget" not in st.session_state:
+    st.session_state.history_budget = 1024
 
 # Sidebar configuration
 with st.sidebar:
@@ -159,11 +278,15 @@ with st.sidebar:
                                      accept_multiple_files=True,
                                      disabled=st.session_state.freeze)
     
+    st.session_state.history_budget = st.slider("Chat history token budget:", 256, 4096, st.session_state.history_budget, step=256,
+                                                help="Older turns beyond this budget are folded into a running summary.")
+
     proceed_button = st.button("Proceed", disabled=st.session_state.freeze)
     if proceed_button:
         st.session_state.freeze = True
 
 # Main application logic
+status = None
 if ((not st.session_state.web_url) and 
     (not st.session_state.files) and
     (not st.session_state.youtube_url)):
@@ -177,36 +300,55 @@ else:
                 AIMessage(content="Hello, I am a bot. How can I help you?"),
             ]
             
-        # Process data sources if needed
-        if "vector_store" not in st.session_state:
-            with st.sidebar:
-                with st.spinner("Processing data sources..."):
-                    st.session_state.vector_store, st.session_state.len_urls = get_vectorstore(
-                        st.session_state.web_url,
-                        st.session_state.max_depth,
-                        st.session_state.files,
-                        st.session_state.youtube_url
-                    )
-                    
-                    if st.session_state.vector_store:
-                        st.write(f"Total sources processed: {st.session_state.len_urls}")
-                        st.success("Processing completed, 🤖 Ready!")
-                    else:
-                        st.error("Failed to process data sources. Please try again with different inputs.")
-                        st.session_state.freeze = False
+        # Reopen the saved collection of these sources, or start ingesting them in the background
+        if "ingestion" not in st.session_state:
+            st.session_state.fingerprint = source_fingerprint(
+                st.session_state.web_url,
+                st.session_state.max_depth,
+                st.session_state.files,
+                st.session_state.youtube_url
+            )
+            (st.session_state.vector_store,
+             st.session_state.ingestion,
+             st.session_state.collection) = open_vectorstore(
+                st.session_state.fingerprint,
+                st.session_state.web_url,
+                st.session_state.max_depth,
+                st.session_state.files,
+                st.session_state.youtube_url
+            )
 
-        else:
-            with st.sidebar:
-                st.write(f"Total sources processed: {st.session_state.len_urls}")
-                st.success("🤖 Ready!")
+        job = st.session_state.ingestion
+        status = job.status() if job is not None else stored_status(st.session_state.collection)
+        with st.sidebar:
+            progress_placeholder = st.empty()
+            render_progress(progress_placeholder, status)
+            if status["done"] and status["indexed"]:
+                st.success("Processing completed, 🤖 Ready!")
+            elif status["done"]:
+                st.error("No data was processed. Please try again with different inputs.")
+                st.session_state.freeze = False
+                del st.session_state.ingestion
+                del st.session_state.vector_store
+                del st.session_state.collection
+                del st.session_state.fingerprint
+            elif status["indexed"]:
+                st.info("🤖 Ready to chat over what has been indexed so far.")
+            timings_placeholder = st.empty()
 
-        # Handle user input
-        if st.session_state.vector_store:  # Only if we have data
+        # Handle user input as soon as the first chunks are searchable
+        if status["indexed"]:
             user_query = st.chat_input("Type your message here...")
             if user_query is not None and user_query != "":
                 response = get_response(user_query)
                 st.session_state.chat_history.append(HumanMessage(content=user_query))
                 st.session_state.chat_history.append(AIMessage(content=response))
+                get_history_window().update_in_background(st.session_state.chat_history)
+
+            if "turn_timings" in st.session_state:
+                timings = st.session_state.turn_timings
+                timings_placeholder.caption("Last turn: " + ", ".join(
+                    f"{stage.replace('_', ' ')} {seconds:.2f}s" for stage, seconds in timings.items()))
 
             # Display conversation
             for message in st.session_state.chat_history:
@@ -216,10 +358,24 @@ else:
                 elif isinstance(message, HumanMessage):
                     with st.chat_message("Human"):
                         st.write(message.content)
+        elif not status["done"]:
+            st.info("Indexing your sources, the chat opens as soon as the first chunks are searchable...")
     
 # Footer
 st.sidebar.markdown('---')
 st.sidebar.markdown('Connect with me:')
 st.sidebar.markdown('[LinkedIn](https://www.linkedin.com/in/saksham-chaurasia/)')
 st.sidebar.markdown('[GitHub](https://github.com/imsaksham-c)')
-st.sidebar.markdown('[Email](mailto:imsaksham.c@gmail.com)')
\ No newline at end of file
+st.sidebar.markdown('[Email](mailto:imsaksham.c@gmail.com)')
+
+# Keep the sidebar progress live while ingestion runs. Any user interaction
+# interrupts this loop and reruns the script, so the chat stays responsive.
+if status is not None and not status["done"]:
+    was_searchable = bool(status["indexed"])
+    while not job.done:
+        time.sleep(1)
+        status = job.status()
+        render_progress(progress_placeholder, status)
+        if status["indexed"] and not was_searchable:
+            break
+    st.rerun()
@@ -0,0 +1,136 @@
+"""Benchmark the breadth-first crawler against the old recursive one on a local fixture site.
+
+Usage: python bench_crawl.py [--pages 3000] [--depth 4] [--latency 0.02]
+
+Serves a synthetic site where page n links to pages 10n+1 .. 10n+10, back to
+its parent and to itself with a fragment, then crawls it with both crawlers.
+It also compares ingestion that crawls for URLs and downloads every page again
+(as WebBaseLoader did) with the single-fetch crawl that yields the HTML, and
+times a re-crawl of the unchanged site through a revalidating HTTP cache.
+"""
+import argparse
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urljoin, urlparse
+
+import requests
+
+from utils.get_urls import crawl, filter_links, get_links, scrape_urls
+from utils.http_cache import HttpCache
+
+
+def make_handler(pages, latency):
+    class FixtureSite(BaseHTTPRequestHandler):
+        requests_served = 0
+        not_modified = 0
+
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            FixtureSite.requests_served += 1
+            time.sleep(latency)
+            path = urlparse(self.path).path
+            n = int(path.rsplit('/', 1)[-1]) if path.startswith('/page/') else 0
+            links = [f'/page/{child}' for child in range(10 * n + 1, 10 * n + 11) if child < pages]
+            links += [f'/page/{max(n - 1, 0) // 10}', f'/page/{n}#top', '/']
+            body = '<html><body><h1>Page {}</h1><p>{}</p>{}</body></html>'.format(
+                n, 'Lorem ipsum dolor sit amet. ' * 50, ''.join(f'<a href="{link}">{link}</a>' for link in links)
+            ).encode()
+            etag = f'"page-{n}"'
+            if self.headers.get('If-None-Match') == etag:
+                FixtureSite.not_modified += 1
+                self.send_response(304)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return FixtureSite
+
+
+def recursive_scrape(url, depth, main_domain, visited, cache):
+    # The crawler this module replaced: depth first, one blocking request at a time
+    if depth == 0:
+        return [url]
+    if url in visited:
+        return []
+    visited.add(url)
+    links = [urljoin(url, link) for link in get_links(url, cache=cache)]
+    collected = [url]
+    if depth > 1:
+        for link in filter_links(links, main_domain):
+            collected.extend(recursive_scrape(link, depth - 1, main_domain, visited, cache))
+    return collected
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, default=3000)
+    parser.add_argument('--depth', type=int, default=4)
+    parser.add_argument('--latency', type=float, default=0.02, help='Seconds the fixture waits per page.')
+    parser.add_argument('--workers', type=int, nargs='+', default=[4, 16, 32])
+    args = parser.parse_args()
+
+    handler = make_handler(args.pages, args.latency)
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    site = f'http://127.0.0.1:{server.server_port}/page/0'
+    main_domain = urlparse(site).netloc
+    workdir = tempfile.TemporaryDirectory()
+    runs = iter(range(1_000_000))
+
+    def fresh_cache(ttl=0):
+        # Every timed crawl starts from an empty cache so earlier runs do not help it
+        return HttpCache(f'{workdir.name}/{next(runs)}', ttl=ttl)
+
+    start = time.perf_counter()
+    urls = recursive_scrape(site, args.depth, main_domain, set(), fresh_cache())
+    elapsed = time.perf_counter() - start
+    print(f'recursive       : {elapsed:6.2f}s  {len(set(urls))} unique of {len(urls)} urls')
+
+    for workers in args.workers:
+        start = time.perf_counter()
+        urls = scrape_urls(site, args.depth, max_pages=args.pages, max_workers=workers, per_host=workers,
+                           cache=fresh_cache())
+        elapsed = time.perf_counter() - start
+        print(f'bfs workers={workers:<3}: {elapsed:6.2f}s  {len(set(urls))} unique of {len(urls)} urls')
+
+    workers = args.workers[-1]
+    handler.requests_served = 0
+    start = time.perf_counter()
+    urls = scrape_urls(site, args.depth, max_pages=args.pages, max_workers=workers, per_host=workers,
+                       cache=fresh_cache())
+    pages = [requests.get(url, timeout=10).text for url in urls]
+    elapsed = time.perf_counter() - start
+    print(f'crawl + refetch : {elapsed:6.2f}s  {len(pages)} pages  {handler.requests_served} requests')
+
+    handler.requests_served = 0
+    start = time.perf_counter()
+    cache = fresh_cache()
+    pages = [html for _, html in crawl(site, args.depth, max_pages=args.pages, max_workers=workers, per_host=workers,
+                                       cache=cache)]
+    elapsed = time.perf_counter() - start
+    print(f'single fetch    : {elapsed:6.2f}s  {len(pages)} pages  {handler.requests_served} requests')
+
+    # Re-crawl the unchanged site with the cache from the previous run, all entries stale
+    handler.requests_served = handler.not_modified = 0
+    cache = HttpCache(cache.directory, ttl=0)
+    start = time.perf_counter()
+    pages = [html for _, html in crawl(site, args.depth, max_pages=args.pages, max_workers=workers, per_host=workers,
+                                       cache=cache)]
+    elapsed = time.perf_counter() - start
+    print(f'cached re-crawl : {elapsed:6.2f}s  {len(pages)} pages  {handler.requests_served} requests  '
+          f'{handler.not_modified} not modified')
+    server.shutdown()
+    workdir.cleanup()
+
+
+if __name__ == '__main__':
+    main()
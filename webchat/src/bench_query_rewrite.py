@@ -0,0 +1,116 @@
+"""Benchmark skipping the history-aware query rewrite against always rewriting.
+
+Usage: python bench_query_rewrite.py [--llm-latency 0.8] [--replays 2]
+
+Plays scripted conversations through the retriever stage twice: once with
+create_history_aware_retriever, which rewrites every turn that has history,
+and once with create_query_rewriting_retriever. The rewrite LLM is a fake
+that sleeps for --llm-latency seconds, roughly a short gpt-3.5 completion;
+replaying the conversations shows the effect of the rewrite cache.
+"""
+import argparse
+import time
+
+from langchain.chains import create_history_aware_retriever
+from langchain_core.documents import Document
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.retrievers import BaseRetriever
+
+from utils.query_rewrite import RewriteCache, create_query_rewriting_retriever, needs_rewrite
+
+CONVERSATIONS = [
+    [
+        'What does the company do?',
+        'Where is the headquarters located?',
+        'How many people work there?',
+        'Who founded it?',
+        'What products does the company sell in Europe?',
+        'And in Asia?',
+    ],
+    [
+        'How do I install the command line tool on Linux?',
+        'What are the system requirements for the desktop app?',
+        'Does it support Windows 10?',
+        'How do I reset my password?',
+        'What payment methods are accepted for the premium plan?',
+        'Can you elaborate on the refund policy?',
+    ],
+    [
+        'Summarize the video.',
+        'What was said about climate policy in the second half of the talk?',
+        'Why does the speaker think carbon taxes fail?',
+        'What about subsidies?',
+        'Which countries are mentioned as examples of successful transitions?',
+        'Tell me more about them.',
+    ],
+]
+
+
+class SlowLLM(FakeListChatModel):
+    latency: float = 0.8
+    calls: int = 0
+
+    def _call(self, *args, **kwargs):
+        self.calls += 1
+        time.sleep(self.latency)
+        return super()._call(*args, **kwargs)
+
+
+class StaticRetriever(BaseRetriever):
+    def _get_relevant_documents(self, query, *, run_manager):
+        time.sleep(0.01)
+        return [Document(page_content=f'context for {query}')]
+
+
+def play(retriever_chain, replays):
+    turns = 0
+    start = time.perf_counter()
+    for _ in range(replays):
+        for questions in CONVERSATIONS:
+            history = [AIMessage(content='Hello, I am a bot. How can I help you?')]
+            for question in questions:
+                retriever_chain.invoke({'input': question, 'chat_history': history})
+                history += [HumanMessage(content=question), AIMessage(content=f'An answer to: {question}')]
+                turns += 1
+    return turns, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--llm-latency', type=float, default=0.8, help='Seconds per rewrite call.')
+    parser.add_argument('--replays', type=int, default=2, help='Times every conversation is played.')
+    args = parser.parse_args()
+
+    prompt = ChatPromptTemplate.from_messages([
+        MessagesPlaceholder(variable_name='chat_history'),
+        ('user', '{input}'),
+        ('user', 'Given the above conversation, generate a search query to look up in order to get information relevant to the conversation'),
+    ])
+    retriever = StaticRetriever()
+
+    for questions in CONVERSATIONS:
+        history = [AIMessage(content='Hello, I am a bot. How can I help you?')]
+        for question in questions:
+            print(f"{'rewrite' if needs_rewrite(question, history) else 'skip   '}  {question}")
+            history.append(HumanMessage(content=question))
+    print()
+
+    baseline_llm = SlowLLM(responses=['rewritten query'], latency=args.llm_latency)
+    baseline_chain = create_history_aware_retriever(baseline_llm, retriever, prompt)
+    turns, baseline = play(baseline_chain, args.replays)
+    print(f'always rewrite : {baseline:6.2f}s  {baseline / turns * 1000:6.0f}ms per turn  '
+          f'{baseline_llm.calls} rewrite calls')
+
+    llm = SlowLLM(responses=['rewritten query'], latency=args.llm_latency)
+    cache = RewriteCache()
+    chain = create_query_rewriting_retriever(llm, retriever, prompt, cache)
+    turns, elapsed = play(chain, args.replays)
+    print(f'skip + cache   : {elapsed:6.2f}s  {elapsed / turns * 1000:6.0f}ms per turn  '
+          f'{llm.calls} rewrite calls  {cache.hits} cache hits')
+    print(f'saved          : {(baseline - elapsed) / turns * 1000:6.0f}ms per turn over {turns} turns')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""Benchmark chunked, parallel transcription against one whole-file request on a local fake endpoint.
+
+Usage: python bench_transcribe.py [--minutes 60] [--workers 1 4 8] [--speed 200]
+
+Generates a synthetic audio track with ffmpeg, then transcribes it through
+fake_openai.py: first as a single upload (what YouTube ingestion used to
+send), then split into segments with each worker count. Needs ffmpeg on PATH
+or in FFMPEG_BINARY.
+"""
+import argparse
+import os
+import subprocess
+import tempfile
+import time
+
+from openai import OpenAI
+
+from fake_openai import serve
+from utils.transcribe import FFMPEG, transcribe_audio, transcript_documents
+
+WHISPER_UPLOAD_LIMIT = 25 * 1024 * 1024
+
+
+def make_audio(path, minutes):
+    # A tone at 128 kbps stereo, about the size of a YouTube audio stream
+    subprocess.run(
+        [FFMPEG, '-hide_banner', '-loglevel', 'error', '-y', '-f', 'lavfi',
+         '-i', f'sine=frequency=440:duration={minutes * 60}', '-ac', '2', '-b:a', '128k', path],
+        check=True,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--minutes', type=int, default=60)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 8])
+    parser.add_argument('--segment-seconds', type=int, default=600)
+    parser.add_argument('--speed', type=float, default=200.0, help='Seconds of audio the fake transcribes per second.')
+    args = parser.parse_args()
+
+    server = serve(latency=0.3, speed=args.speed)
+    client = OpenAI(base_url=f'http://127.0.0.1:{server.server_port}/v1', api_key='fake')
+
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, 'talk.mp3')
+        make_audio(path, args.minutes)
+        size = os.path.getsize(path)
+        print(f'{args.minutes} min of audio, {size / 1e6:.1f} MB '
+              f'({"over" if size > WHISPER_UPLOAD_LIMIT else "under"} the 25 MB upload limit)')
+
+        # The fake estimates duration at 32 kbps, so scale the single upload to match
+        start = time.perf_counter()
+        with open(path, 'rb') as f:
+            client.audio.transcriptions.create(model='whisper-1', file=('talk.mp3', f.read()[:size // 4]),
+                                               response_format='text')
+        print(f'single request : {time.perf_counter() - start:6.2f}s')
+
+        for workers in args.workers:
+            start = time.perf_counter()
+            passages = transcribe_audio(path, client, max_workers=workers, segment_seconds=args.segment_seconds)
+            elapsed = time.perf_counter() - start
+            ordered = all(a['start'] <= b['start'] for a, b in zip(passages, passages[1:]))
+            documents = transcript_documents(passages, 'https://www.youtube.com/watch?v=bench', 'bench')
+            print(f'workers={workers:<3}    : {elapsed:6.2f}s  {len(passages)} passages  '
+                  f'{len(documents)} chunks  ends at {passages[-1]["end"]:.0f}s  in order: {ordered}')
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""Minimal local stand-in for the OpenAI transcription endpoint, for testing YouTube ingestion offline.
+
+Usage:
+    python fake_openai.py --port 8002 --speed 200
+    OPENAI_BASE_URL=http://127.0.0.1:8002/v1 OPENAI_API_KEY=fake streamlit run src/app.py
+
+Supported endpoints:
+    POST /v1/audio/transcriptions   one passage per 5 seconds of audio, as text or verbose_json
+
+The audio is not decoded: its duration is estimated from the upload size at
+the 32 kbps the transcriber encodes segments with, and the response is
+delayed by duration / speed seconds like a real transcription would be.
+"""
+import argparse
+import email.parser
+import email.policy
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BYTES_PER_SECOND = 32000 / 8
+PASSAGE_SECONDS = 5.0
+
+
+def fake_passages(duration):
+    passages = []
+    start = 0.0
+    while start < duration:
+        end = min(start + PASSAGE_SECONDS, duration)
+        passages.append({"start": start, "end": end, "text": f" Words spoken from {start:.0f}s to {end:.0f}s."})
+        start = end
+    return passages
+
+
+class FakeTranscriptionHandler(BaseHTTPRequestHandler):
+    latency = 0.0
+    speed = 200.0
+    requests_served = 0
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_form(self):
+        length = int(self.headers.get("Content-Length", 0))
+        header = f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode()
+        message = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(header + self.rfile.read(length))
+        return {part.get_param("name", header="content-disposition"): part.get_payload(decode=True)
+                for part in message.iter_parts()}
+
+    def _send(self, body, content_type):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        if not self.path.endswith("/audio/transcriptions"):
+            self.send_error(404, f"Not faked: {self.path}")
+            return
+        form = self._read_form()
+        type(self).requests_served += 1
+        duration = len(form.get("file", b"")) / BYTES_PER_SECOND
+        time.sleep(self.latency + duration / self.speed)
+
+        passages = fake_passages(duration)
+        text = "".join(passage["text"] for passage in passages).strip()
+        response_format = (form.get("response_format") or b"json").decode()
+        if response_format == "text":
+            self._send(text.encode(), "text/plain")
+            return
+        body = {"text": text}
+        if response_format == "verbose_json":
+            body.update(task="transcribe", language="english", duration=duration,
+                        segments=[dict(passage, id=i) for i, passage in enumerate(passages)])
+        self._send(json.dumps(body).encode(), "application/json")
+
+
+def serve(port=0, latency=0.0, speed=200.0):
+    """Start the fake server on a background thread and return it; ``server.server_port`` has the port."""
+    handler = type("Handler", (FakeTranscriptionHandler,), {"latency": latency, "speed": speed})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.handler = handler
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a fake OpenAI transcription endpoint locally.")
+    parser.add_argument("--port", type=int, default=8002)
+    parser.add_argument("--latency", type=float, default=0.3, help="Seconds added to every response.")
+    parser.add_argument("--speed", type=float, default=200.0, help="Seconds of audio transcribed per second.")
+    args = parser.parse_args()
+    server = serve(args.port, args.latency, args.speed)
+    print(f"fake OpenAI API on http://127.0.0.1:{server.server_port}/v1")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
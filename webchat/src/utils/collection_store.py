@@ -0,0 +1,183 @@
+import json
+import os
+import threading
+import time
+
+from langchain_community.vectorstores import Chroma
+
+from utils.ingest import IngestionJob
+
+
+class CollectionStore:
+    """
+    Persisted Chroma collections, one per source set, reused across sessions and restarts.
+
+    Each collection is named after the fingerprint of the sources it was built
+    from and recorded in a JSON manifest next to the Chroma files. A source set
+    that was fully ingested before is reopened instead of re-embedded; one that
+    is being ingested by another session shares that session's job. Collections
+    unused for `max_idle` seconds, or beyond the `max_collections` most
+    recently used, are deleted by `collect_garbage`. Collections opened or
+    touched in the last `active_window` seconds are in use by a session and
+    never deleted.
+
+    Args:
+        persist_dir (str): Directory holding the Chroma files and the manifest.
+        embeddings: Embeddings used by every collection.
+        max_idle (float): Seconds after which an unused collection is deleted.
+        max_collections (int): Maximum number of collections kept.
+        active_window (float): Seconds a collection counts as in use after it was last opened or touched.
+    """
+
+    def __init__(self, persist_dir, embeddings, max_idle=7 * 24 * 3600, max_collections=50, active_window=3600):
+        self.persist_dir = persist_dir
+        self.embeddings = embeddings
+        self.max_idle = max_idle
+        self.max_collections = max_collections
+        self.active_window = active_window
+        self.manifest_path = os.path.join(persist_dir, "manifest.json")
+        self.jobs = {}
+        # Last access by a session of this process; sessions hold their vector store without closing it
+        self.accessed = {}
+        self._lock = threading.RLock()
+        self._gc_thread = None
+        os.makedirs(persist_dir, exist_ok=True)
+        try:
+            with open(self.manifest_path, encoding="utf-8") as f:
+                self.manifest = json.load(f)
+        except (OSError, ValueError):
+            self.manifest = {}
+
+    def _save_manifest(self):
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _collection(self, fingerprint):
+        return Chroma(
+            collection_name=f"webchat-{fingerprint[:32]}",
+            embedding_function=self.embeddings,
+            persist_directory=self.persist_dir,
+        )
+
+    def open(self, fingerprint, sources):
+        """
+        Open the collection of a source set, starting its ingestion unless it is already built.
+
+        Args:
+            fingerprint (str): Fingerprint of the source set.
+            sources (dict): Source generators ingested when the collection has to be built.
+
+        Returns:
+            tuple: The vector store, the running IngestionJob (None when the
+            collection was complete already) and the manifest entry.
+        """
+        with self._lock:
+            self.accessed[fingerprint] = time.time()
+            entry = self.manifest.get(fingerprint)
+            job = self.jobs.get(fingerprint)
+            if job is not None and not job.done:
+                return job.vector_store, job, entry
+
+            if entry is not None and entry["complete"]:
+                entry["last_used"] = time.time()
+                self._save_manifest()
+                return self._collection(fingerprint), None, entry
+
+            vector_store = self._collection(fingerprint)
+            if entry is not None:
+                # Left behind by an interrupted or failed ingestion: start over
+                vector_store.delete_collection()
+                vector_store = self._collection(fingerprint)
+
+            now = time.time()
+            entry = {"created_at": now, "last_used": now, "complete": False, "chunks": 0, "sources": 0}
+            self.manifest[fingerprint] = entry
+            self._save_manifest()
+
+            def finish(status):
+                self._finish(fingerprint, vector_store, status)
+
+            job = IngestionJob(vector_store, sources, on_done=finish).start()
+            self.jobs[fingerprint] = job
+            return vector_store, job, entry
+
+    def touch(self, fingerprint):
+        """
+        Mark the collection of a source set as in use, e.g. on every chat turn.
+
+        Args:
+            fingerprint (str): Fingerprint of the source set.
+        """
+        with self._lock:
+            now = time.time()
+            self.accessed[fingerprint] = now
+            entry = self.manifest.get(fingerprint)
+            if entry is not None:
+                # Saved with the next manifest write; an in-use collection is protected by `accessed` meanwhile
+                entry["last_used"] = now
+
+    def _finish(self, fingerprint, vector_store, status):
+        complete = status["indexed"] > 0 and not any(state["error"] for state in status["sources"].values())
+        if complete:
+            # A no-op on chromadb >= 0.4, which writes through
+            vector_store.persist()
+        with self._lock:
+            entry = self.manifest.get(fingerprint)
+            if entry is not None:
+                entry.update(complete=complete, chunks=status["indexed"], sources=status["completed"],
+                             last_used=time.time())
+                self._save_manifest()
+            self.jobs.pop(fingerprint, None)
+
+    def collect_garbage(self):
+        """
+        Delete collections that are idle too long or beyond the newest `max_collections`.
+
+        Collections being ingested or in use by a session are kept, even if
+        that leaves more than `max_collections`.
+
+        Returns:
+            list: Fingerprints of the deleted collections.
+        """
+        with self._lock:
+            now = time.time()
+            idle = sorted(
+                (
+                    fingerprint for fingerprint in self.manifest
+                    if fingerprint not in self.jobs
+                    and now - self.accessed.get(fingerprint, 0) > self.active_window
+                ),
+                key=lambda fingerprint: self.manifest[fingerprint]["last_used"],
+            )
+            excess = len(self.manifest) - self.max_collections
+            expired = [
+                fingerprint for index, fingerprint in enumerate(idle)
+                if index < excess or now - self.manifest[fingerprint]["last_used"] > self.max_idle
+            ]
+            for fingerprint in expired:
+                try:
+                    self._collection(fingerprint).delete_collection()
+                except Exception as e:
+                    print(f"Error deleting collection {fingerprint}: {str(e)}")
+                del self.manifest[fingerprint]
+                self.accessed.pop(fingerprint, None)
+            if expired:
+                self._save_manifest()
+                print(f"Deleted {len(expired)} unused collections")
+            return expired
+
+    def start_gc(self, interval=3600):
+        """Run `collect_garbage` every `interval` seconds on a daemon thread."""
+        with self._lock:
+            if self._gc_thread is not None:
+                return
+
+            def run():
+                while True:
+                    self.collect_garbage()
+                    time.sleep(interval)
+
+            self._gc_thread = threading.Thread(target=run, daemon=True)
+            self._gc_thread.start()
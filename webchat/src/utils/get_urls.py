@@ -1,22 +1,28 @@
+import threading
+import time
 import requests
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from urllib.parse import urlparse, urljoin
 from bs4 import BeautifulSoup
+from utils.http_cache import HEADERS, get_default_cache, normalize_url
 
-def get_links(url):
+MEDIA_EXTENSIONS = ('.jpg', '.png', '.gif', '.mp4', '.avi', '.mp3')
+
+def get_links(url, timeout=10, cache=None):
     """
     Retrieve all the links from a given URL.
 
     Args:
     url (str): The URL to scrape.
+    timeout (float): Seconds to wait for the server before giving up.
+    cache (HttpCache): HTTP cache to fetch through, defaults to the shared one.
 
     Returns:
     list: A list of links found on the webpage.
     """
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            }
-        response = requests.get(url, headers=headers)
+        response = (cache or get_default_cache()).get(url, timeout=timeout)
         if response.status_code == 200:
             soup = BeautifulSoup(response.text, 'html.parser')
             links = [link.get('href') for link in soup.find_all('a', href=True)]
@@ -46,57 +52,181 @@ def filter_links(links, main_domain):
             continue
         if parsed_url.netloc != main_domain:
             continue
-        if parsed_url.path.lower().endswith(('.jpg', '.png', '.gif', '.mp4', '.avi', '.mp3')):
+        if parsed_url.path.lower().endswith(MEDIA_EXTENSIONS):
             continue
         valid_links.append(link)
     return valid_links
 
-def scrape_website(url, depth, main_domain, visited=None):
+class HostLimiter:
+    """
+    Politeness limit per host: at most `per_host` requests in flight and at
+    least `delay` seconds between the starts of two requests to the same host.
+    """
+
+    def __init__(self, per_host=2, delay=0.0):
+        self.per_host = per_host
+        self.delay = delay
+        self._lock = threading.Lock()
+        self._semaphores = {}
+        self._next_start = {}
+
+    @contextmanager
+    def slot(self, host):
+        with self._lock:
+            semaphore = self._semaphores.setdefault(host, threading.Semaphore(self.per_host))
+        with semaphore:
+            with self._lock:
+                now = time.monotonic()
+                start = max(now, self._next_start.get(host, now))
+                self._next_start[host] = start + self.delay
+            time.sleep(start - now)
+            yield
+
+def make_session(pool_size=16):
     """
-    Scrape the website for links up to a specified depth.
+    Create a requests session whose connection pool fits the crawl's concurrency.
 
     Args:
-    url (str): The URL of the website to scrape.
-    depth (int): The depth to scrape links.
-    main_domain (str): The main domain of the website.
-    visited (set, optional): A set to store visited URLs to avoid duplicates.
+    pool_size (int): Connections kept open per host.
 
     Returns:
-    list: A list of links found on the website up to the specified depth.
+    requests.Session: The pooled session.
+    """
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers.update(HEADERS)
+    return session
+
+def fetch_page(url, limiter, session, cache, timeout=10, max_page_bytes=5_000_000, on_error=None):
     """
-    if visited is None:
-        visited = set()
+    Download one page within the host's politeness limit, revalidating cached copies.
 
-    if depth == 0:
-        return [url]
+    Args:
+    url (str): The URL to fetch.
+    limiter (HostLimiter): Per-host concurrency and delay limit.
+    session (requests.Session): Pooled session used for the request.
+    cache (HttpCache): HTTP cache the page is fetched through.
+    timeout (float): Seconds to wait for the server before giving up.
+    max_page_bytes (int): Larger bodies are cut off at this size.
+    on_error (callable): Called with (url, message) when the request fails or the server
+        answers with a 5xx, i.e. when trying again later may succeed.
 
-    if url in visited:
-        return []
+    Returns:
+    tuple: The HTML (or None when the page is unusable) and the number of bytes downloaded.
+    """
+    try:
+        with limiter.slot(urlparse(url).netloc):
+            response = cache.get(url, session=session, timeout=timeout, max_bytes=max_page_bytes)
+        if response.status_code >= 500 and on_error is not None:
+            on_error(url, f"HTTP {response.status_code}")
+        if response.status_code != 200 or 'html' not in response.headers.get('Content-Type', 'text/html'):
+            return None, 0
+        return response.text, 0 if response.from_cache else len(response.content)
+    except Exception as e:
+        print(f"Error fetching {url}: {str(e)}")
+        if on_error is not None:
+            on_error(url, str(e))
+        return None, 0
 
-    visited.add(url)
+def extract_links(html, base_url, main_domain):
+    """
+    Find the crawlable same-domain links of a page.
+
+    Args:
+    html (str): The page's HTML.
+    base_url (str): The page's URL, used to resolve relative links.
+    main_domain (str): The main domain of the website.
 
-    links = get_links(url)
-    filtered_links = filter_links(links, main_domain)
+    Returns:
+    list: Normalized absolute links.
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+    links = [urljoin(base_url, link.get('href')) for link in soup.find_all('a', href=True)]
+    return [normalize_url(link) for link in filter_links(links, main_domain)]
 
-    collected_links = [url]
-    if depth > 1:
-        for link in filtered_links:
-            absolute_url = urljoin(url, link)
-            collected_links.extend(scrape_website(absolute_url, depth - 1, main_domain, visited))
+def crawl(website, depth=2, max_pages=500, max_bytes=50_000_000, max_workers=16,
+          per_host=4, delay=0.0, timeout=10, fetch_leaves=True, cache=None, on_error=None):
+    """
+    Breadth-first crawl of a website on a thread pool, yielding pages as they arrive.
 
-    return collected_links
+    Pages up to `depth - 1` links away from `website` are collected, which
+    matches the depth semantics of the earlier recursive crawler. Each level
+    is fetched concurrently through one pooled session, and every page is
+    downloaded exactly once; the crawl stops early once `max_pages` URLs are
+    collected or `max_bytes` have been downloaded. Pages go through the HTTP
+    cache, so re-crawling an unchanged site mostly costs 304 responses.
 
-def scrape_urls(website, depth=2):
+    Args:
+    website (str): The URL to start from.
+    depth (int): The depth to scrape links.
+    max_pages (int): Maximum number of URLs to collect.
+    max_bytes (int): Maximum number of bytes to download.
+    max_workers (int): Global number of concurrent requests.
+    per_host (int): Concurrent requests allowed per host.
+    delay (float): Minimum seconds between request starts on one host.
+    timeout (float): Per-request timeout in seconds.
+    fetch_leaves (bool): Also download the last level, whose links are not followed.
+    cache (HttpCache): HTTP cache to fetch through, defaults to the shared one.
+    on_error (callable): Called with (url, message) for pages that failed to download, see `fetch_page`.
+
+    Yields:
+    tuple: (url, html) for each collected page; html is None if the page was
+    not fetched or not usable.
+    """
+    main_domain = urlparse(website).netloc
+    limiter = HostLimiter(per_host, delay)
+    seen = {normalize_url(website)}
+    collected = 1
+    frontier = [website]
+    downloaded = 0
+    levels = max(depth, 1)
+    cache = cache or get_default_cache()
+
+    with make_session(max_workers) as session, ThreadPoolExecutor(max_workers=max_workers) as pool:
+        for level in range(levels):
+            follow_links = level < levels - 1
+            if not follow_links and not fetch_leaves:
+                for url in frontier:
+                    yield url, None
+                break
+
+            next_frontier = []
+            futures = {pool.submit(fetch_page, url, limiter, session, cache, timeout, on_error=on_error): url for url in frontier}
+            for future in as_completed(futures):
+                if future.cancelled():
+                    continue
+                html, size = future.result()
+                downloaded += size
+                yield futures[future], html
+                if downloaded >= max_bytes:
+                    # Budget spent: drop the requests of this level that have not started
+                    for pending in futures:
+                        pending.cancel()
+                    continue
+                if html is None or not follow_links:
+                    continue
+                for link in extract_links(html, futures[future], main_domain):
+                    if link in seen or collected >= max_pages:
+                        continue
+                    seen.add(link)
+                    collected += 1
+                    next_frontier.append(link)
+            if not next_frontier or downloaded >= max_bytes:
+                break
+            frontier = next_frontier
+
+def scrape_urls(website, depth=2, **kwargs):
     """
     Scrape URLs from a website up to a specified depth.
 
     Args:
     website (str): The URL of the website to scrape.
     depth (int): The depth to scrape links.
+    **kwargs: Crawl budgets and limits passed to `crawl`.
 
     Returns:
     list: A list of URLs found on the website up to the specified depth.
     """
-    main_domain = urlparse(website).netloc
-    links = scrape_website(website, depth, main_domain)
-    return links
+    return [url for url, _ in crawl(website, depth, fetch_leaves=False, **kwargs)]
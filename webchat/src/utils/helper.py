@@ -1,12 +1,19 @@
 import os
+import json
+import hashlib
+import tempfile
 import pytubefix as pt
 from openai import OpenAI
 from dotenv import load_dotenv
-from utils.get_urls import scrape_urls
+from bs4 import BeautifulSoup
+from utils.get_urls import crawl
+from utils.http_cache import normalize_url
+from utils.ingest import SourceError
+from utils.pdf_extract import split_pdf
+from utils.transcribe import load_transcript, store_transcript, transcribe_audio, transcript_documents
 from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_core.documents import Document
 from langchain_community.document_loaders import (
-    WebBaseLoader,
-    PyPDFLoader,
     TextLoader,
     CSVLoader,
     UnstructuredWordDocumentLoader,
@@ -18,54 +25,48 @@ client = OpenAI()
 
 text_splitter = RecursiveCharacterTextSplitter()
 
-def fetch_and_split_data_from_youtube(youtube_url):
+def fetch_and_split_data_from_youtube(youtube_url, openai_client=None, max_workers=4):
     """
     Downloads audio from a YouTube video, transcribes it, and splits into chunks.
+
+    The audio is downloaded into a temporary directory of its own, split into
+    ten minute segments that are transcribed concurrently, and the transcript
+    is cached by video ID so the same video is never transcribed twice.
     
     Args:
         youtube_url (str): The URL of the YouTube video.
+        openai_client (OpenAI): Client for the transcription requests, defaults to the module's client.
+        max_workers (int): Segments transcribed at the same time.
         
     Returns:
         tuple: A tuple containing document chunks and count (always 1).
     """
     try:
-        # Create directory for audio if it doesn't exist
-        audio_dir = 'src/audio'
-        if not os.path.exists(audio_dir):
-            os.makedirs(audio_dir, exist_ok=True)
-            
-        # Use output_path parameter instead of filename
-        audio_filename = "audio_english.mp3"
-        audio_path = os.path.join(audio_dir, audio_filename)
-        
-        # Download the audio
-        yt = pt.YouTube(youtube_url, use_oauth=True, allow_oauth_cache=True)
-        stream = yt.streams.filter(only_audio=True)
-        
-        if not stream:
-            print(f"No audio stream found for {youtube_url}")
-            return [], 0
-        
-        # Fix: Use the proper download method with output_path and filename separately
-        # PyTubefix expects output_path as directory and filename as the base filename
-        stream[0].download(output_path=audio_dir, filename=audio_filename)
-        
-        # Check if file was successfully downloaded
-        if not os.path.exists(audio_path):
-            print(f"Failed to save audio to {audio_path}")
-            return [], 0
-            
-        # Transcribe the audio
-        with open(audio_path, "rb") as audio_file:
-            transcription = client.audio.transcriptions.create(
-                model="whisper-1",
-                file=audio_file,
-                language='en',
-                response_format="text"
-            )
-        
-        # Create document chunks from the transcription
-        document_chunks = text_splitter.create_documents([transcription])
+        video_id = pt.extract.video_id(youtube_url)
+        passages = load_transcript(video_id)
+
+        if passages is None:
+            with tempfile.TemporaryDirectory(prefix="webchat-youtube-") as workdir:
+                # Download the audio
+                yt = pt.YouTube(youtube_url, use_oauth=True, allow_oauth_cache=True)
+                stream = yt.streams.filter(only_audio=True)
+
+                if not stream:
+                    print(f"No audio stream found for {youtube_url}")
+                    return [], 0
+
+                audio_path = stream[0].download(output_path=workdir)
+
+                # Check if file was successfully downloaded
+                if not audio_path or not os.path.exists(audio_path):
+                    print(f"Failed to download audio for {youtube_url}")
+                    return [], 0
+
+                passages = transcribe_audio(audio_path, openai_client or client, max_workers)
+            store_transcript(video_id, passages)
+
+        # Create time-stamped document chunks from the transcription
+        document_chunks = transcript_documents(passages, youtube_url, video_id, text_splitter._chunk_size)
         
         return document_chunks, 1
         
@@ -74,63 +75,84 @@ def fetch_and_split_data_from_youtube(youtube_url):
         return [], 0
 
 
-def fetch_and_split_data_from_url(url: str, max_depth: int) -> tuple[list, int]:
+def html_to_document(url, html):
     """
-    Fetches data from a given URL, scrapes additional URLs up to a specified depth,
-    and splits the loaded documents into chunks.
+    Extracts the text and metadata of a fetched page, like WebBaseLoader does.
 
     Args:
-        url (str): The URL to fetch data from.
-        max_depth (int): The maximum depth for URL scraping.
+        url (str): The page URL.
+        html (str): The page HTML.
 
     Returns:
-        tuple: A tuple containing a list of document chunks and the total number of URLs scraped.
+        Document: The page text with source, title, description and language metadata.
     """
-    if not url:
-        return [], 0
-        
-    try:
-        scraped_urls = scrape_urls(url, max_depth)
-        loader = WebBaseLoader(scraped_urls)
-        document = loader.load()
-        document_chunks = text_splitter.split_documents(document)
+    soup = BeautifulSoup(html, "html.parser")
+    metadata = {"source": url}
+    if soup.title and soup.title.string:
+        metadata["title"] = soup.title.string.strip()
+    description = soup.find("meta", attrs={"name": "description"})
+    if description and description.get("content"):
+        metadata["description"] = description["content"]
+    if soup.html and soup.html.get("lang"):
+        metadata["language"] = soup.html["lang"]
+    return Document(page_content=soup.get_text(), metadata=metadata)
+
+
+def iter_url_chunks(url: str, max_depth: int):
+    """
+    Crawls a URL and its links up to a specified depth, yielding each page's chunks as it arrives.
 
-        return document_chunks, len(scraped_urls)
-    except Exception as e:
-        print(f"Error fetching URL data: {str(e)}")
-        return [], 0
+    Each page is downloaded once: the crawler yields the HTML it fetched for
+    link discovery, and the text is extracted from that same response.
+
+    Args:
+        url (str): The URL to fetch data from.
+        max_depth (int): The maximum depth for URL scraping.
+
+    Yields:
+        tuple: The chunks of one page and the number of pages it accounts for (1),
+        or a SourceError for a page that failed to download.
+    """
+    # Filled from the crawl's worker threads, drained between pages
+    errors = []
+    for page_url, html in crawl(url, max_depth, on_error=lambda page, message: errors.append(f"{page}: {message}")):
+        while errors:
+            yield SourceError(errors.pop(0))
+        yield (text_splitter.split_documents([html_to_document(page_url, html)]) if html else []), 1
+    for message in errors:
+        yield SourceError(message)
 
 
-def load_and_split_data_from_files(uploaded_files: list) -> tuple[list, int]:
+def iter_file_chunks(uploaded_files: list):
     """
-    Loads data from uploaded files, handles different file formats, and splits the documents into chunks.
+    Saves uploaded files and yields their chunks as each file (or PDF page) is split.
 
     Args:
         uploaded_files (list): A list of uploaded files.
 
-    Returns:
-        tuple: A tuple containing a list of document chunks and the total number of documents loaded.
+    Yields:
+        tuple: A list of document chunks and the number of documents it completes,
+        or a SourceError for a file that failed to load.
     """
-    if not uploaded_files:
-        return [], 0
-
     upload_dir = 'src/uploads/'
     if not os.path.exists(upload_dir):
         os.makedirs(upload_dir, exist_ok=True)
 
-    all_chunks = []
-    doc_count = 0
-    
     for file_path in uploaded_files:
         try:
             save_path = os.path.join(upload_dir, file_path.name)
             with open(save_path, "wb") as f:
                 f.write(file_path.getvalue())
 
-            # Choose loader based on file extension
+            # PDFs are extracted page range by page range on a process pool
             if save_path.endswith(".pdf"):
-                loader = PyPDFLoader(save_path)
-            elif save_path.endswith(".txt"):
+                for chunk in split_pdf(save_path, text_splitter):
+                    yield [chunk], 0
+                yield [], 1
+                continue
+
+            # Choose loader based on file extension
+            if save_path.endswith(".txt"):
                 loader = TextLoader(save_path)
             elif save_path.endswith(".csv"):
                 loader = CSVLoader(save_path)
@@ -143,20 +165,32 @@ def load_and_split_data_from_files(uploaded_files: list) -> tuple[list, int]:
                 continue
 
             document = loader.load()
-            doc_count += 1
-            document_chunks = text_splitter.split_documents(document)
-            all_chunks.extend(document_chunks)
+            yield text_splitter.split_documents(document), 1
             
         except Exception as e:
             print(f"Error processing file {file_path.name}: {str(e)}")
+            yield SourceError(f"{file_path.name}: {str(e)}")
+
+
+def iter_youtube_chunks(youtube_url):
+    """
+    Transcribes a YouTube video and yields its chunks.
+
+    Args:
+        youtube_url (str): The URL of the YouTube video.
 
-    return all_chunks, doc_count
+    Yields:
+        tuple: The transcript chunks and the number of videos processed, or a
+        SourceError when the video could not be transcribed.
+    """
+    chunks, count = fetch_and_split_data_from_youtube(youtube_url)
+    # fetch_and_split_data_from_youtube reports its failures as ([], 0)
+    yield (chunks, count) if count else SourceError(f"could not transcribe {youtube_url}")
 
 
-def load_data(url: str, max_depth: int, uploaded_files: list, youtube: str):
+def iter_sources(url: str, max_depth: int, uploaded_files: list, youtube: str):
     """
-    Loads data from a URL (with scraping), uploaded files, and YouTube videos,
-    handling different formats and splitting documents into chunks.
+    Maps each requested source type to a generator of its chunks, for the ingestion pipeline.
 
     Args:
         url (str): The URL to fetch data from.
@@ -165,28 +199,43 @@ def load_data(url: str, max_depth: int, uploaded_files: list, youtube: str):
         youtube (str): YouTube URL to process.
 
     Returns:
-        tuple: A tuple containing a list of document chunks and the total number of documents loaded.
+        dict: Source name to a generator of (chunks, sources completed) tuples.
     """
-    final_chunks = []
-    total_loaded = 0
-
+    sources = {}
     if url:
-        web_chunks, num_scraped = fetch_and_split_data_from_url(url, max_depth)
-        total_loaded += num_scraped
-        final_chunks.extend(web_chunks)
-
+        sources["website"] = iter_url_chunks(url, max_depth)
     if uploaded_files:
-        file_chunks, num_files = load_and_split_data_from_files(uploaded_files)
-        total_loaded += num_files
-        final_chunks.extend(file_chunks)
+        sources["files"] = iter_file_chunks(uploaded_files)
+    if youtube:
+        sources["youtube"] = iter_youtube_chunks(youtube)
+    return sources
+
+
+def source_fingerprint(url: str, max_depth: int, uploaded_files: list, youtube: str) -> str:
+    """
+    Fingerprints a source set, so the same sources map to the same persisted collection.
 
+    Args:
+        url (str): The website URL.
+        max_depth (int): The maximum depth for URL scraping.
+        uploaded_files (list): A list of uploaded files, identified by their content hash.
+        youtube (str): YouTube URL, identified by its video ID.
+
+    Returns:
+        str: A SHA-256 hex digest of the source set.
+    """
+    video_id = None
     if youtube:
-        yt_chunks, num_yt = fetch_and_split_data_from_youtube(youtube)
-        total_loaded += num_yt
-        final_chunks.extend(yt_chunks)
+        try:
+            video_id = pt.extract.video_id(youtube)
+        except Exception:
+            video_id = youtube
+    sources = {
+        "url": normalize_url(url) if url else None,
+        "max_depth": max_depth if url else None,
+        "files": sorted(hashlib.sha256(file.getvalue()).hexdigest() for file in uploaded_files or []),
+        "youtube": video_id,
+        "splitter": [text_splitter._chunk_size, text_splitter._chunk_overlap],
+    }
+    return hashlib.sha256(json.dumps(sources, sort_keys=True).encode("utf-8")).hexdigest()
 
-    # Ensure we have at least some data
-    if not final_chunks:
-        print("Warning: No data was loaded from any source.")
-        
-    return final_chunks, total_loaded
\ No newline at end of file
@@ -0,0 +1,114 @@
+import threading
+
+from langchain_core.messages import SystemMessage
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+
+SUMMARY_PROMPT = ChatPromptTemplate.from_messages([
+  ("system", "Progressively summarize the conversation, adding onto the previous summary. "
+             "Keep names, facts, numbers and open questions. Stay under {words} words."),
+  ("user", "Current summary:\n{summary}\n\nNew lines of conversation:\n{lines}\n\nNew summary:"),
+])
+
+class HistoryWindow:
+    """
+    Token-budgeted view of a conversation: a rolling summary plus the latest turns verbatim.
+
+    The prompts get at most `keep_messages` recent messages, fewer when they
+    do not fit `max_tokens` together with the summary. Messages that fall out
+    of the window are folded into the summary by the LLM, incrementally and
+    off the request path, so prompt size stays flat however long the
+    conversation gets. A message only leaves the window once the summary
+    covers it; if the background update falls behind, it is caught up on the
+    request path instead.
+
+    Args:
+        llm: Chat model used to count tokens and to write the summary.
+        max_tokens (int): Token budget for the summary plus the recent messages.
+        keep_messages (int): Maximum number of recent messages kept verbatim.
+        summary_words (int): Length the summary is asked to stay under.
+    """
+
+    def __init__(self, llm, max_tokens=1024, keep_messages=6, summary_words=150):
+        self.llm = llm
+        self.max_tokens = max_tokens
+        self.keep_messages = keep_messages
+        self.summary_words = summary_words
+        self.summary = ""
+        self.summarized = 0
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def count_tokens(self, messages):
+        try:
+            return self.llm.get_num_tokens_from_messages(messages)
+        except Exception:
+            # No tokenizer available: about four characters per token
+            return sum(len(message.content) for message in messages) // 4
+
+    def _summary_messages(self, summary):
+        if not summary:
+            return []
+        return [SystemMessage(content=f"Summary of the earlier conversation: {summary}")]
+
+    def _window_start(self, chat_history, summary, summarized):
+        start = max(summarized, len(chat_history) - self.keep_messages)
+        budget = self.max_tokens - self.count_tokens(self._summary_messages(summary))
+        while start < len(chat_history) - 1 and self.count_tokens(chat_history[start:]) > budget:
+            start += 1
+        return start
+
+    def messages(self, chat_history):
+        """
+        The history to put into the prompts.
+
+        Args:
+            chat_history (list): The full conversation.
+
+        Returns:
+            list: The summary as a system message, followed by the recent messages.
+        """
+        with self._lock:
+            summary, summarized = self.summary, self.summarized
+        start = self._window_start(chat_history, summary, summarized)
+        if start > summarized:
+            # The window would drop turns the summary does not cover yet: catch the summary up first
+            if self._thread is not None:
+                self._thread.join()
+            try:
+                self.update(chat_history)
+            except Exception as e:
+                print(f"Error summarizing chat history: {str(e)}")
+            with self._lock:
+                summary, summarized = self.summary, self.summarized
+            # If the update failed, the unsummarized turns stay in the prompt, over budget, rather than get lost
+            start = min(self._window_start(chat_history, summary, summarized), summarized)
+        return self._summary_messages(summary) + list(chat_history[start:])
+
+    def update(self, chat_history):
+        """Fold the messages that left the window into the summary."""
+        with self._lock:
+            summary, summarized = self.summary, self.summarized
+        start = self._window_start(chat_history, summary, summarized)
+        if start <= summarized:
+            return
+        lines = "\n".join(f"{message.type}: {message.content}" for message in chat_history[summarized:start])
+        chain = SUMMARY_PROMPT | self.llm | StrOutputParser()
+        new_summary = chain.invoke({"summary": summary or "(none)", "lines": lines, "words": self.summary_words})
+        with self._lock:
+            self.summary, self.summarized = new_summary.strip(), start
+
+    def update_in_background(self, chat_history):
+        """Run `update` on a thread; skipped while an earlier update is still running."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        chat_history = list(chat_history)
+
+        def run():
+            try:
+                self.update(chat_history)
+            except Exception as e:
+                print(f"Error summarizing chat history: {str(e)}")
+
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
@@ -0,0 +1,160 @@
+import queue
+import threading
+import time
+
+_DONE = object()
+
+
+class SourceError:
+    """
+    Yielded by a source generator for an item it could not ingest, e.g. a file that failed to parse.
+
+    The source carries on with its other items, but the job records the
+    error, so the collection is not marked complete and is rebuilt next time.
+
+    Args:
+        message (str): What failed, shown in the progress.
+    """
+
+    def __init__(self, message):
+        self.message = message
+
+
+class IngestionJob:
+    """
+    Streams chunks from several sources into a vector store on background threads.
+
+    Every source generator runs on its own thread, so the website crawl, file
+    extraction and YouTube transcription overlap. Their chunks go through a
+    bounded queue to a single writer that embeds and upserts them in batches,
+    so memory stays flat however large the corpus is and the store can be
+    queried while ingestion is still running.
+
+    Args:
+        vector_store: LangChain vector store the chunks are added to.
+        sources (dict): Source name to a generator of (chunks, sources completed) tuples,
+            and of `SourceError` for items that failed.
+        batch_size (int): Chunks embedded and written per `add_documents` call.
+        queue_size (int): Chunk lists buffered between the sources and the writer.
+        flush_after (float): Seconds a partial batch waits for more chunks before it is written.
+        on_done (callable): Called with the final `status()` once every source has finished.
+    """
+
+    def __init__(self, vector_store, sources, batch_size=64, queue_size=16, flush_after=0.5, on_done=None):
+        self.vector_store = vector_store
+        self.sources = sources
+        self.on_done = on_done
+        self.batch_size = batch_size
+        self.flush_after = flush_after
+        self.started_at = None
+        self.finished_at = None
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._progress = {
+            name: {"sources": 0, "chunks": 0, "done": False, "error": None} for name in sources
+        }
+        self._indexed = 0
+        self._threads = []
+
+    def start(self):
+        self.started_at = time.time()
+        for name, chunks in self.sources.items():
+            thread = threading.Thread(target=self._produce, args=(name, chunks), daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        writer = threading.Thread(target=self._write, daemon=True)
+        writer.start()
+        self._threads.append(writer)
+        return self
+
+    def _produce(self, name, chunks):
+        try:
+            for item in chunks:
+                if isinstance(item, SourceError):
+                    print(f"Error ingesting {name}: {item.message}")
+                    with self._lock:
+                        self._progress[name]["error"] = item.message
+                    continue
+                documents, completed = item
+                self._queue.put((name, documents, completed))
+        except Exception as e:
+            print(f"Error ingesting {name}: {str(e)}")
+            with self._lock:
+                self._progress[name]["error"] = str(e)
+        finally:
+            self._queue.put((name, _DONE, 0))
+
+    def _flush(self, batch):
+        if not batch:
+            return
+        try:
+            self.vector_store.add_documents([document for _, document in batch])
+        except Exception as e:
+            print(f"Error writing {len(batch)} chunks to the vector store: {str(e)}")
+            with self._lock:
+                for name in {name for name, _ in batch}:
+                    self._progress[name]["error"] = str(e)
+            return
+        with self._lock:
+            for name, _ in batch:
+                self._progress[name]["chunks"] += 1
+            self._indexed += len(batch)
+
+    def _write(self):
+        running = len(self.sources)
+        batch = []
+        while running:
+            try:
+                name, documents, completed = self._queue.get(timeout=self.flush_after)
+            except queue.Empty:
+                # Sources are slow right now: make what we have searchable
+                self._flush(batch)
+                batch = []
+                continue
+
+            if documents is _DONE:
+                running -= 1
+                self._flush(batch)
+                batch = []
+                with self._lock:
+                    self._progress[name]["done"] = True
+                continue
+
+            batch.extend((name, document) for document in documents)
+            with self._lock:
+                self._progress[name]["sources"] += completed
+            while len(batch) >= self.batch_size:
+                self._flush(batch[:self.batch_size])
+                batch = batch[self.batch_size:]
+
+        self._flush(batch)
+        self.finished_at = time.time()
+        if self.on_done is not None:
+            try:
+                self.on_done(self.status())
+            except Exception as e:
+                print(f"Error finishing ingestion: {str(e)}")
+
+    @property
+    def done(self):
+        return self.finished_at is not None
+
+    def status(self):
+        """
+        Snapshot of the ingestion progress, safe to call from the UI thread.
+
+        Returns:
+            dict: Per-source progress, chunks indexed so far, sources completed,
+            elapsed seconds and whether every source has finished.
+        """
+        with self._lock:
+            progress = {name: dict(state) for name, state in self._progress.items()}
+            indexed = self._indexed
+        end = self.finished_at or time.time()
+        return {
+            "sources": progress,
+            "indexed": indexed,
+            "completed": sum(state["sources"] for state in progress.values()),
+            "elapsed": end - self.started_at if self.started_at else 0.0,
+            "done": self.done,
+        }
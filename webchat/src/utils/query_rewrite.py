@@ -0,0 +1,117 @@
+import re
+import threading
+from collections import OrderedDict
+
+from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.runnables import RunnableLambda
+
+# Words that point back into the conversation, so the question cannot be searched on its own
+REFERENCES = {
+    'it', "it's", 'its', 'this', 'that', 'these', 'those', 'they', "they're", 'them',
+    'their', 'theirs', 'he', 'him', 'his', 'she', 'her', 'hers', 'above', 'previous',
+    'earlier', 'former', 'latter', 'same', 'else', 'more', 'again', 'also', 'instead',
+    'elaborate', 'expand', 'continue', 'there',
+}
+# "Is there ...?" and "there are ..." are existential, not a reference to a place mentioned before
+EXISTENTIAL_THERE = re.compile(r"\b(?:is|are|was|were|be) there\b|\bthere(?: is|'s| are| was| were)\b")
+FOLLOW_UP_OPENERS = ('and ', 'but ', 'so ', 'or ', 'what about', 'how about', 'why not', 'why?', 'how?')
+
+def needs_rewrite(question, chat_history, min_words=4):
+    """
+    Decide whether a question has to be rewritten with the conversation before retrieval.
+
+    The rewrite is skipped before the user's first question and for questions
+    that stand on their own: long enough, with no pronoun or other word that
+    refers back to earlier turns and no follow-up opener like "and" or "what about".
+
+    Args:
+        question (str): The user's latest message.
+        chat_history (list): The conversation so far, as windowed by HistoryWindow.
+        min_words (int): Shorter questions are assumed to lean on the context.
+
+    Returns:
+        bool: True when the question needs the rewrite.
+    """
+    # A small history budget can leave only [summary, AIMessage] in the window; the summary holds the earlier questions
+    if not any(isinstance(message, (HumanMessage, SystemMessage)) for message in chat_history):
+        return False
+    text = question.strip().lower()
+    words_text = EXISTENTIAL_THERE.sub(' ', text)
+    words = re.findall(r"[a-z']+", text)
+    if len(words) < min_words or text.startswith(FOLLOW_UP_OPENERS):
+        return True
+    return any(word in REFERENCES for word in re.findall(r"[a-z']+", words_text))
+
+class RewriteCache:
+    """
+    LRU cache of rewritten queries keyed by the tail of the conversation and the question.
+
+    Args:
+        max_entries (int): Maximum number of cached rewrites.
+        history_turns (int): Messages at the end of the history that are part of the key.
+    """
+
+    def __init__(self, max_entries=1024, history_turns=4):
+        self.max_entries = max_entries
+        self.history_turns = history_turns
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def key(self, question, chat_history):
+        tail = tuple((message.type, message.content) for message in chat_history[-self.history_turns:])
+        return tail, question.strip()
+
+    def get(self, key):
+        with self._lock:
+            query = self._entries.get(key)
+            if query is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return query
+
+    def put(self, key, query):
+        with self._lock:
+            self._entries[key] = query
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+def create_query_rewriting_retriever(llm, retriever, prompt, cache=None):
+    """
+    Retriever chain that only calls the LLM to rewrite the query when the question needs it.
+
+    A drop-in replacement for `create_history_aware_retriever`: it takes
+    `input` and `chat_history` and returns documents, but searches with the
+    question as typed whenever `needs_rewrite` says it stands on its own, and
+    reuses earlier rewrites from `cache`.
+
+    Args:
+        llm: The chat model that rewrites the query.
+        retriever: The retriever to search with.
+        prompt: Prompt that turns the conversation into a search query.
+        cache (RewriteCache): Cache of earlier rewrites.
+
+    Returns:
+        Runnable: The retriever chain.
+    """
+    rewrite = prompt | llm | StrOutputParser()
+
+    def retrieve(inputs, config):
+        question, chat_history = inputs['input'], inputs.get('chat_history', [])
+        if not needs_rewrite(question, chat_history):
+            return retriever.invoke(question, config)
+
+        key = cache.key(question, chat_history) if cache is not None else None
+        query = cache.get(key) if cache is not None else None
+        if query is None:
+            query = rewrite.invoke(inputs, config)
+            if cache is not None:
+                cache.put(key, query)
+        return retriever.invoke(query, config)
+
+    return RunnableLambda(retrieve).with_config(run_name='chat_retriever_chain')
@@ -1,72 +1,225 @@
 import argparse
-import requests
 import os
-from urllib.parse import urlparse
-from collections import defaultdict
-from bs4 import BeautifulSoup
+import time
+import warnings
+from urllib.parse import urljoin, urlparse
+from urllib.robotparser import RobotFileParser
+from collections import deque
+from bs4 import BeautifulSoup, XMLParsedAsHTMLWarning
 import json
+from utils.http_cache import HEADERS, get_default_cache
 
 def cleanUrl(url: str):
     return url.replace("https://", "").replace("/", "-").replace(".", "_")
 
 
-def get_response_and_save(url: str):
+def get_response_and_save(url: str, cache=None):
+    # Pages are kept in the shared HTTP cache, which revalidates them on the next crawl
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            }
-        response = requests.get(url, headers=headers)
-        if not os.path.exists("./scrape"):
-            os.mkdir("./scrape")
-        parsedUrl = cleanUrl(url)
-        with open("./scrape/" + parsedUrl + ".html", "wb") as f:
-            f.write(response.content)
-        return response
+        return (cache or get_default_cache()).get(url, timeout=10)
     except:
         return None
 
 
+def load_robots(scheme: str, origin: str, cache=None):
+    """
+    Fetch and parse a site's robots.txt.
+
+    Args:
+        scheme (str): URL scheme of the site.
+        origin (str): Host of the site.
+        cache (HttpCache): HTTP cache to fetch through.
+
+    Returns:
+        RobotFileParser: The parsed rules; allows everything when robots.txt is missing.
+    """
+    robots = RobotFileParser(f"{scheme}://{origin}/robots.txt")
+    response = get_response_and_save(robots.url, cache)
+    if response is not None and response.status_code == 200:
+        robots.parse(response.text.splitlines())
+    else:
+        robots.parse([])
+    return robots
+
+
+def sitemap_urls(scheme: str, origin: str, robots=None, cache=None, max_sitemaps=20):
+    """
+    Collect page URLs from the site's sitemap.xml and the sitemaps listed in robots.txt.
+
+    Sitemap indexes are followed, up to `max_sitemaps` sitemap files in total.
+
+    Args:
+        scheme (str): URL scheme of the site.
+        origin (str): Host of the site.
+        robots (RobotFileParser): Parsed robots.txt, whose Sitemap lines are used too.
+        cache (HttpCache): HTTP cache to fetch through.
+        max_sitemaps (int): Maximum number of sitemap files to read.
+
+    Returns:
+        list: Page URLs on `origin`, in sitemap order.
+    """
+    pending = deque((robots and robots.site_maps()) or [f"{scheme}://{origin}/sitemap.xml"])
+    read = set()
+    pages = []
+    while pending and len(read) < max_sitemaps:
+        sitemap_url = pending.popleft()
+        if sitemap_url in read:
+            continue
+        read.add(sitemap_url)
+        response = get_response_and_save(sitemap_url, cache)
+        if response is None or response.status_code != 200:
+            continue
+        with warnings.catch_warnings():
+            # lxml is not a dependency; html.parser reads <loc> tags well enough
+            warnings.simplefilter("ignore", XMLParsedAsHTMLWarning)
+            soup = BeautifulSoup(response.content, "html.parser")
+        for loc in soup.find_all("loc"):
+            url = loc.get_text(strip=True)
+            if loc.parent is not None and loc.parent.name == "sitemap":
+                pending.append(url)
+            elif urlparse(url).netloc == origin:
+                pages.append(url)
+    return pages
+
+
+def _save_frontier(frontier_path: str, state: dict):
+    tmp_path = frontier_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, frontier_path)
+
 
 def scrape_links(
     scheme: str,
     origin: str,
     path: str,
     depth,
-    sitemap: dict = defaultdict(lambda: ""),
+    sitemap: dict = None,
+    max_pages: int = 1000,
+    frontier_path: str = None,
+    respect_robots: bool = True,
+    use_sitemap: bool = True,
+    cache=None,
+    checkpoint_every: int = 10,
 ):
-    siteUrl = scheme + "://" + origin + path
-    cleanedUrl = cleanUrl(siteUrl)
+    """
+    Breadth-first crawl of one site, returning the pages it visited.
 
+    The frontier is a queue instead of the call stack, so large sites neither
+    hit the recursion limit nor grow without bound: at most `max_pages` pages
+    are visited. Start URLs are seeded from sitemap.xml when the site has one
+    and `depth` is at least 1, robots.txt disallow rules are skipped and its
+    crawl-delay is honoured.
+    With `frontier_path` set, the queue is checkpointed to that JSON file and
+    an interrupted crawl of the same start URL resumes from it; the file is
+    removed once the crawl completes.
+
+    Args:
+        scheme (str): URL scheme of the start page.
+        origin (str): Host of the site; links to other hosts are not followed.
+        path (str): Path of the start page.
+        depth (int): How many links away from the start page to follow.
+        sitemap (dict): Visited pages to extend, keyed by `cleanUrl`.
+        max_pages (int): Maximum number of pages to visit.
+        frontier_path (str): JSON file the crawl state is checkpointed to.
+        respect_robots (bool): Obey robots.txt rules and crawl-delay.
+        use_sitemap (bool): Seed the frontier from the site's sitemaps.
+        cache (HttpCache): HTTP cache to fetch through, defaults to the shared one.
+        checkpoint_every (int): Pages visited between two checkpoints.
+
+    Returns:
+        dict: The visited pages, mapping `cleanUrl(url)` to `url`.
+    """
+    siteUrl = scheme + "://" + origin + path
+    sitemap = {} if sitemap is None else sitemap
     if depth < 0:
-        return
-    if sitemap[cleanedUrl] != "":
-        return
-
-    sitemap[cleanedUrl] = siteUrl
-    response = get_response_and_save(siteUrl)
-    if response is not None:  # Check if response is not None
-        soup = BeautifulSoup(response.content, "html.parser")
-        links = soup.find_all("a")
-
-        for link in links:
-            href = urlparse(link.get("href"))
-            if (href.netloc != origin and href.netloc != "") or (
-                href.scheme != "" and href.scheme != "https"
-            ):
-                continue
-            scrape_links(
-                href.scheme or "https",
-                href.netloc or origin,
-                href.path,
-                depth=depth - 1,
-                sitemap=sitemap,
-            )
+        return sitemap
+
+    robots = load_robots(scheme, origin, cache) if respect_robots else None
+    delay = (robots and robots.crawl_delay(HEADERS["User-Agent"])) or 0
+
+    state = None
+    if frontier_path and os.path.exists(frontier_path):
+        with open(frontier_path, encoding="utf-8") as f:
+            state = json.load(f)
+        if state.get("start") != siteUrl:
+            state = None
+        else:
+            print(f"Resuming crawl of {siteUrl}: {len(state['sitemap'])} pages done, "
+                  f"{len(state['frontier'])} queued")
+    if state is None:
+        seeds = [(siteUrl, depth)]
+        # Sitemap pages count as one link away, so a depth-0 crawl stays on the start page
+        if use_sitemap and depth >= 1:
+            seeds += [(url, depth - 1) for url in sitemap_urls(scheme, origin, robots, cache)]
+        state = {"start": siteUrl, "sitemap": {}, "frontier": seeds}
+
+    sitemap.update(state["sitemap"])
+    frontier = deque(tuple(item) for item in state["frontier"])
+    queued = set(sitemap) | {cleanUrl(url) for url, _ in frontier}
+    visited = 0
+
+    def checkpoint():
+        if frontier_path:
+            state["sitemap"] = sitemap
+            state["frontier"] = list(frontier)
+            _save_frontier(frontier_path, state)
+
+    while frontier and len(sitemap) < max_pages:
+        url, remaining = frontier.popleft()
+        if robots is not None and not robots.can_fetch(HEADERS["User-Agent"], url):
+            continue
+        if delay and visited:
+            time.sleep(delay)
+
+        sitemap[cleanUrl(url)] = url
+        visited += 1
+        response = get_response_and_save(url, cache)
+        if response is not None and response.status_code == 200 and remaining > 0:
+            soup = BeautifulSoup(response.content, "html.parser")
+            for link in soup.find_all("a", href=True):
+                href = urlparse(urljoin(url, link.get("href")))
+                if href.netloc != origin or href.scheme != scheme:
+                    continue
+                child = href.scheme + "://" + href.netloc + href.path
+                if cleanUrl(child) in queued:
+                    continue
+                queued.add(cleanUrl(child))
+                frontier.append((child, remaining - 1))
+
+        if frontier_path and visited % checkpoint_every == 0:
+            checkpoint()
+
+    if frontier_path and os.path.exists(frontier_path):
+        os.remove(frontier_path)
     return sitemap
 
 
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Crawl a website and list the pages it links to.")
+    parser.add_argument("site", help="Start URL, e.g. https://example.com/docs")
+    parser.add_argument("--depth", type=int, default=2, help="How many links away from the start page to follow.")
+    parser.add_argument("--max-pages", type=int, default=1000, help="Maximum number of pages to visit.")
+    parser.add_argument("--frontier", help="JSON file to checkpoint the crawl to, so it can be resumed.")
+    parser.add_argument("--output", help="Write the visited pages to this JSON file instead of stdout.")
+    parser.add_argument("--ignore-robots", action="store_true", help="Do not read robots.txt.")
+    parser.add_argument("--no-sitemap", action="store_true", help="Do not seed from sitemap.xml.")
+    args = parser.parse_args()
 
-# if __name__ == "__main__":
-#     args = parser.parse_args()
-#     url = urlparse(args.site)
-#     sitemap = scrape_links(url.scheme, url.netloc, url.path, depth=args.depth)
-#     
\ No newline at end of file
+    url = urlparse(args.site)
+    sitemap = scrape_links(
+        url.scheme,
+        url.netloc,
+        url.path or "/",
+        depth=args.depth,
+        max_pages=args.max_pages,
+        frontier_path=args.frontier,
+        respect_robots=not args.ignore_robots,
+        use_sitemap=not args.no_sitemap,
+    )
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(sitemap, f, indent=2)
+        print(f"{len(sitemap)} pages written to {args.output}")
+    else:
+        print(json.dumps(sitemap, indent=2))
@@ -0,0 +1,83 @@
+import time
+from collections import defaultdict
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+# Tags the chains put on their LLM calls, so the timer can tell the stages apart
+QUERY_REWRITE = "query_rewrite"
+GENERATION = "generation"
+
+
+class StageTimer(BaseCallbackHandler):
+    """
+    Callback handler that times the stages of one RAG turn.
+
+    LLM calls are attributed to the query rewrite or the answer generation by
+    their tags, retriever calls to retrieval. Time to the first generated
+    token is recorded when the answer is streamed.
+    """
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.timings = defaultdict(float)
+        self.first_token = None
+        self._starts = {}
+
+    def _start(self, run_id, stage):
+        if stage is not None:
+            self._starts[run_id] = (stage, time.perf_counter())
+
+    def _end(self, run_id):
+        stage, start = self._starts.pop(run_id, (None, None))
+        if stage is not None:
+            self.timings[stage] += time.perf_counter() - start
+
+    @staticmethod
+    def _llm_stage(tags):
+        tags = tags or []
+        if QUERY_REWRITE in tags:
+            return QUERY_REWRITE
+        if GENERATION in tags:
+            return GENERATION
+        return None
+
+    def on_llm_start(self, serialized, prompts, *, run_id, tags=None, **kwargs):
+        self._start(run_id, self._llm_stage(tags))
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, tags=None, **kwargs):
+        self._start(run_id, self._llm_stage(tags))
+
+    def on_llm_new_token(self, token, *, run_id, **kwargs):
+        if self.first_token is None and self._starts.get(run_id, (None,))[0] == GENERATION:
+            self.first_token = time.perf_counter() - self.started_at
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_retriever_start(self, serialized, query, *, run_id, **kwargs):
+        self._start(run_id, "retrieval")
+
+    def on_retriever_end(self, documents, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_retriever_error(self, error, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def summary(self):
+        """
+        Seconds spent per stage, plus the turn's total and time to first token when known.
+
+        Returns:
+            dict: Stage name to seconds.
+        """
+        timings = dict(self.timings)
+        timings["total"] = time.perf_counter() - self.started_at
+        if self.first_token is not None:
+            timings["first_token"] = self.first_token
+        return timings
+
+    def format(self):
+        return "  ".join(f"{stage} {seconds * 1000:.0f}ms" for stage, seconds in self.summary().items())
@@ -0,0 +1,223 @@
+import csv
+import json
+import os
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.documents import Document
+
+FFMPEG = os.getenv("FFMPEG_BINARY", "ffmpeg")
+
+default_cache_dir = os.getenv(
+    "TRANSCRIPT_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "genai-demos", "transcripts"),
+)
+
+
+def iter_audio_segments(path, out_dir, segment_seconds=600, bitrate="32k", poll_interval=0.2):
+    """
+    Re-encodes an audio file to mono speech-quality mp3 segments, yielding each one as soon as it is written.
+
+    At 32 kbps a ten minute segment is about 2.4 MB, well under Whisper's
+    25 MB upload limit. ffmpeg lists a segment in its CSV once the segment is
+    complete, so transcription of the first segments overlaps the encoding
+    of the rest.
+
+    Args:
+        path (str): The audio (or video) file to split.
+        out_dir (str): Directory the segments are written to.
+        segment_seconds (int): Length of each segment.
+        bitrate (str): mp3 bitrate of the segments.
+        poll_interval (float): Seconds between checks for finished segments.
+
+    Yields:
+        tuple: (segment path, start seconds, end seconds) in playback order.
+    """
+    segment_list = os.path.join(out_dir, "segments.csv")
+    process = subprocess.Popen(
+        [
+            FFMPEG, "-hide_banner", "-loglevel", "error", "-y", "-i", path,
+            "-vn", "-ac", "1", "-ar", "16000", "-b:a", bitrate,
+            "-f", "segment", "-segment_time", str(segment_seconds), "-reset_timestamps", "1",
+            "-segment_list", segment_list, "-segment_list_type", "csv", "-segment_list_flags", "+live",
+            os.path.join(out_dir, "segment%04d.mp3"),
+        ],
+        stderr=subprocess.PIPE,
+    )
+    yielded = 0
+    try:
+        while True:
+            finished = process.poll() is not None
+            rows = []
+            if os.path.exists(segment_list):
+                with open(segment_list, newline="") as f:
+                    lines = f.read().split("\n")
+                # The last line may still be being written (e.g. "segment0001.mp3,600.0,9"); only a
+                # newline, or ffmpeg exiting, shows that it is complete
+                if not finished:
+                    lines = lines[:-1]
+                rows = [row for row in csv.reader(lines) if len(row) == 3]
+            for name, start, end in rows[yielded:]:
+                yield os.path.join(out_dir, name), float(start), float(end)
+            yielded = len(rows)
+            if finished:
+                break
+            time.sleep(poll_interval)
+    finally:
+        if process.poll() is None:
+            process.kill()
+        stderr = process.communicate()[1]
+    if process.returncode:
+        raise RuntimeError(f"ffmpeg failed to split {path}: {stderr.decode(errors='replace').strip()}")
+
+
+def split_audio(path, out_dir, segment_seconds=600, bitrate="32k"):
+    """
+    Splits an audio file into segments, see `iter_audio_segments`.
+
+    Returns:
+        list: (segment path, start seconds, end seconds) tuples in playback order.
+    """
+    return list(iter_audio_segments(path, out_dir, segment_seconds, bitrate))
+
+
+def transcribe_segment(client, path, offset, end, model="whisper-1", language="en"):
+    """
+    Transcribes one audio segment, shifting its timestamps to the position of the segment in the video.
+
+    Args:
+        client (OpenAI): Client used for the transcription request.
+        path (str): The segment file.
+        offset (float): Start of the segment in the full audio, in seconds.
+        end (float): End of the segment in the full audio, in seconds.
+        model (str): Transcription model.
+        language (str): Spoken language.
+
+    Returns:
+        list: Dicts with start, end and text of each transcribed passage.
+    """
+    with open(path, "rb") as audio_file:
+        result = client.audio.transcriptions.create(
+            model=model,
+            file=audio_file,
+            language=language,
+            response_format="verbose_json",
+        )
+    result = result.model_dump() if hasattr(result, "model_dump") else dict(result)
+    segments = result.get("segments") or [{"start": 0.0, "end": end - offset, "text": result.get("text", "")}]
+    # Whisper timestamps can run slightly past the end of the audio it was given
+    return [
+        {
+            "start": min(offset + segment["start"], end),
+            "end": min(offset + segment["end"], end),
+            "text": segment["text"].strip(),
+        }
+        for segment in segments
+        if segment["text"].strip()
+    ]
+
+
+def transcribe_audio(path, client, max_workers=4, segment_seconds=600, **kwargs):
+    """
+    Splits an audio file into segments, transcribes them concurrently and stitches them back in order.
+
+    Segments are submitted while ffmpeg is still encoding the later ones.
+    They live in a temporary directory of their own, so concurrent jobs
+    never share files.
+
+    Args:
+        path (str): The audio file.
+        client (OpenAI): Client used for the transcription requests.
+        max_workers (int): Segments transcribed at the same time.
+        segment_seconds (int): Length of each segment.
+        **kwargs: Model and language passed to `transcribe_segment`.
+
+    Returns:
+        list: Dicts with start, end and text of each passage, in playback order.
+    """
+    with tempfile.TemporaryDirectory(prefix="transcribe-") as workdir:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = [
+                pool.submit(transcribe_segment, client, *segment, **kwargs)
+                for segment in iter_audio_segments(path, workdir, segment_seconds)
+            ]
+            return [passage for future in futures for passage in future.result()]
+
+
+def _cache_path(video_id, cache_dir):
+    return os.path.join(cache_dir, f"{video_id}.json")
+
+
+def load_transcript(video_id, cache_dir=default_cache_dir):
+    """
+    Returns the cached transcript of a video, or None.
+
+    Args:
+        video_id (str): The YouTube video ID.
+        cache_dir (str): Directory holding cached transcripts.
+    """
+    try:
+        with open(_cache_path(video_id, cache_dir), encoding="utf-8") as f:
+            return json.load(f)["passages"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def store_transcript(video_id, passages, cache_dir=default_cache_dir):
+    """
+    Caches the transcript of a video.
+
+    Args:
+        video_id (str): The YouTube video ID.
+        passages (list): The transcribed passages.
+        cache_dir (str): Directory holding cached transcripts.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    path = _cache_path(video_id, cache_dir)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"video_id": video_id, "passages": passages}, f)
+    os.replace(tmp_path, path)
+
+
+def transcript_documents(passages, source, video_id, chunk_size=4000):
+    """
+    Groups consecutive passages into chunks of about `chunk_size` characters with their time range.
+
+    Args:
+        passages (list): Transcribed passages in playback order.
+        source (str): The video URL.
+        video_id (str): The YouTube video ID.
+        chunk_size (int): Maximum characters per chunk, unless one passage is longer.
+
+    Returns:
+        list: Documents with source, video_id, start, end and timestamp_url metadata.
+    """
+    documents = []
+    group = []
+
+    def flush():
+        start = group[0]["start"]
+        documents.append(Document(
+            page_content=" ".join(passage["text"] for passage in group),
+            metadata={
+                "source": source,
+                "video_id": video_id,
+                "start": start,
+                "end": group[-1]["end"],
+                "timestamp_url": f"https://www.youtube.com/watch?v={video_id}&t={int(start)}s",
+            },
+        ))
+
+    length = 0
+    for passage in passages:
+        if group and length + len(passage["text"]) + 1 > chunk_size:
+            flush()
+            group, length = [], 0
+        group.append(passage)
+        length += len(passage["text"]) + 1
+    if group:
+        flush()
+    return documents